@@ -0,0 +1,274 @@
+import os
+import re
+import json
+import time
+import base64
+import asyncio
+import hashlib
+import argparse
+import threading
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from benchmarks.seed_db import BENCH_UNIVERSITY, OTHER_UNIVERSITIES, KEYWORDS, POSITIONS, researcher_id_for
+
+# ベンチマーク用の Azure OpenAI（埋め込み・チャット補完）と Azure AI Search のスタンドイン
+# 実際のサービスの応答時間を FAKE_*_LATENCY_MS で再現し、クォータを消費せずに負荷試験を行う
+#
+#     python -m benchmarks.fake_services --port 9100
+#
+# 検索用のドキュメントは seed_db と同じ研究者IDで作るため、検索結果のプロフィール補完もDBで引ける
+
+FAKE_EMBEDDING_LATENCY_MS = float(os.getenv("FAKE_EMBEDDING_LATENCY_MS", "80"))
+FAKE_CHAT_LATENCY_MS = float(os.getenv("FAKE_CHAT_LATENCY_MS", "800"))
+# バッチ説明生成では研究者1人分の出力ごとにこの時間を加える（出力トークン数に比例する生成時間の近似）
+FAKE_CHAT_LATENCY_PER_ITEM_MS = float(os.getenv("FAKE_CHAT_LATENCY_PER_ITEM_MS", "250"))
+FAKE_SEARCH_LATENCY_MS = float(os.getenv("FAKE_SEARCH_LATENCY_MS", "60"))
+# 応答時間のばらつき（0.2 なら ±20%）
+FAKE_LATENCY_JITTER = float(os.getenv("FAKE_LATENCY_JITTER", "0.2"))
+FAKE_EMBEDDING_DIM = int(os.getenv("FAKE_EMBEDDING_DIM", "1536"))
+# インデックスごとのドキュメント数（seed_db の研究者数と揃える）
+FAKE_SEARCH_DOCUMENTS = int(os.getenv("FAKE_SEARCH_DOCUMENTS", "2000"))
+FAKE_SEED = int(os.getenv("FAKE_SEED", "42"))
+
+PATTERN_INDEXES = ("science_tokyo_pattern_a", "science_tokyo_pattern_b", "science_tokyo_pattern_c")
+
+_SEARCH_PATH = re.compile(r"^\('(?P<index>[^']+)'\)/docs/search\.post\.search$")
+_DOCUMENT_PATH = re.compile(r"^\('(?P<index>[^']+)'\)/docs\('(?P<key>[^']+)'\)$")
+_UNIVERSITY_FILTER = re.compile(r"search\.ismatch\('(?P<university>[^']*)'")
+_BATCH_RESEARCHER_ID = re.compile(r"^研究者ID: (\S+)$", re.MULTILINE)
+
+app = FastAPI(title="Fake Azure services for benchmarks")
+
+
+def _latency(base_ms, rng=np.random):
+    if base_ms <= 0:
+        return 0.0
+    jitter = 1 + FAKE_LATENCY_JITTER * (2 * rng.random() - 1)
+    return base_ms * jitter / 1000
+
+
+def text_vector(text, dim=FAKE_EMBEDDING_DIM):
+    """テキストから決まる単位ベクトル（同じ入力には同じ埋め込みを返す）"""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class FakeIndex:
+    """1インデックス分のドキュメントと正規化済みベクトル"""
+
+    def __init__(self, index_name, document_count, dim, seed):
+        rng = np.random.default_rng([seed, PATTERN_INDEXES.index(index_name)])
+        self.index_name = index_name
+        self.documents = []
+        for i in range(document_count):
+            # 9割を既定の大学にして、大学での絞り込みが効く分布にする
+            if rng.random() < 0.9:
+                affiliation = BENCH_UNIVERSITY
+            else:
+                affiliation = OTHER_UNIVERSITIES[int(rng.integers(len(OTHER_UNIVERSITIES)))]
+            keywords = "、".join(rng.choice(KEYWORDS, size=4, replace=False))
+            document = {
+                "id": f"{index_name}-{i}",
+                "researcher_id": researcher_id_for(i),
+                "researcher_affiliation_current": affiliation,
+                "researcher_position_current": POSITIONS[int(rng.integers(len(POSITIONS)))],
+                "keywords_pi": keywords,
+                "research_project_title": f"{keywords}に関する研究",
+                "research_project_details": f"{keywords}を対象とした研究課題の詳細。" * 5,
+                "research_achievement": f"{keywords}に関する成果の概要。" * 3,
+                "publication_title": f"A study on {keywords}",
+                "description_publication": f"{keywords}についての論文の概要。" * 5
+            }
+            self.documents.append(document)
+        self.by_key = {document["id"]: document for document in self.documents}
+        self.affiliations = np.array([document["researcher_affiliation_current"] for document in self.documents])
+
+        vectors = rng.standard_normal((document_count, dim)).astype(np.float32)
+        self.vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def _university_mask(self, university):
+        return np.char.find(self.affiliations, university) >= 0
+
+    def search(self, vector, k, university=None):
+        """ベクトル検索（(ドキュメントの位置, スコア) を近い順に k 件）"""
+        similarities = self.vectors @ np.asarray(vector, dtype=np.float32)
+        if university:
+            similarities = np.where(self._university_mask(university), similarities, -np.inf)
+        k = min(k, len(similarities))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        # Azure AI Search のコサイン類似度のスコア（1 / (1 + コサイン距離)）
+        return [(int(i), 1.0 / (2.0 - float(similarities[i]))) for i in top if np.isfinite(similarities[i])]
+
+    def scan(self, university=None, skip=0, top=None):
+        """search_text="*" の全件取得（スナップショットの書き出し用）"""
+        positions = range(len(self.documents))
+        if university:
+            positions = np.flatnonzero(self._university_mask(university)).tolist()
+        positions = list(positions)[skip:]
+        return [(i, 1.0) for i in (positions[:top] if top else positions)]
+
+    def select(self, position, fields):
+        """select したフィールド（ベクトルフィールドを指定した場合はベクトルも返す）"""
+        document = self.documents[position]
+        if not fields:
+            return dict(document)
+        item = {field: document.get(field) for field in fields if field != self.index_name}
+        if self.index_name in fields:
+            item[self.index_name] = self.vectors[position].tolist()
+        return item
+
+
+class CallStats:
+    """スタンドインへの呼び出し回数（シナリオごとの上流呼び出し数の計測用）"""
+
+    def __init__(self):
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, amount=1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+
+indexes = {}
+call_stats = CallStats()
+
+
+@app.on_event("startup")
+def build_indexes():
+    for index_name in PATTERN_INDEXES:
+        indexes[index_name] = FakeIndex(index_name, FAKE_SEARCH_DOCUMENTS, FAKE_EMBEDDING_DIM, FAKE_SEED)
+
+
+@app.get("/fake-stats")
+def fake_stats():
+    return call_stats.snapshot()
+
+
+async def _embeddings(request):
+    body = await request.json()
+    inputs = body.get("input")
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    call_stats.add("embedding_requests")
+    call_stats.add("embedding_inputs", len(inputs))
+    await asyncio.sleep(_latency(FAKE_EMBEDDING_LATENCY_MS))
+
+    data = []
+    for index, text in enumerate(inputs):
+        vector = text_vector(str(text))
+        # openai SDK は numpy がある環境では base64 で要求する
+        if body.get("encoding_format") == "base64":
+            embedding = base64.b64encode(vector.tobytes()).decode("ascii")
+        else:
+            embedding = vector.tolist()
+        data.append({"object": "embedding", "index": index, "embedding": embedding})
+
+    tokens = sum(len(str(text)) for text in inputs)
+    return {
+        "object": "list",
+        "data": data,
+        "model": body.get("model", "fake-embedding"),
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+    }
+
+
+@app.post("/openai/deployments/{deployment}/embeddings")
+async def azure_embeddings(deployment: str, request: Request):
+    return await _embeddings(request)
+
+
+@app.post("/v1/embeddings")
+@app.post("/embeddings")
+async def openai_embeddings(request: Request):
+    return await _embeddings(request)
+
+
+@app.post("/openai/deployments/{deployment}/chat/completions")
+async def chat_completions(deployment: str, request: Request):
+    body = await request.json()
+    prompt = "\n".join(message.get("content", "") for message in body.get("messages", []))
+    call_stats.add("chat_requests")
+
+    if "JSON配列" in prompt:
+        # バッチ説明生成: プロンプト中の研究者IDごとに説明を返す
+        researcher_ids = [rid for rid in _BATCH_RESEARCHER_ID.findall(prompt) if rid != "研究者ID"]
+        call_stats.add("chat_batch_items", len(researcher_ids))
+        await asyncio.sleep(
+            _latency(FAKE_CHAT_LATENCY_MS) + _latency(FAKE_CHAT_LATENCY_PER_ITEM_MS) * len(researcher_ids)
+        )
+        content = json.dumps(
+            [{"researcher_id": rid, "explanation": f"研究者 {rid} は依頼内容に関連する研究を行っています。"}
+             for rid in researcher_ids],
+            ensure_ascii=False
+        )
+    else:
+        await asyncio.sleep(_latency(FAKE_CHAT_LATENCY_MS) + _latency(FAKE_CHAT_LATENCY_PER_ITEM_MS))
+        content = "この研究者は依頼内容に関連するキーワードの研究実績があり、適任と考えられます。"
+
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": deployment,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": len(prompt), "completion_tokens": len(content), "total_tokens": len(prompt) + len(content)}
+    }
+
+
+@app.api_route("/indexes{rest:path}", methods=["GET", "POST"])
+async def search_service(rest: str, request: Request):
+    match = _SEARCH_PATH.match(rest)
+    if match and request.method == "POST":
+        index = indexes.get(match.group("index"))
+        if index is None:
+            return JSONResponse({"error": {"code": "IndexNotFound"}}, status_code=404)
+        body = await request.json()
+        call_stats.add("search_requests")
+        await asyncio.sleep(_latency(FAKE_SEARCH_LATENCY_MS))
+
+        vector_query = (body.get("vectorQueries") or [{}])[0]
+        vector = vector_query.get("vector")
+        k = int(vector_query.get("k") or body.get("top") or 50)
+        university_match = _UNIVERSITY_FILTER.search(body.get("filter") or "")
+        university = university_match.group("university") if university_match else None
+        fields = [field.strip() for field in (body.get("select") or "").split(",") if field.strip()]
+
+        if vector:
+            hits = index.search(vector, k, university)
+        else:
+            hits = index.scan(university, int(body.get("skip") or 0), body.get("top"))
+        return {"value": [dict(index.select(position, fields), **{"@search.score": score}) for position, score in hits]}
+
+    match = _DOCUMENT_PATH.match(rest)
+    if match and request.method == "GET":
+        index = indexes.get(match.group("index"))
+        document = index.by_key.get(match.group("key")) if index else None
+        call_stats.add("document_requests")
+        await asyncio.sleep(_latency(FAKE_SEARCH_LATENCY_MS / 2))
+        if document is None:
+            return JSONResponse({"error": {"code": "DocumentNotFound"}}, status_code=404)
+        selected = request.query_params.get("$select")
+        fields = selected.split(",") if selected else None
+        return {field: document.get(field) for field in fields} if fields else dict(document)
+
+    return JSONResponse({"error": {"code": "NotSupported", "path": rest}}, status_code=404)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="ベンチマーク用の Azure OpenAI / Azure AI Search スタンドイン")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
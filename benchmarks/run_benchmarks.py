@@ -0,0 +1,503 @@
+import os
+import re
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+
+import httpx
+
+from benchmarks.seed_db import BENCH_UNIVERSITY, KEYWORDS, RESEARCH_FIELDS, researcher_id_for
+
+# API 全体のオフラインベンチマーク
+#
+#     python -m benchmarks.run_benchmarks --concurrency 1,8,32 --requests 100
+#
+# 1. 一時ディレクトリに SQLite のDBを作成してデータを投入する（--database-url で MySQL 互換のDBも指定可）
+# 2. Azure OpenAI / Azure AI Search のスタンドイン（benchmarks.fake_services）を起動する
+# 3. スタンドインとDBに向けた環境変数で uvicorn main:app を起動する
+# 4. main.py の全エンドポイントを同時実行数ごとに叩き、スループットと p50/p95/p99 を集計する
+# 5. 結果を benchmarks/results/<日時>_<コミット>.json に保存し、前回の結果との差分を表示する
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+BENCH_API_KEY = "bench-key"
+BENCH_ADMIN_TOKEN = "bench-admin-token"
+BENCH_EMBEDDING_DEPLOYMENT = "bench-embedding"
+BENCH_CHAT_DEPLOYMENT = "bench-chat"
+
+CATEGORIES = ("共同研究", "技術相談", "受託研究", "講演依頼")
+BUDGET_RANGES = ("100万円〜", "500万円〜", "1000万円以上", None)
+DEADLINE_RANGES = ("30日以内", "90日以内", None)
+
+
+class Scenario:
+    """
+    1エンドポイント分の負荷パターン
+
+    path / params / body には i（リクエストの通し番号）を受け取る関数も渡せる（毎回異なる入力にするため）
+    """
+
+    def __init__(self, name, method, path, params=None, body=None, group="db", stream=False):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.params = params
+        self.body = body
+        self.group = group
+        self.stream = stream
+
+    @staticmethod
+    def _resolve(value, i):
+        return value(i) if callable(value) else value
+
+    def request_args(self, i):
+        args = {"url": self._resolve(self.path, i)}
+        params = self._resolve(self.params, i)
+        if params:
+            args["params"] = {key: value for key, value in params.items() if value is not None}
+        body = self._resolve(self.body, i)
+        if body is not None:
+            args["json"] = body
+        return args
+
+
+def _query(rng_seed, explain):
+    """検索リクエストの本文（seed ごとに異なるが、同じ seed なら同じ内容）"""
+    rng = random.Random(rng_seed)
+    keywords = rng.sample(KEYWORDS, 3)
+    return {
+        "category": rng.choice(CATEGORIES),
+        "title": f"{keywords[0]}を活用した{keywords[1]}の高度化",
+        "description": f"{keywords[0]}と{keywords[2]}に関する技術課題について、研究者の知見を求めています。",
+        "university": BENCH_UNIVERSITY,
+        "top_k": 10,
+        "explain": explain
+    }
+
+
+def build_scenarios(researchers, query_pool, explain, lazy_handles):
+    """main.py の全エンドポイントのシナリオ"""
+    def researcher_id(i):
+        return researcher_id_for((i * 7919) % researchers)
+
+    def query(i):
+        return _query(i % query_pool, explain)
+
+    def pattern_query(pattern):
+        return lambda i: dict(query(i), pattern=pattern)
+
+    def keyword(i):
+        return KEYWORDS[i % len(KEYWORDS)]
+
+    scenarios = [
+        Scenario("root", "GET", "/", group="general"),
+        Scenario("cache_stats", "GET", "/cache-stats", group="general"),
+        Scenario("metrics", "GET", "/metrics", group="general"),
+        Scenario("connection_stats", "GET", "/connection-stats", group="general"),
+        Scenario("db_pool_stats", "GET", "/db-pool-stats", group="general"),
+        Scenario("patterns_info", "GET", "/patterns-info", group="general"),
+
+        Scenario("researchers", "GET", "/researchers"),
+        Scenario("researcher_by_id", "GET", lambda i: f"/researchers/{researcher_id(i)}"),
+        Scenario("researchers_batch_names", "POST", "/researchers/batch-names",
+                 body=lambda i: {"researcher_ids": [researcher_id(i * 10 + j) for j in range(10)]}),
+        Scenario("researcher_research_projects", "GET",
+                 lambda i: f"/researchers/{researcher_id(i)}/research-projects"),
+        Scenario("researcher_profile", "GET", lambda i: f"/researchers/{researcher_id(i)}/profile",
+                 params={"per_page": 10}),
+
+        Scenario("research_projects", "GET", "/research-projects", params=lambda i: {"page": i % 20 + 1}),
+        Scenario("research_project_by_id", "GET", lambda i: f"/research-projects/{(i * 7919) % (researchers * 2) + 1}"),
+        Scenario("search_research_projects", "GET", "/search-research-projects",
+                 params=lambda i: {"keyword": keyword(i)}),
+        Scenario("filtered_research_projects", "GET", "/filtered-research-projects",
+                 params=lambda i: {"research_field": RESEARCH_FIELDS[i % len(RESEARCH_FIELDS)]}),
+        Scenario("filtered_research_projects_by_researcher", "GET", "/filtered-research-projects",
+                 params=lambda i: {"researcher_id": researcher_id(i)}),
+
+        Scenario("matting_projects", "GET", "/matting-projects", params=lambda i: {
+            "keyword": keyword(i) if i % 2 else "",
+            "budget_range": BUDGET_RANGES[i % len(BUDGET_RANGES)],
+            "deadline_range": DEADLINE_RANGES[i % len(DEADLINE_RANGES)]
+        }),
+
+        Scenario("search_researchers", "POST", "/search-researchers", body=query, group="search"),
+        Scenario("search_pattern_a", "POST", "/search-researchers-pattern", body=pattern_query("A"), group="search"),
+        Scenario("search_pattern_b", "POST", "/search-researchers-pattern", body=pattern_query("B"), group="search"),
+        Scenario("search_pattern_c", "POST", "/search-researchers-pattern", body=pattern_query("C"), group="search"),
+        Scenario("compare_patterns", "POST", "/compare-patterns", body=query, group="search"),
+        Scenario("search_pattern_stream", "POST", "/search-researchers-pattern/stream",
+                 body=pattern_query("B"), group="search", stream=True),
+        Scenario("compare_patterns_stream", "POST", "/compare-patterns/stream",
+                 body=query, group="search", stream=True),
+        Scenario("search_batch", "POST", "/search-researchers-batch", group="search", body=lambda i: {
+            "items": [dict(query(i * 10 + j), explain=None) for j in range(10)],
+            "pattern": "B",
+            "explain": "none"
+        }),
+    ]
+    if lazy_handles:
+        scenarios.append(Scenario(
+            "explanations", "POST", "/explanations",
+            body=lambda i: {"handles": lazy_handles[i % len(lazy_handles)]}, group="search"
+        ))
+    return scenarios
+
+
+def _is_error(response, body):
+    """HTTP エラーに加え、DB系エンドポイントが 200 で返す {"status": "error"} もエラーとして数える"""
+    if response.status_code >= 400:
+        return True
+    if response.headers.get("content-type", "").startswith("application/json"):
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return True
+        return isinstance(payload, dict) and payload.get("status") == "error"
+    return False
+
+
+async def _send(client, scenario, i):
+    args = scenario.request_args(i)
+    started = time.perf_counter()
+    try:
+        if scenario.stream:
+            async with client.stream(scenario.method, **args) as response:
+                body = b"".join([chunk async for chunk in response.aiter_bytes()])
+        else:
+            response = await client.request(scenario.method, **args)
+            body = response.content
+        error = _is_error(response, body)
+        message = body[:200].decode("utf-8", "replace") if error else None
+    except Exception as e:
+        error = True
+        message = f"{type(e).__name__}: {e}"
+    return time.perf_counter() - started, error, message
+
+
+def percentile(sorted_values, q):
+    """最近順位法によるパーセンタイル"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(q / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def run_level(client, scenario, concurrency, total, warmup):
+    """同時実行数 concurrency で total 件を送り、レイテンシを集計する"""
+    for i in range(warmup):
+        await _send(client, scenario, -1 - i)
+
+    latencies = []
+    errors = []
+    next_index = iter(range(total))
+
+    async def worker():
+        for i in next_index:
+            seconds, error, message = await _send(client, scenario, i)
+            latencies.append(seconds)
+            if error:
+                errors.append(message)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:3],
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "mean": round(sum(latencies) / len(latencies) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2)
+        }
+    }
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _git(*args):
+    try:
+        return subprocess.run(
+            ["git", *args], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _wait_ready(url, process, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} のプロセスが終了しました（exit code {process.returncode}）")
+        try:
+            if httpx.get(url, timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} が {timeout} 秒以内に起動しませんでした")
+
+
+def _start(args, env, log_path):
+    log = open(log_path, "w")
+    return subprocess.Popen(args, cwd=REPO_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def _stop(process):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def fake_env(args):
+    env = dict(os.environ)
+    env.update({
+        "FAKE_EMBEDDING_LATENCY_MS": str(args.embedding_latency_ms),
+        "FAKE_CHAT_LATENCY_MS": str(args.chat_latency_ms),
+        "FAKE_CHAT_LATENCY_PER_ITEM_MS": str(args.chat_latency_per_item_ms),
+        "FAKE_SEARCH_LATENCY_MS": str(args.search_latency_ms),
+        "FAKE_SEARCH_DOCUMENTS": str(args.researchers),
+        "FAKE_EMBEDDING_DIM": str(args.embedding_dim)
+    })
+    return env
+
+
+def app_env(args, database_url, fake_url, work_dir):
+    """アプリをスタンドインとベンチマーク用DBに向ける環境変数（.env より優先される）"""
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": database_url,
+        "AZURE_OPENAI_ENDPOINT": fake_url,
+        "AZURE_OPENAI_API_KEY": BENCH_API_KEY,
+        "AZURE_OPENAI_GPT_ENDPOINT": fake_url,
+        "AZURE_OPENAI_GPT_API_KEY": BENCH_API_KEY,
+        "AZURE_OPENAI_GPT_DEPLOYMENT_NAME": BENCH_CHAT_DEPLOYMENT,
+        "AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME": BENCH_EMBEDDING_DEPLOYMENT,
+        "AZURE_SEARCH_ENDPOINT": fake_url,
+        "AZURE_SEARCH_API_KEY": BENCH_API_KEY,
+        "ADMIN_TOKEN": BENCH_ADMIN_TOKEN,
+        "EMBEDDING_CACHE_PATH": os.path.join(work_dir, "embedding_cache.sqlite3"),
+        "GUNICORN_WORKERS": str(args.workers)
+    })
+    if args.search_backend == "local":
+        env["SEARCH_BACKEND"] = "local"
+        env["LOCAL_INDEX_SNAPSHOT_PATH"] = os.path.join(work_dir, "local_index_snapshot.npz")
+    if not args.with_caches:
+        # 既定ではキャッシュを無効にし、上流呼び出しを含む素の処理時間を測る
+        env["EMBEDDING_CACHE_ENABLED"] = "false"
+        env["EXPLANATION_CACHE_ENABLED"] = "false"
+        env["SEARCH_RESULT_CACHE_ENABLED"] = "false"
+    for assignment in args.app_env:
+        key, _, value = assignment.partition("=")
+        env[key] = value
+    return env
+
+
+async def collect_lazy_handles(client, count):
+    """/explanations 用に、lazy モードの検索結果から説明ハンドルを集める"""
+    handles = []
+    for i in range(count):
+        response = await client.post("/search-researchers-pattern", json=dict(_query(i, "lazy"), pattern="A"))
+        if response.status_code != 200:
+            continue
+        results = response.json().get("results", [])
+        batch = [item["explanation_handle"] for item in results if item.get("explanation_handle")][:5]
+        if batch:
+            handles.append(batch)
+    return handles
+
+
+async def run_all(args, base_url, fake_url):
+    limits = httpx.Limits(max_connections=max(args.concurrency) * 2, max_keepalive_connections=max(args.concurrency) * 2)
+    # 統計情報のエンドポイント用の認証ヘッダー（他のエンドポイントでは使われない）
+    headers = {"Authorization": f"Bearer {BENCH_ADMIN_TOKEN}"}
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits, headers=headers) as client, \
+            httpx.AsyncClient(base_url=fake_url, timeout=10) as fake_client:
+        lazy_handles = await collect_lazy_handles(client, min(args.query_pool, 20))
+        scenarios = build_scenarios(args.researchers, args.query_pool, args.explain, lazy_handles)
+        if args.only:
+            scenarios = [scenario for scenario in scenarios if re.search(args.only, scenario.name)]
+        if args.skip_search:
+            scenarios = [scenario for scenario in scenarios if scenario.group != "search"]
+
+        results = []
+        for scenario in scenarios:
+            total = args.search_requests if scenario.group == "search" else args.requests
+            for concurrency in args.concurrency:
+                before = (await fake_client.get("/fake-stats")).json()
+                result = await run_level(client, scenario, concurrency, total, args.warmup)
+                after = (await fake_client.get("/fake-stats")).json()
+                # ウォームアップ分も含むため目安の値
+                result["upstream_calls_per_request"] = {
+                    name: round((after.get(name, 0) - before.get(name, 0)) / (total + args.warmup), 2)
+                    for name in sorted(after) if after.get(name, 0) != before.get(name, 0)
+                }
+                result.update({"scenario": scenario.name, "group": scenario.group, "concurrency": concurrency})
+                results.append(result)
+                print(_format_row(result), flush=True)
+        return results
+
+
+def _format_row(result, previous=None):
+    latency = result["latency_ms"]
+    row = (
+        f"{result['scenario']:<42} c={result['concurrency']:<4} "
+        f"rps={result['throughput_rps']:>9} p50={latency['p50']:>9} p95={latency['p95']:>9} "
+        f"p99={latency['p99']:>9} err={result['errors']}"
+    )
+    if previous:
+        row += (
+            f"  | rps {_delta(result['throughput_rps'], previous['throughput_rps'])}"
+            f" p95 {_delta(latency['p95'], previous['latency_ms']['p95'])}"
+        )
+    return row
+
+
+def _delta(current, previous):
+    if not previous:
+        return "n/a"
+    return f"{(current - previous) / previous * 100:+.1f}%"
+
+
+def latest_result(exclude=None):
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    paths = sorted(
+        os.path.join(RESULTS_DIR, name) for name in os.listdir(RESULTS_DIR)
+        if name.endswith(".json") and os.path.join(RESULTS_DIR, name) != exclude
+    )
+    return paths[-1] if paths else None
+
+
+def print_comparison(report, baseline_path):
+    """前回（または指定した）結果と、同じシナリオ・同時実行数どうしで比較する"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(item["scenario"], item["concurrency"]): item for item in baseline["results"]}
+    print(f"\n比較対象: {os.path.relpath(baseline_path, REPO_ROOT)} (commit {baseline['meta'].get('git_commit')})")
+    for result in report["results"]:
+        print(_format_row(result, previous.get((result["scenario"], result["concurrency"]))))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="スタンドインを使った API 全体のベンチマーク")
+    parser.add_argument("--concurrency", default="1,8,32", type=lambda value: [int(v) for v in value.split(",")])
+    parser.add_argument("--requests", type=int, default=100, help="DB・一般エンドポイントの同時実行数ごとのリクエスト数")
+    parser.add_argument("--search-requests", type=int, default=30, help="検索エンドポイントの同時実行数ごとのリクエスト数")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn のワーカー数")
+    parser.add_argument("--explain", default="eager", choices=("none", "eager", "lazy"))
+    parser.add_argument("--query-pool", type=int, default=50, help="検索クエリの種類数（小さいほどキャッシュが効く）")
+    parser.add_argument("--search-backend", default="azure", choices=("azure", "local"),
+                        help="local の場合はスタンドインから書き出したスナップショットでプロセス内検索する")
+    parser.add_argument("--with-caches", action="store_true", help="埋め込み・説明文・検索結果のキャッシュを有効にする")
+    parser.add_argument("--only", help="シナリオ名の正規表現")
+    parser.add_argument("--skip-search", action="store_true")
+    parser.add_argument("--researchers", type=int, default=2000)
+    parser.add_argument("--projects", type=int, default=1000)
+    parser.add_argument("--database-url", help="投入済みのDB（省略時は一時ディレクトリの SQLite に投入する）")
+    parser.add_argument("--embedding-latency-ms", type=float, default=80)
+    parser.add_argument("--chat-latency-ms", type=float, default=800)
+    parser.add_argument("--chat-latency-per-item-ms", type=float, default=250)
+    parser.add_argument("--search-latency-ms", type=float, default=60)
+    parser.add_argument("--embedding-dim", type=int, default=1536)
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="アプリに渡す追加の環境変数（例: EXPLANATION_STRATEGY=batch）")
+    parser.add_argument("--compare", help="比較する結果ファイル（省略時は results/ の最新）")
+    parser.add_argument("--no-save", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    work_dir = tempfile.mkdtemp(prefix="bench-")
+    database_url = args.database_url or f"sqlite:///{os.path.join(work_dir, 'bench.db')}"
+
+    if not args.database_url:
+        print("DBを作成中:", database_url, flush=True)
+        subprocess.run([
+            sys.executable, "-m", "benchmarks.seed_db", "--database-url", database_url,
+            "--researchers", str(args.researchers), "--projects", str(args.projects)
+        ], cwd=REPO_ROOT, check=True)
+
+    fake_port, app_port = _free_port(), _free_port()
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    base_url = f"http://127.0.0.1:{app_port}"
+
+    fake = _start(
+        [sys.executable, "-m", "benchmarks.fake_services", "--port", str(fake_port)],
+        fake_env(args), os.path.join(work_dir, "fake_services.log")
+    )
+    app = None
+    try:
+        _wait_ready(f"{fake_url}/fake-stats", fake, 120)
+        env = app_env(args, database_url, fake_url, work_dir)
+        if args.search_backend == "local":
+            subprocess.run([
+                sys.executable, "-m", "components.local_vector_index", "export",
+                "--output", env["LOCAL_INDEX_SNAPSHOT_PATH"]
+            ], cwd=REPO_ROOT, env=env, check=True)
+        app = _start(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(app_port),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            env, os.path.join(work_dir, "app.log")
+        )
+        _wait_ready(f"{base_url}/", app, 120)
+        print(f"ログ: {work_dir}", flush=True)
+        results = asyncio.run(run_all(args, base_url, fake_url))
+    finally:
+        if app is not None:
+            _stop(app)
+        _stop(fake)
+
+    commit = _git("rev-parse", "--short", "HEAD")
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_commit": commit,
+            "git_dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "database": "sqlite" if database_url.startswith("sqlite") else database_url.split(":", 1)[0],
+            "args": {key: value for key, value in vars(args).items() if key not in ("database_url", "compare", "no_save")}
+        },
+        "results": results
+    }
+
+    baseline_path = args.compare or latest_result()
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}_{commit or 'unknown'}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print("\n結果を保存しました:", os.path.relpath(path, REPO_ROOT))
+    if baseline_path:
+        print_comparison(report, baseline_path)
+
+
+if __name__ == "__main__":
+    main()
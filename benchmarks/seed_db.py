@@ -0,0 +1,150 @@
+import os
+import random
+import argparse
+from datetime import datetime, timedelta
+
+# ベンチマーク用に models.py と同じスキーマのDBを作成し、決まった乱数でデータを投入する
+#
+#     python -m benchmarks.seed_db --database-url sqlite:///bench.db --researchers 2000
+#
+# MySQL 互換のDBに投入する場合は --database-url に mysql+mysqlconnector://... を渡す
+# （既存のテーブルには投入しないため、ベンチマーク専用のDBを指定すること）
+
+BENCH_UNIVERSITY = "東京科学大学"
+OTHER_UNIVERSITIES = ("東京大学", "京都大学", "大阪大学", "東北大学", "名古屋大学")
+POSITIONS = ("教授", "准教授", "講師", "助教", "特任教授")
+DEPARTMENTS = ("工学院", "理学院", "生命理工学院", "情報理工学院", "医歯学総合研究科", "環境・社会理工学院")
+RESEARCH_FIELDS = (
+    "材料工学", "機械工学", "電気電子工学", "情報学", "化学", "生命科学",
+    "医学", "土木工学", "建築学", "環境学", "物理学", "数学"
+)
+KEYWORDS = (
+    "機械学習", "深層学習", "自然言語処理", "画像認識", "ロボティクス", "制御工学", "半導体", "量子計算",
+    "燃料電池", "二次電池", "触媒", "高分子", "複合材料", "金属疲労", "流体力学", "熱工学",
+    "構造解析", "耐震設計", "再生医療", "創薬", "ゲノム解析", "免疫", "医療機器", "生体材料",
+    "環境計測", "水処理", "カーボンニュートラル", "省エネルギー", "IoT", "センサ", "光通信", "無線通信"
+)
+BUDGETS = ("50万円", "100万円", "300万円", "500万円", "1,000万円", "3000000", "1億円", "応相談")
+PROJECT_STATUSES = (0, 1, 1, 1, 2)
+
+
+def researcher_id_for(index):
+    """index 番目の研究者ID（fake_services の検索ドキュメントと共通）"""
+    return f"{10000000 + index:08d}"
+
+
+def _keywords(rng, count):
+    return "、".join(rng.sample(KEYWORDS, count))
+
+
+def _researchers(rng, count):
+    for i in range(count):
+        affiliation = BENCH_UNIVERSITY if rng.random() < 0.9 else rng.choice(OTHER_UNIVERSITIES)
+        yield {
+            "researcher_id": researcher_id_for(i),
+            "researcher_name": f"研究者{i:05d}",
+            "researcher_name_kana": f"ケンキュウシャ{i:05d}",
+            "researcher_name_alphabet": f"Researcher {i:05d}",
+            "researcher_affiliation_current": affiliation,
+            "researcher_department_current": rng.choice(DEPARTMENTS),
+            "researcher_position_current": rng.choice(POSITIONS),
+            "research_field_pi": rng.choice(RESEARCH_FIELDS),
+            "keywords_pi": _keywords(rng, 5),
+            "researcher_email": f"researcher{i:05d}@example.ac.jp"
+        }
+
+
+def _research_projects(rng, researcher_count, per_researcher):
+    project_number = 0
+    for i in range(researcher_count):
+        for _ in range(rng.randint(max(0, per_researcher - 2), per_researcher + 2)):
+            project_number += 1
+            keywords = _keywords(rng, 3)
+            yield {
+                "id": project_number,
+                "research_project_id": f"KAKEN-{project_number:07d}",
+                "researcher_id": researcher_id_for(i),
+                "research_project_title": f"{keywords}に関する研究",
+                "research_project_details": f"本研究では{keywords}について検討する。" * 10,
+                "research_field": rng.choice(RESEARCH_FIELDS),
+                "research_achievement": f"{keywords}に関する成果を得た。" * 5
+            }
+
+
+def _projects(rng, count, company_user_count):
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    for i in range(1, count + 1):
+        keywords = _keywords(rng, 3)
+        deadline = today + timedelta(days=rng.randint(-30, 180))
+        yield {
+            "project_id": i,
+            "types_to_register": "共同研究",
+            "company_user_id": rng.randint(1, company_user_count),
+            "project_title": f"{keywords}の共同研究パートナー募集",
+            "consultation_category": rng.randint(1, 5),
+            "project_content": f"{keywords}に関する技術課題について、大学の研究者と共同で取り組みたい。" * 3,
+            "research_field": rng.choice(RESEARCH_FIELDS),
+            "preferred_researcher_level": rng.choice(POSITIONS),
+            "budget": rng.choice(BUDGETS),
+            # 文字列の締切は実データと同様に複数の形式が混在する
+            "application_deadline": deadline.strftime(rng.choice(("%Y-%m-%d", "%Y/%m/%d", "%Y年%m月%d日"))),
+            "project_status": rng.choice(PROJECT_STATUSES)
+        }
+
+
+def _insert(db, model, rows, batch_size=1000):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.bulk_insert_mappings(model, batch)
+            batch = []
+    if batch:
+        db.bulk_insert_mappings(model, batch)
+
+
+def seed(database_url, researchers=2000, projects_per_researcher=3, companies=50, projects=1000, seed_value=42):
+    """スキーマを作成してデータを投入する（database は DATABASE_URL を読んで接続するため、先に環境変数を設定する）"""
+    os.environ["DATABASE_URL"] = database_url
+    from database import Base, engine, SessionLocal
+    from components.project_normalization import sync_project_columns
+    import models
+
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(seed_value)
+    with SessionLocal() as db:
+        if db.query(models.Researcher).first() is not None:
+            raise RuntimeError(f"{database_url} にはすでにデータがあります（ベンチマーク専用のDBを指定してください）")
+
+        _insert(db, models.Researcher, _researchers(rng, researchers))
+        _insert(db, models.ResearchProject, _research_projects(rng, researchers, projects_per_researcher))
+        _insert(db, models.Company, ({"company_id": i, "company_name": f"株式会社ベンチマーク{i:03d}"}
+                                     for i in range(1, companies + 1)))
+        # 企業ユーザーは企業あたり2人
+        _insert(db, models.CompanyUser, ({"company_user_id": i, "company_id": (i - 1) // 2 + 1}
+                                         for i in range(1, companies * 2 + 1)))
+        _insert(db, models.Project, _projects(rng, projects, companies * 2))
+        db.commit()
+
+    # 予算・締切の正規化列を埋めておく（アプリのワーカーは同期しないため、ここで型付きの絞り込みに必要な値を入れる）
+    sync_project_columns()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ベンチマーク用のDBを作成してデータを投入する")
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--researchers", type=int, default=2000)
+    parser.add_argument("--projects-per-researcher", type=int, default=3)
+    parser.add_argument("--companies", type=int, default=50)
+    parser.add_argument("--projects", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    seed(
+        args.database_url,
+        researchers=args.researchers,
+        projects_per_researcher=args.projects_per_researcher,
+        companies=args.companies,
+        projects=args.projects,
+        seed_value=args.seed
+    )
+    print("Seeded:", args.database_url)
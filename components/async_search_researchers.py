@@ -0,0 +1,383 @@
+import os
+import time
+import asyncio
+
+from components.clients import (
+    get_async_http_client,
+    get_async_openai_client,
+    get_async_search_client
+)
+from components.embedding_cache import get_cached_embedding_async, get_cached_embeddings_async
+from components.result_cache import get_cached_hits, set_cached_hits
+from components.local_vector_index import local_vector_index, use_local_backend
+from components.timing import stage, pattern_scope
+from components.researcher_profiles import fetch_researcher_profiles, apply_researcher_profiles
+from components.explanation_cache import (
+    make_explanation_key,
+    get_cached_explanation,
+    set_cached_explanation
+)
+from components.search_researchers import (
+    PATTERN_CONFIG,
+    EXPLAIN_MODES,
+    EXPLANATION_MAX_WORKERS,
+    EXPLANATION_STRATEGY,
+    EXPLANATION_MESSAGE_BUILDERS,
+    lazy_hit_cache,
+    build_chat_completion_request,
+    build_vector_search_kwargs,
+    prepare_batch_explanations,
+    collect_batch_explanations,
+    format_pattern_result,
+    make_explanation_handle,
+    parse_explanation_handle
+)
+
+# 研究者検索のパイプライン（埋め込み → ベクトル検索 → 説明生成）
+# プロンプト・レスポンス形式は search_researchers.py に定義したものを使い、
+# 外部APIは共有の非同期クライアントで呼び出す
+
+# バッチ検索で1回の埋め込みリクエストにまとめる入力数
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "16"))
+# バッチ検索で同時に実行する埋め込みリクエスト・検索の数の上限
+BATCH_SEARCH_MAX_CONCURRENCY = int(os.getenv("BATCH_SEARCH_MAX_CONCURRENCY", "8"))
+
+
+async def _request_embedding_async(text):
+    client = await get_async_openai_client()
+    response = await client.embeddings.create(
+        input=text,
+        model=os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME")
+    )
+    return response.data[0].embedding
+
+
+async def get_embedding_async(text):
+    """クエリの埋め込みを取得する（キャッシュにヒットした場合はAPIを呼ばない）"""
+    deployment_name = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME")
+    with stage("embedding"):
+        return await get_cached_embedding_async(text, deployment_name, _request_embedding_async)
+
+
+async def _request_embeddings_async(texts):
+    client = await get_async_openai_client()
+    response = await client.embeddings.create(
+        input=texts,
+        model=os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME")
+    )
+    # data は入力の順とは限らないため index で並べ直す
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+async def get_embeddings_async(texts):
+    """複数テキストの埋め込みを1回のリクエストで取得する（キャッシュ済みのテキストは送らない）"""
+    deployment_name = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME")
+    with stage("embedding"):
+        return await get_cached_embeddings_async(texts, deployment_name, _request_embeddings_async)
+
+
+async def get_openai_response_async(messages, max_tokens=300):
+    """Azure OpenAI のチャット補完を呼び出し、応答のメッセージを返す（共有の接続プールを使う）"""
+    endpoint, headers, data = build_chat_completion_request(messages, max_tokens)
+    client = await get_async_http_client()
+    with stage("llm"):
+        response = await client.post(endpoint, headers=headers, json=data)
+
+    if response.status_code == 200:
+        response_data = response.json()
+        return response_data['choices'][0]['message']['content']
+    else:
+        raise Exception(f"Request failed with status code {response.status_code}: {response.text}")
+
+
+async def search_pattern_hits_async(pattern, embedding, university, top_k):
+    """
+    パターンのインデックスに対してベクトル検索を行い、ヒットを順位順のリストで返す
+    同じクエリ（埋め込みが完全に一致するもの）の結果がキャッシュにあれば検索しない
+    """
+    cached = get_cached_hits(pattern, embedding, university, top_k)
+    if cached is not None:
+        return cached
+
+    with stage("vector_search", pattern):
+        if use_local_backend():
+            # グラフ探索は Python のループのため、イベントループを止めないようにスレッドで実行する
+            hits = await asyncio.to_thread(local_vector_index.search, pattern, embedding, university, top_k)
+        else:
+            search_client = await get_async_search_client(PATTERN_CONFIG[pattern]["index_name"])
+            results = await search_client.search(**build_vector_search_kwargs(pattern, embedding, university, top_k))
+            hits = [result async for result in results]
+    set_cached_hits(pattern, embedding, university, top_k, hits)
+    return hits
+
+
+async def generate_explanation_cached_async(pattern, query_text, researcher):
+    """
+    キャッシュを利用して説明を生成する
+
+    Returns:
+    tuple: (説明文, キャッシュから返したかどうか)
+    """
+    messages = EXPLANATION_MESSAGE_BUILDERS[pattern](query_text, researcher)
+    key = make_explanation_key(pattern, researcher["researcher_id"], messages)
+
+    explanation = get_cached_explanation(key)
+    if explanation is not None:
+        return explanation, True
+
+    explanation = await get_openai_response_async(messages)
+    set_cached_explanation(key, explanation)
+    return explanation, False
+
+
+async def generate_explanations_concurrently_async(pattern, query_text, results, max_workers=None):
+    """
+    検索結果ごとの説明生成を同時実行数の上限付きで並行実行する（順位順を保持）
+    """
+    semaphore = asyncio.Semaphore(max_workers or EXPLANATION_MAX_WORKERS)
+
+    async def explain(result):
+        async with semaphore:
+            return await generate_explanation_cached_async(pattern, query_text, result)
+
+    return list(await asyncio.gather(*(explain(result) for result in results)))
+
+
+async def generate_explanations_batch_async(pattern, query_text, results):
+    """
+    全研究者の説明を1回のチャット補完でまとめて生成する
+    キャッシュ済みの研究者は除外し、応答に含まれなかった研究者は個別に生成する（順位順を保持）
+    """
+    if not results:
+        return []
+
+    explanations, keys, pending, messages, max_tokens = prepare_batch_explanations(pattern, query_text, results)
+    if not pending:
+        return explanations
+
+    content = None
+    try:
+        content = await get_openai_response_async(messages, max_tokens=max_tokens)
+    except Exception as e:
+        print("バッチ説明生成に失敗したため、研究者ごとの生成に切り替えます:", e)
+
+    missing = collect_batch_explanations(results, keys, explanations, pending, content)
+    if missing:
+        fallback = await generate_explanations_concurrently_async(pattern, query_text, [results[i] for i in missing])
+        for index, explanation in zip(missing, fallback):
+            explanations[index] = explanation
+
+    return explanations
+
+
+async def generate_explanations_async(pattern, query_text, results):
+    """EXPLANATION_STRATEGY に従って検索結果の説明をまとめて生成する（順位順を保持）"""
+    if EXPLANATION_STRATEGY == "batch":
+        return await generate_explanations_batch_async(pattern, query_text, results)
+    return await generate_explanations_concurrently_async(pattern, query_text, results)
+
+
+async def run_pattern_search_async(pattern, category, title, description, university, top_k, embedding=None, explain="eager"):
+    """
+    パターン共通の検索処理（埋め込み → ベクトル検索 → 説明生成）
+    explain が "none" / "lazy" の場合は説明生成を行わない
+    """
+    if explain not in EXPLAIN_MODES:
+        raise ValueError(f"Invalid explain mode: {explain}")
+
+    with pattern_scope(pattern):
+        return await _run_pattern_search_async(pattern, category, title, description, university, top_k, embedding, explain)
+
+
+async def _run_pattern_search_async(pattern, category, title, description, university, top_k, embedding, explain):
+    start_time = time.time()
+    query_text = f"{category} {title} {description}"
+    if embedding is None:
+        embedding = await get_embedding_async(query_text)
+
+    results = await search_pattern_hits_async(pattern, embedding, university, top_k)
+
+    # 研究者名はインデックスに無いため、説明生成と並行してDBから1回のクエリで取得する
+    profiles_task = asyncio.create_task(
+        asyncio.to_thread(fetch_researcher_profiles, [result["researcher_id"] for result in results])
+    )
+
+    if explain == "eager":
+        explanations = await generate_explanations_async(pattern, query_text, results)
+        search_results = [
+            format_pattern_result(pattern, result, university, explanation, explanation_cached)
+            for result, (explanation, explanation_cached) in zip(results, explanations)
+        ]
+    elif explain == "lazy":
+        search_results = []
+        for result in results:
+            handle = make_explanation_handle(pattern, query_text, result)
+            lazy_hit_cache.set(handle, result)
+            search_results.append(format_pattern_result(pattern, result, university, explanation_handle=handle))
+    else:
+        search_results = [format_pattern_result(pattern, result, university) for result in results]
+
+    apply_researcher_profiles(search_results, await profiles_task)
+
+    search_time = time.time() - start_time
+    return {
+        "results": search_results,
+        "search_time": search_time,
+        "pattern": pattern,
+        "pattern_description": PATTERN_CONFIG[pattern]["description"]
+    }
+
+
+async def fetch_pattern_document_async(pattern, document_key):
+    """パターンのインデックスからドキュメントを1件取得する（説明生成に必要なフィールドのみ）"""
+    if use_local_backend():
+        return await asyncio.to_thread(local_vector_index.get_document, pattern, document_key)
+    search_client = await get_async_search_client(PATTERN_CONFIG[pattern]["index_name"])
+    return await search_client.get_document(key=document_key, selected_fields=PATTERN_CONFIG[pattern]["select"])
+
+
+async def resolve_explanation_handle_async(handle):
+    """ハンドル1件分の説明文を生成する（キャッシュ済みならキャッシュから返す）"""
+    pattern, document_key, researcher_id, query_text = parse_explanation_handle(handle)
+    result = lazy_hit_cache.get(handle)
+    if result is None:
+        result = await fetch_pattern_document_async(pattern, document_key)
+
+    with pattern_scope(pattern):
+        explanation, explanation_cached = await generate_explanation_cached_async(pattern, query_text, result)
+    return {
+        "handle": handle,
+        "pattern": pattern,
+        "researcher_id": researcher_id,
+        "explanation": explanation,
+        "explanation_cached": explanation_cached
+    }
+
+
+async def resolve_explanation_handles_async(handles, max_workers=None):
+    """
+    複数のハンドルの説明文を同時実行数の上限付きで並行して生成し、handles と同じ順で返す
+    ハンドルごとの失敗は error として返し、他のハンドルの処理は続ける。
+    """
+    semaphore = asyncio.Semaphore(max_workers or EXPLANATION_MAX_WORKERS)
+
+    async def resolve(handle):
+        async with semaphore:
+            try:
+                return await resolve_explanation_handle_async(handle)
+            except Exception as e:
+                print("resolve_explanation_handle_async内で例外発生:", e)
+                return {"handle": handle, "explanation": None, "error": str(e)}
+
+    return list(await asyncio.gather(*(resolve(handle) for handle in handles)))
+
+
+async def search_researchers_pattern_async(pattern, category, title, description, university="東京科学大学", top_k=10, explain="eager"):
+    """
+    指定パターンの研究者検索（非同期版）
+    """
+    try:
+        return await run_pattern_search_async(pattern.upper(), category, title, description, university, top_k, explain=explain)
+    except Exception as e:
+        print("search_researchers_pattern_async内で例外発生:", e)
+        raise
+
+
+async def search_researchers_batch_async(items, max_concurrency=None):
+    """
+    複数の検索をまとめて実行する（夜間のマッチング処理など）
+    - 埋め込みは重複を除いて EMBEDDING_BATCH_SIZE 件ずつ複数入力の1リクエストで取得する
+    - 埋め込みリクエストとベクトル検索（説明生成を含む）はそれぞれ最大 max_concurrency 件を並行実行する
+    - 1件の失敗で全体を失敗させず、項目ごとに結果またはエラーを返す
+
+    Parameters:
+    items (list): {"pattern", "category", "title", "description", "university", "top_k", "explain"} の辞書のリスト
+
+    Returns:
+    list: items と同じ順の {"index", "status": "success", "results", ...} または {"index", "status": "error", "message"}
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or BATCH_SEARCH_MAX_CONCURRENCY)
+    query_texts = [f"{item['category']} {item['title']} {item['description']}" for item in items]
+    unique_texts = list(dict.fromkeys(query_texts))
+    chunks = [unique_texts[i:i + EMBEDDING_BATCH_SIZE] for i in range(0, len(unique_texts), EMBEDDING_BATCH_SIZE)]
+
+    async def embed(chunk):
+        async with semaphore:
+            return await get_embeddings_async(chunk)
+
+    embeddings = {}
+    embedding_errors = {}
+    outcomes = await asyncio.gather(*(embed(chunk) for chunk in chunks), return_exceptions=True)
+    for chunk, outcome in zip(chunks, outcomes):
+        if isinstance(outcome, Exception):
+            print("search_researchers_batch_async内で例外発生（埋め込み）:", outcome)
+            embedding_errors.update(dict.fromkeys(chunk, str(outcome)))
+        else:
+            embeddings.update(zip(chunk, outcome))
+
+    async def search(index, item, query_text):
+        pattern = item["pattern"].upper()
+        if pattern not in PATTERN_CONFIG:
+            return {"index": index, "status": "error", "message": "Invalid pattern. Must be A, B, or C"}
+        if query_text in embedding_errors:
+            return {"index": index, "status": "error", "message": embedding_errors[query_text]}
+
+        async with semaphore:
+            try:
+                result = await run_pattern_search_async(
+                    pattern, item["category"], item["title"], item["description"],
+                    item["university"], item["top_k"], embeddings[query_text], item["explain"]
+                )
+            except Exception as e:
+                print("search_researchers_batch_async内で例外発生:", e)
+                return {"index": index, "status": "error", "message": str(e)}
+        return {"index": index, "status": "success", **result}
+
+    return list(await asyncio.gather(*(
+        search(index, item, query_text) for index, (item, query_text) in enumerate(zip(items, query_texts))
+    )))
+
+
+async def compare_all_patterns_async(category, title, description, university="東京科学大学", top_k=10, explain="eager"):
+    """
+    3つのパターンすべてを実行して結果を比較する
+    埋め込みは1回だけ計算し、3パターンを asyncio.gather で並行実行する
+    """
+    try:
+        start_time = time.time()
+
+        query_text = f"{category} {title} {description}"
+        embedding = await get_embedding_async(query_text)
+        embedding_time = time.time() - start_time
+
+        patterns = list(PATTERN_CONFIG)
+        results = await asyncio.gather(*(
+            run_pattern_search_async(pattern, category, title, description, university, top_k, embedding, explain)
+            for pattern in patterns
+        ))
+        pattern_results = dict(zip(patterns, results))
+
+        total_time = time.time() - start_time
+
+        return {
+            "pattern_a": pattern_results["A"],
+            "pattern_b": pattern_results["B"],
+            "pattern_c": pattern_results["C"],
+            "total_comparison_time": total_time,
+            "embedding_time": embedding_time,
+            "pattern_timings": {
+                pattern: result["search_time"] for pattern, result in pattern_results.items()
+            },
+            "query_info": {
+                "category": category,
+                "title": title,
+                "description": description,
+                "university": university,
+                "top_k": top_k,
+                "explain": explain
+            }
+        }
+
+    except Exception as e:
+        print("compare_all_patterns_async内で例外発生:", e)
+        raise
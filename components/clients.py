@@ -0,0 +1,185 @@
+import os
+import asyncio
+
+import httpx
+import aiohttp
+from openai import AsyncAzureOpenAI
+from azure.core.credentials import AzureKeyCredential
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.search.documents.aio import SearchClient as AsyncSearchClient
+
+# 非同期クライアントの接続プール設定（ワーカーごと）
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv("ASYNC_HTTP_MAX_CONNECTIONS", "200"))
+ASYNC_HTTP_MAX_KEEPALIVE = int(os.getenv("ASYNC_HTTP_MAX_KEEPALIVE", "50"))
+ASYNC_HTTP_TIMEOUT = float(os.getenv("ASYNC_HTTP_TIMEOUT", "60"))
+
+EMBEDDING_API_VERSION = "2023-07-01-preview"
+
+
+class AsyncConnectionStats:
+    """
+    非同期クライアント（httpx / aiohttp）のホストごとの接続再利用状況
+    接続プールが再利用のカウンタを持たないため、トレースフックで数える
+    """
+
+    def __init__(self):
+        self.hosts = {}
+
+    def _host(self, url):
+        key = f"{url.scheme}://{url.host}:{url.port or (443 if url.scheme == 'https' else 80)}"
+        if key not in self.hosts:
+            self.hosts[key] = {"connections_created": 0, "tls_handshakes": 0, "requests": 0}
+        return self.hosts[key]
+
+    def record_request(self, url):
+        self._host(url)["requests"] += 1
+
+    def record_connection(self, url):
+        self._host(url)["connections_created"] += 1
+
+    def record_tls_handshake(self, url):
+        self._host(url)["tls_handshakes"] += 1
+
+    def snapshot(self):
+        hosts = {}
+        for key, counts in list(self.hosts.items()):
+            requests_sent = counts["requests"]
+            hosts[key] = {
+                **counts,
+                "reuse_ratio": max(0.0, 1 - counts["connections_created"] / requests_sent) if requests_sent else 0.0
+            }
+        return hosts
+
+
+def _httpx_event_hooks(stats):
+    """リクエストごとに httpcore のトレースを仕掛け、新規接続とTLSハンドシェイクを数える"""
+
+    async def on_request(request):
+        url = request.url
+        stats.record_request(url)
+
+        async def trace(event_name, info):
+            if event_name == "connection.connect_tcp.complete":
+                stats.record_connection(url)
+            elif event_name == "connection.start_tls.complete":
+                stats.record_tls_handshake(url)
+
+        request.extensions["trace"] = trace
+
+    return {"request": [on_request]}
+
+
+def _aiohttp_trace_config(stats):
+    """aiohttp のトレースで、リクエスト数と新規接続数を数える"""
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_request_start(session, context, params):
+        context.url = params.url
+        stats.record_request(params.url)
+
+    async def on_connection_create_end(session, context, params):
+        url = getattr(context, "url", None)
+        if url is not None:
+            stats.record_connection(url)
+            if url.scheme == "https":
+                stats.record_tls_handshake(url)
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    return trace_config
+
+
+# 非同期クライアントはワーカープロセスごとに1つだけ作り、接続を使い回す
+# （uvicorn のワーカーはプロセスごとにイベントループを1つだけ動かすため、ループごとには分けない）
+_async_clients = {}
+_async_lock = asyncio.Lock()
+_async_stats = {"httpx": AsyncConnectionStats(), "aiohttp": AsyncConnectionStats()}
+
+
+def get_connection_stats():
+    """
+    ホストごとの接続再利用状況を返す（httpx: 埋め込み・チャット補完、aiohttp: Azure Search）
+    connections_created が requests より十分小さければ、TLS接続の確立はホットパスから外れている
+    """
+    return {
+        "pid": os.getpid(),
+        "max_connections": ASYNC_HTTP_MAX_CONNECTIONS,
+        "max_keepalive": ASYNC_HTTP_MAX_KEEPALIVE,
+        "timeout": ASYNC_HTTP_TIMEOUT,
+        "search_clients": sorted(_async_clients.get("search", {})),
+        "httpx": _async_stats["httpx"].snapshot(),
+        "aiohttp": _async_stats["aiohttp"].snapshot()
+    }
+
+
+async def _get_async_clients():
+    """
+    非同期クライアント一式を初回呼び出し時に作成して返す
+    httpx は埋め込み・チャット補完で、aiohttp は Azure Search で共有する
+    """
+    if _async_clients:
+        return _async_clients
+
+    async with _async_lock:
+        if _async_clients:
+            return _async_clients
+
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=ASYNC_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=ASYNC_HTTP_MAX_KEEPALIVE
+            ),
+            timeout=ASYNC_HTTP_TIMEOUT,
+            event_hooks=_httpx_event_hooks(_async_stats["httpx"])
+        )
+        search_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=ASYNC_HTTP_MAX_CONNECTIONS),
+            timeout=aiohttp.ClientTimeout(total=ASYNC_HTTP_TIMEOUT),
+            trace_configs=[_aiohttp_trace_config(_async_stats["aiohttp"])]
+        )
+        _async_clients["http"] = http_client
+        _async_clients["search_session"] = search_session
+        _async_clients["openai"] = AsyncAzureOpenAI(
+            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+            api_version=EMBEDDING_API_VERSION,
+            http_client=http_client
+        )
+        _async_clients["search"] = {}
+        return _async_clients
+
+
+async def get_async_http_client():
+    """チャット補完用の共有 httpx.AsyncClient"""
+    return (await _get_async_clients())["http"]
+
+
+async def get_async_openai_client():
+    """埋め込み用の共有 AsyncAzureOpenAI クライアント"""
+    return (await _get_async_clients())["openai"]
+
+
+async def get_async_search_client(index_name):
+    """インデックスごとの共有非同期 SearchClient（aiohttp セッションは全インデックスで共有）"""
+    clients = await _get_async_clients()
+    search_clients = clients["search"]
+    if index_name not in search_clients:
+        search_clients[index_name] = AsyncSearchClient(
+            endpoint=os.getenv("AZURE_SEARCH_ENDPOINT"),
+            index_name=index_name,
+            credential=AzureKeyCredential(os.getenv("AZURE_SEARCH_API_KEY")),
+            transport=AioHttpTransport(session=clients["search_session"], session_owner=False)
+        )
+    return search_clients[index_name]
+
+
+async def close_async_clients():
+    """アプリ終了時に接続プールを閉じる"""
+    if not _async_clients:
+        return
+    for search_client in _async_clients["search"].values():
+        await search_client.close()
+    await _async_clients["openai"].close()
+    await _async_clients["http"].aclose()
+    await _async_clients["search_session"].close()
+    _async_clients.clear()
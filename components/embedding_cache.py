@@ -0,0 +1,265 @@
+import os
+import asyncio
+import hashlib
+import sqlite3
+import tempfile
+import threading
+import time
+import unicodedata
+from array import array
+
+from components.cache import LRUCache
+
+# 埋め込みキャッシュの設定
+# ディスク層は全gunicornワーカーで共有され、ワーカーの再起動後も残る
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_MEMORY_SIZE = int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "1024"))
+EMBEDDING_CACHE_DISK_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_DISK_MAX_ENTRIES", "20000"))
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "kenq_embedding_cache.sqlite3")
+)
+
+# 件数チェックは毎回行わず、この回数の書き込みごとに行う
+_EVICTION_CHECK_INTERVAL = 100
+
+
+def normalize_query_text(text):
+    """
+    キャッシュキー用にクエリ文字列を正規化する（NFKC + 空白の統一）
+    """
+    text = unicodedata.normalize("NFKC", text or "")
+    return " ".join(text.split())
+
+
+def make_embedding_key(normalized_text, deployment_name):
+    """正規化済みテキストとデプロイメント名からキャッシュキーを作る"""
+    raw = f"{deployment_name or ''}\n{normalized_text}".encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+class DiskEmbeddingStore:
+    """
+    SQLiteファイルを使ったワーカー間共有の埋め込みストア
+
+    ベクトルは float32 のバイト列として保存し、last_access の古い順に削除する。
+    """
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _connect(self):
+        # スレッドごと・プロセスごとに接続を持つ（fork後に接続を共有しない）
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_access ON embeddings (last_access)")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._connect()
+        row = conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE embeddings SET last_access = ? WHERE key = ?", (time.time(), key))
+        return array("f", row[0]).tolist()
+
+    def set(self, key, vector):
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+            (key, array("f", vector).tobytes(), time.time())
+        )
+        with self._lock:
+            self._writes += 1
+            should_check = self._writes % _EVICTION_CHECK_INTERVAL == 0
+        if should_check:
+            self.evict()
+
+    def evict(self):
+        """上限件数を超えた分を last_access の古い順に削除する"""
+        conn = self._connect()
+        count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                "SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+            self.evictions += overflow
+
+    def count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class EmbeddingCache:
+    """
+    2層構成の埋め込みキャッシュ（プロセス内LRU → ワーカー間共有のディスク）
+    """
+
+    def __init__(self, memory_size, disk_path, disk_max_entries):
+        self.memory = LRUCache(maxsize=memory_size)
+        self.disk = DiskEmbeddingStore(disk_path, disk_max_entries) if disk_path else None
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_errors = 0
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def _get_from_disk(self, key):
+        if self.disk is None:
+            return None
+        try:
+            return self.disk.get(key)
+        except (sqlite3.Error, OSError) as e:
+            # ディスク層の障害で検索自体は止めない
+            print("埋め込みキャッシュ（ディスク）の読み込みに失敗:", e)
+            self._count("disk_errors")
+            return None
+
+    def _set_to_disk(self, key, vector):
+        if self.disk is None:
+            return
+        try:
+            self.disk.set(key, vector)
+        except (sqlite3.Error, OSError) as e:
+            print("埋め込みキャッシュ（ディスク）への書き込みに失敗:", e)
+            self._count("disk_errors")
+
+    async def aget_or_compute(self, text, deployment_name, compute_coro_fn):
+        """
+        キャッシュから埋め込みを取得し、無ければ compute_coro_fn(normalized_text) で計算して保存する
+        ディスク層の読み書きはイベントループを止めないようにスレッドで実行する
+        """
+        normalized = normalize_query_text(text)
+        key = make_embedding_key(normalized, deployment_name)
+
+        vector = self.memory.get(key)
+        if vector is not None:
+            self._count("memory_hits")
+            return vector
+
+        vector = await asyncio.to_thread(self._get_from_disk, key)
+        if vector is not None:
+            self._count("disk_hits")
+            self.memory.set(key, vector)
+            return vector
+
+        self._count("misses")
+        vector = await compute_coro_fn(normalized)
+        self.memory.set(key, vector)
+        await asyncio.to_thread(self._set_to_disk, key, vector)
+        return vector
+
+    async def aget_or_compute_many(self, texts, deployment_name, compute_many_coro_fn):
+        """
+        aget_or_compute の複数件版
+        キャッシュに無いテキストだけを（重複を除いて）compute_many_coro_fn(normalized_texts) でまとめて計算する
+
+        Returns:
+        list: texts と同じ順の埋め込み
+        """
+        normalized = [normalize_query_text(text) for text in texts]
+        keys = [make_embedding_key(text, deployment_name) for text in normalized]
+        texts_by_key = dict(zip(keys, normalized))
+
+        vectors = {}
+        disk_keys = []
+        for key in texts_by_key:
+            vector = self.memory.get(key)
+            if vector is not None:
+                vectors[key] = vector
+            else:
+                disk_keys.append(key)
+        self._count("memory_hits", len(vectors))
+
+        if disk_keys:
+            disk_vectors = await asyncio.to_thread(lambda: [self._get_from_disk(key) for key in disk_keys])
+            for key, vector in zip(disk_keys, disk_vectors):
+                if vector is not None:
+                    self._count("disk_hits")
+                    self.memory.set(key, vector)
+                    vectors[key] = vector
+
+        missing = [key for key in disk_keys if key not in vectors]
+        if missing:
+            self._count("misses", len(missing))
+            computed = await compute_many_coro_fn([texts_by_key[key] for key in missing])
+            for key, vector in zip(missing, computed):
+                self.memory.set(key, vector)
+                vectors[key] = vector
+            await asyncio.to_thread(lambda: [self._set_to_disk(key, vectors[key]) for key in missing])
+
+        return [vectors[key] for key in keys]
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        stats = {
+            "pid": os.getpid(),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "disk_errors": self.disk_errors,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory": self.memory.stats()
+        }
+        if self.disk is not None:
+            try:
+                disk_entries = self.disk.count()
+            except (sqlite3.Error, OSError):
+                disk_entries = None
+            stats["disk"] = {
+                "path": self.disk.path,
+                "entries": disk_entries,
+                "max_entries": self.disk.max_entries,
+                "evictions": self.disk.evictions
+            }
+        return stats
+
+
+embedding_cache = EmbeddingCache(
+    memory_size=EMBEDDING_CACHE_MEMORY_SIZE,
+    disk_path=EMBEDDING_CACHE_PATH,
+    disk_max_entries=EMBEDDING_CACHE_DISK_MAX_ENTRIES
+)
+
+
+async def get_cached_embedding_async(text, deployment_name, compute_coro_fn):
+    """EMBEDDING_CACHE_ENABLED が false の場合はキャッシュを経由せずに計算する"""
+    if not EMBEDDING_CACHE_ENABLED:
+        return await compute_coro_fn(text)
+    return await embedding_cache.aget_or_compute(text, deployment_name, compute_coro_fn)
+
+
+async def get_cached_embeddings_async(texts, deployment_name, compute_many_coro_fn):
+    """get_cached_embedding_async の複数件版（compute_many_coro_fn はテキストのリストを受け取る）"""
+    if not EMBEDDING_CACHE_ENABLED:
+        return await compute_many_coro_fn(list(texts))
+    return await embedding_cache.aget_or_compute_many(texts, deployment_name, compute_many_coro_fn)
+
+
+def get_embedding_cache_stats():
+    return {"enabled": EMBEDDING_CACHE_ENABLED, **embedding_cache.stats()}
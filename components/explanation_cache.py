@@ -0,0 +1,40 @@
+import os
+import json
+import hashlib
+
+from components.cache import LRUCache
+
+# 説明文キャッシュの設定（temperature=0.0 のため同一プロンプトの結果は再利用できる）
+EXPLANATION_CACHE_ENABLED = os.getenv("EXPLANATION_CACHE_ENABLED", "true").lower() == "true"
+EXPLANATION_CACHE_SIZE = int(os.getenv("EXPLANATION_CACHE_SIZE", "5000"))
+EXPLANATION_CACHE_TTL = float(os.getenv("EXPLANATION_CACHE_TTL", "86400"))
+
+explanation_cache = LRUCache(maxsize=EXPLANATION_CACHE_SIZE, ttl=EXPLANATION_CACHE_TTL)
+
+
+def make_explanation_key(pattern, researcher_id, messages):
+    """
+    パターン・研究者ID・プロンプト全体のハッシュからキャッシュキーを作る
+
+    プロンプトには依頼内容と研究者のキーワード・研究課題・論文が含まれるため、
+    それらが変わればキーも変わり、古い説明文は使われなくなる。
+    """
+    prompt_hash = hashlib.sha256(
+        json.dumps(messages, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    return f"{pattern}:{researcher_id}:{prompt_hash}"
+
+
+def get_cached_explanation(key):
+    if not EXPLANATION_CACHE_ENABLED:
+        return None
+    return explanation_cache.get(key)
+
+
+def set_cached_explanation(key, explanation):
+    if EXPLANATION_CACHE_ENABLED:
+        explanation_cache.set(key, explanation)
+
+
+def get_explanation_cache_stats():
+    return {"enabled": EXPLANATION_CACHE_ENABLED, "pid": os.getpid(), **explanation_cache.stats()}
@@ -0,0 +1,279 @@
+import os
+import re
+import math
+import time
+import threading
+import unicodedata
+from collections import Counter
+
+from sqlalchemy import select
+
+from database import ReadSessionLocal
+import models
+
+# キーワード検索用の全文インデックス（ワーカーごとにメモリへ保持）
+FULLTEXT_INDEX_ENABLED = os.getenv("FULLTEXT_INDEX_ENABLED", "true").lower() == "true"
+# 新規追加分の差分取り込みの間隔（秒）
+FULLTEXT_REFRESH_INTERVAL = float(os.getenv("FULLTEXT_REFRESH_INTERVAL", "60"))
+# 既存行の更新を反映するための再構築の間隔（秒）
+FULLTEXT_FULL_REBUILD_INTERVAL = float(os.getenv("FULLTEXT_FULL_REBUILD_INTERVAL", "1800"))
+
+_SEPARATOR = re.compile(r"[\W_]+")
+
+
+def tokenize(text):
+    """
+    文字バイグラムに分割する（日本語は分かち書きせずにそのまま部分一致に近い検索ができる）
+    記号・空白で区切った1文字だけの断片は、その1文字をトークンにする
+    """
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    tokens = []
+    for segment in _SEPARATOR.split(text):
+        if len(segment) == 1:
+            tokens.append(segment)
+        else:
+            tokens.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+    return tokens
+
+
+def is_indexable_query(query):
+    """
+    バイグラムで検索できるクエリかどうか
+    1文字だけの断片を含むクエリは文中の出現を拾えないため、LIKE検索に任せる
+    """
+    text = unicodedata.normalize("NFKC", query or "").lower()
+    segments = [segment for segment in _SEPARATOR.split(text) if segment]
+    return bool(segments) and all(len(segment) >= 2 for segment in segments)
+
+
+class BigramIndex:
+    """
+    バイグラムの転置インデックス
+
+    postings: トークン -> {ドキュメントID: フィールド重み付きの出現回数}
+    検索はクエリの全トークンを含むドキュメントを対象に TF-IDF の合計でスコアを付ける
+    """
+
+    def __init__(self, field_weights):
+        self.field_weights = field_weights
+        self.postings = {}
+        self.doc_tokens = {}
+        self._lock = threading.RLock()
+
+    def _remove(self, doc_id):
+        for token in self.doc_tokens.pop(doc_id, ()):
+            docs = self.postings.get(token)
+            if docs is not None:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self.postings[token]
+
+    def upsert(self, doc_id, fields):
+        """ドキュメントを追加する（既に存在する場合は置き換える）"""
+        weighted = Counter()
+        for field, weight in self.field_weights.items():
+            for token, count in Counter(tokenize(fields.get(field))).items():
+                weighted[token] += count * weight
+
+        with self._lock:
+            self._remove(doc_id)
+            for token, tf in weighted.items():
+                self.postings.setdefault(token, {})[doc_id] = tf
+            self.doc_tokens[doc_id] = tuple(weighted)
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def __len__(self):
+        return len(self.doc_tokens)
+
+    def search(self, query, limit=None):
+        """
+        関連度の高い順に (ドキュメントID, スコア) のリストを返す
+        """
+        query_tokens = list(dict.fromkeys(tokenize(query)))
+        if not query_tokens:
+            return []
+
+        with self._lock:
+            postings = [self.postings.get(token) for token in query_tokens]
+            if any(docs is None for docs in postings):
+                return []
+
+            doc_count = len(self.doc_tokens)
+            # 出現ドキュメントの少ないトークンから絞り込む
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for docs in postings[1:]:
+                candidates.intersection_update(docs)
+                if not candidates:
+                    return []
+
+            scores = dict.fromkeys(candidates, 0.0)
+            for docs in postings:
+                idf = math.log(1 + doc_count / len(docs))
+                for doc_id in candidates:
+                    scores[doc_id] += docs[doc_id] * idf
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit] if limit else ranked
+
+
+class TableFullTextIndex:
+    """
+    テーブルの指定列に対する全文インデックス
+
+    - 起動時に全件からインデックスを構築する
+    - バックグラウンドで主キーの最大値より大きい行（新規追加分）を定期的に取り込む
+    - 既存行の更新は定期的な再構築で反映する（index_row で個別に反映することもできる）
+    """
+
+    def __init__(self, name, model, id_column, field_weights):
+        self.name = name
+        self.model = model
+        self.id_column = id_column
+        self.field_weights = field_weights
+        self.index = BigramIndex(field_weights)
+        self.loaded = False
+        self.max_id = None
+        self.last_build_at = None
+        self.last_refresh_at = None
+        self.builds = 0
+        self.incremental_refreshes = 0
+        self.incremental_rows = 0
+        self.refresh_failures = 0
+        self.last_error = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _query(self):
+        columns = [getattr(self.model, self.id_column)]
+        columns.extend(getattr(self.model, field) for field in self.field_weights)
+        return select(*columns)
+
+    def index_row(self, row, index=None):
+        """1行分をインデックスに反映する（行は id_column と field_weights の列を持つこと）"""
+        index = index or self.index
+        doc_id = getattr(row, self.id_column)
+        index.upsert(doc_id, {field: getattr(row, field) for field in self.field_weights})
+        if self.max_id is None or doc_id > self.max_id:
+            self.max_id = doc_id
+
+    def build(self):
+        """全件からインデックスを作り直し、完成後に置き換える"""
+        index = BigramIndex(self.field_weights)
+        with ReadSessionLocal() as db:
+            rows = db.execute(self._query()).all()
+        self.max_id = None
+        for row in rows:
+            self.index_row(row, index)
+        self.index = index
+        self.loaded = True
+        self.builds += 1
+        self.last_build_at = time.time()
+        self.last_refresh_at = self.last_build_at
+
+    def refresh_incremental(self):
+        """前回取り込んだ最大IDより後に追加された行だけを取り込む"""
+        query = self._query()
+        if self.max_id is not None:
+            query = query.where(getattr(self.model, self.id_column) > self.max_id)
+        with ReadSessionLocal() as db:
+            rows = db.execute(query).all()
+        for row in rows:
+            self.index_row(row)
+        self.incremental_refreshes += 1
+        self.incremental_rows += len(rows)
+        self.last_refresh_at = time.time()
+
+    def search(self, keyword, limit=None):
+        """
+        関連度順の (ID, スコア) のリストを返す
+        インデックス未構築・バイグラムで検索できないクエリの場合は None（呼び出し側でLIKE検索する）
+        """
+        if not FULLTEXT_INDEX_ENABLED or not self.loaded or not is_indexable_query(keyword):
+            return None
+        return self.index.search(keyword, limit)
+
+    def _refresh_loop(self):
+        while not self._stop.wait(FULLTEXT_REFRESH_INTERVAL):
+            try:
+                if not self.loaded or time.time() - self.last_build_at >= FULLTEXT_FULL_REBUILD_INTERVAL:
+                    self.build()
+                else:
+                    self.refresh_incremental()
+            except Exception as e:
+                print(f"全文インデックス（{self.name}）の更新に失敗:", e)
+                self.refresh_failures += 1
+                self.last_error = str(e)
+
+    def start(self):
+        """初回の構築とバックグラウンド更新スレッドを開始する"""
+        try:
+            self.build()
+        except Exception as e:
+            # 構築に失敗した間は、各エンドポイントがLIKE検索にフォールバックする
+            print(f"全文インデックス（{self.name}）の初回構築に失敗:", e)
+            self.refresh_failures += 1
+            self.last_error = str(e)
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._refresh_loop, name=f"fulltext-{self.name}", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        now = time.time()
+        return {
+            "loaded": self.loaded,
+            "documents": len(self.index),
+            "tokens": len(self.index.postings),
+            "max_id": self.max_id,
+            "build_age_seconds": now - self.last_build_at if self.last_build_at else None,
+            "refresh_age_seconds": now - self.last_refresh_at if self.last_refresh_at else None,
+            "builds": self.builds,
+            "incremental_refreshes": self.incremental_refreshes,
+            "incremental_rows": self.incremental_rows,
+            "refresh_failures": self.refresh_failures,
+            "last_error": self.last_error
+        }
+
+
+# タイトルの一致を本文より重く評価する
+research_project_index = TableFullTextIndex(
+    "research_projects",
+    models.ResearchProject,
+    "id",
+    {"research_project_title": 3, "research_field": 2, "research_project_details": 1}
+)
+
+project_index = TableFullTextIndex(
+    "project_information",
+    models.Project,
+    "project_id",
+    {"project_title": 3, "research_field": 2, "project_content": 1}
+)
+
+FULLTEXT_INDEXES = (research_project_index, project_index)
+
+
+def start_fulltext_indexes():
+    if FULLTEXT_INDEX_ENABLED:
+        for index in FULLTEXT_INDEXES:
+            index.start()
+
+
+def stop_fulltext_indexes():
+    for index in FULLTEXT_INDEXES:
+        index.stop()
+
+
+def get_fulltext_index_stats():
+    return {
+        "enabled": FULLTEXT_INDEX_ENABLED,
+        "pid": os.getpid(),
+        "indexes": {index.name: index.stats() for index in FULLTEXT_INDEXES}
+    }
@@ -0,0 +1,414 @@
+import os
+import json
+import math
+import time
+import heapq
+import argparse
+import threading
+
+import numpy as np
+
+from components.cache import LRUCache
+
+# Azure AI Search の代わりにプロセス内で検索するローカルのベクトルインデックス
+# SEARCH_BACKEND=local のとき、search_researchers_pattern_* のベクトル検索をこのインデックスで行う
+#
+# スナップショットは Azure AI Search のインデックスから次のコマンドで書き出す
+# （ベクトルフィールドが retrievable であること。--university で1大学分に絞れる）:
+#     python -m components.local_vector_index export --output local_index_snapshot.npz --university 東京科学大学
+#
+# - 件数が LOCAL_INDEX_HNSW_MIN_SIZE 未満のパターンは NumPy の総当たり（行列積1回）で検索する
+# - それ以上のパターンは読み込み後にバックグラウンドで HNSW グラフを構築し、構築後はグラフで検索する
+# - 大学での絞り込みは所属ごとに事前計算したマスクで行う
+#   （Azure の search.ismatch の代わりに所属の部分一致で判定する）
+
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "azure").lower()
+LOCAL_INDEX_SNAPSHOT_PATH = os.getenv("LOCAL_INDEX_SNAPSHOT_PATH", "local_index_snapshot.npz")
+LOCAL_INDEX_HNSW_MIN_SIZE = int(os.getenv("LOCAL_INDEX_HNSW_MIN_SIZE", "20000"))
+LOCAL_INDEX_HNSW_M = int(os.getenv("LOCAL_INDEX_HNSW_M", "16"))
+LOCAL_INDEX_HNSW_EF_CONSTRUCTION = int(os.getenv("LOCAL_INDEX_HNSW_EF_CONSTRUCTION", "100"))
+LOCAL_INDEX_HNSW_EF_SEARCH = int(os.getenv("LOCAL_INDEX_HNSW_EF_SEARCH", "64"))
+# 絞り込み後の件数がこの割合未満なら、グラフではなく総当たりで検索する（グラフ探索では候補が足りなくなるため）
+LOCAL_INDEX_FILTER_BRUTE_FORCE_RATIO = float(os.getenv("LOCAL_INDEX_FILTER_BRUTE_FORCE_RATIO", "0.1"))
+# パターンごとにキャッシュする大学名のマスクの最大件数（大学名はクエリパラメータのため上限を設ける）
+LOCAL_INDEX_UNIVERSITY_MASK_CACHE_SIZE = int(os.getenv("LOCAL_INDEX_UNIVERSITY_MASK_CACHE_SIZE", "256"))
+
+AFFILIATION_FIELD = "researcher_affiliation_current"
+
+
+def use_local_backend():
+    return SEARCH_BACKEND == "local"
+
+
+def _normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return (vectors / norms).astype(np.float32)
+
+
+def _search_score(similarity):
+    """コサイン類似度を Azure AI Search の @search.score（1 / (1 + コサイン距離)）に換算する"""
+    return 1.0 / (2.0 - similarity)
+
+
+class HnswGraph:
+    """
+    正規化済みベクトルの内積（コサイン類似度）で探索する HNSW グラフ
+
+    上位の層ほど疎なグラフをたどって入口を絞り込み、最下層で ef 件の候補を探索する。
+    隣接ノードとの類似度はまとめて行列積で計算する。
+    """
+
+    def __init__(self, vectors, m=LOCAL_INDEX_HNSW_M, ef_construction=LOCAL_INDEX_HNSW_EF_CONSTRUCTION, seed=42):
+        self.vectors = vectors
+        self.m = m
+        self.max_links_level0 = 2 * m
+        self.ef_construction = ef_construction
+        self.level_multiplier = 1 / math.log(m)
+        self.rng = np.random.default_rng(seed)
+        # links[層][ノード] -> 隣接ノードのリスト
+        self.links = []
+        self.entry_point = None
+        self.max_level = -1
+
+    def build(self, stop_event=None):
+        for node in range(len(self.vectors)):
+            if stop_event is not None and stop_event.is_set():
+                return False
+            self._insert(node)
+        return True
+
+    def _search_layer(self, query, entry_points, ef, level):
+        """1つの層で query に近い順に最大 ef 件の (類似度, ノード) を返す"""
+        visited = set(entry_points)
+        similarities = (self.vectors[entry_points] @ query).tolist()
+        candidates = [(-similarity, node) for similarity, node in zip(similarities, entry_points)]
+        heapq.heapify(candidates)
+        results = [(similarity, node) for similarity, node in zip(similarities, entry_points)]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        layer = self.links[level]
+        while candidates:
+            negative_similarity, node = heapq.heappop(candidates)
+            if -negative_similarity < results[0][0] and len(results) >= ef:
+                break
+            neighbors = [neighbor for neighbor in layer.get(node, ()) if neighbor not in visited]
+            if not neighbors:
+                continue
+            visited.update(neighbors)
+            for similarity, neighbor in zip((self.vectors[neighbors] @ query).tolist(), neighbors):
+                if len(results) < ef or similarity > results[0][0]:
+                    heapq.heappush(candidates, (-similarity, neighbor))
+                    heapq.heappush(results, (similarity, neighbor))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        return sorted(results, reverse=True)
+
+    def _select_neighbors(self, found, m):
+        """
+        近い順の候補から、既に選んだノードより query に近いものを優先して m 件選ぶ（HNSW のヒューリスティック）
+        足りない分は近い順に補う
+        """
+        selected = []
+        for similarity, node in found:
+            if len(selected) >= m:
+                break
+            if selected and float((self.vectors[selected] @ self.vectors[node]).max()) > similarity:
+                continue
+            selected.append(node)
+        if len(selected) < m:
+            chosen = set(selected)
+            selected.extend([node for _, node in found if node not in chosen][:m - len(selected)])
+        return selected
+
+    def _prune(self, node, neighbors, max_links):
+        similarities = self.vectors[neighbors] @ self.vectors[node]
+        keep = np.argsort(-similarities)[:max_links]
+        return [neighbors[i] for i in keep]
+
+    def _insert(self, node):
+        query = self.vectors[node]
+        level = int(-math.log(1 - self.rng.random()) * self.level_multiplier)
+        while len(self.links) <= level:
+            self.links.append({})
+
+        if self.entry_point is None:
+            for lc in range(level + 1):
+                self.links[lc][node] = []
+            self.entry_point = node
+            self.max_level = level
+            return
+
+        entry_points = [self.entry_point]
+        for lc in range(self.max_level, level, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, lc)[0][1]]
+
+        for lc in range(min(level, self.max_level), -1, -1):
+            found = self._search_layer(query, entry_points, self.ef_construction, lc)
+            max_links = self.max_links_level0 if lc == 0 else self.m
+            neighbors = self._select_neighbors(found, self.m)
+            self.links[lc][node] = neighbors
+            for neighbor in neighbors:
+                neighbor_links = self.links[lc][neighbor]
+                neighbor_links.append(node)
+                if len(neighbor_links) > max_links:
+                    self.links[lc][neighbor] = self._prune(neighbor, neighbor_links, max_links)
+            entry_points = [candidate for _, candidate in found]
+
+        for lc in range(self.max_level + 1, level + 1):
+            self.links[lc][node] = []
+        if level > self.max_level:
+            self.entry_point = node
+            self.max_level = level
+
+    def search(self, query, ef):
+        """近い順に最大 ef 件の (類似度, ノード) を返す"""
+        if self.entry_point is None:
+            return []
+        entry_points = [self.entry_point]
+        for lc in range(self.max_level, 0, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, lc)[0][1]]
+        return self._search_layer(query, entry_points, ef, 0)
+
+
+class PatternIndex:
+    """1パターン分のベクトル・ドキュメント・所属マスク"""
+
+    def __init__(self, pattern, vectors, documents):
+        self.pattern = pattern
+        self.vectors = _normalize_rows(vectors)
+        self.documents = documents
+        self.by_key = {document["id"]: document for document in documents}
+        self.graph = None
+
+        # 所属ごとのマスクを事前計算し、大学名ごとのマスクはそれらの論理和として初回に作ってキャッシュする
+        # （キャッシュはこのインデックスに属するため、スナップショットを読み直すと新しいインデックスごと作り直される）
+        affiliations = np.array([document.get(AFFILIATION_FIELD) or "" for document in documents], dtype=object)
+        self.affiliation_masks = {
+            affiliation: affiliations == affiliation for affiliation in set(affiliations.tolist())
+        }
+        self.university_masks = LRUCache(maxsize=LOCAL_INDEX_UNIVERSITY_MASK_CACHE_SIZE)
+
+    def __len__(self):
+        return len(self.documents)
+
+    def university_mask(self, university):
+        university = (university or "").strip()
+        if not university:
+            return None
+        mask = self.university_masks.get(university)
+        if mask is None:
+            mask = np.zeros(len(self.documents), dtype=bool)
+            for affiliation, affiliation_mask in self.affiliation_masks.items():
+                if university in affiliation:
+                    mask |= affiliation_mask
+            self.university_masks.set(university, mask)
+        return mask
+
+    def _brute_force(self, query, top_k, mask):
+        similarities = self.vectors @ query
+        if mask is not None:
+            similarities = np.where(mask, similarities, -np.inf)
+        k = min(top_k, len(similarities))
+        if k <= 0:
+            return []
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        return [(float(similarities[i]), int(i)) for i in top if np.isfinite(similarities[i])]
+
+    def _graph_search(self, query, top_k, mask):
+        ef = max(LOCAL_INDEX_HNSW_EF_SEARCH, top_k)
+        while True:
+            found = self.graph.search(query, ef)
+            if mask is not None:
+                found = [(similarity, node) for similarity, node in found if mask[node]]
+            # 絞り込みで件数が足りない場合は探索範囲を広げる
+            if len(found) >= top_k or ef >= len(self.documents):
+                return found[:top_k]
+            ef *= 2
+
+    def search(self, embedding, top_k, university=None):
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        mask = self.university_mask(university)
+
+        graph = self.graph
+        if graph is None or (
+            mask is not None and mask.sum() < LOCAL_INDEX_FILTER_BRUTE_FORCE_RATIO * len(self.documents)
+        ):
+            found = self._brute_force(query, top_k, mask)
+        else:
+            found = self._graph_search(query, top_k, mask)
+
+        return [dict(self.documents[node], **{"@search.score": _search_score(similarity)}) for similarity, node in found]
+
+
+def load_snapshot(path):
+    """スナップショット（.npz）を読み込み、パターン -> PatternIndex の辞書を返す"""
+    patterns = {}
+    with np.load(path, allow_pickle=False) as snapshot:
+        for name in snapshot.files:
+            if not name.startswith("vectors_"):
+                continue
+            pattern = name[len("vectors_"):]
+            documents = json.loads(snapshot[f"documents_{pattern}"].tobytes().decode("utf-8"))
+            patterns[pattern] = PatternIndex(pattern, snapshot[name], documents)
+    return patterns
+
+
+class LocalVectorIndex:
+    """
+    スナップショットから読み込んだ全パターンのローカルインデックス
+
+    - 読み込み直後から総当たりで検索でき、大きいパターンは HNSW グラフの構築後にグラフ検索へ切り替わる
+    - 未読み込みの状態で検索された場合はその場で読み込む（アプリ外からこのモジュールの検索を直接使う場合）
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.patterns = None
+        self.loaded_at = None
+        self.load_seconds = None
+        self.graph_build_seconds = {}
+        self.last_error = None
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def load(self):
+        started = time.perf_counter()
+        patterns = load_snapshot(self.path)
+        self.patterns = patterns
+        self.loaded_at = time.time()
+        self.load_seconds = time.perf_counter() - started
+
+    def ensure_loaded(self):
+        if self.patterns is None:
+            with self._load_lock:
+                if self.patterns is None:
+                    self.load()
+        return self.patterns
+
+    def _build_graphs(self):
+        for pattern, index in sorted(self.patterns.items()):
+            if len(index) < LOCAL_INDEX_HNSW_MIN_SIZE:
+                continue
+            started = time.perf_counter()
+            graph = HnswGraph(index.vectors)
+            if not graph.build(self._stop):
+                return
+            index.graph = graph
+            self.graph_build_seconds[pattern] = time.perf_counter() - started
+
+    def start(self):
+        """スナップショットを読み込み、必要なパターンの HNSW グラフをバックグラウンドで構築する"""
+        try:
+            self.ensure_loaded()
+        except Exception as e:
+            # 読み込みに失敗した間は、検索が例外になる
+            print("ローカルベクトルインデックスの読み込みに失敗:", e)
+            self.last_error = str(e)
+            return
+
+        if self._thread is None and any(len(index) >= LOCAL_INDEX_HNSW_MIN_SIZE for index in self.patterns.values()):
+            self._thread = threading.Thread(target=self._build_graphs, name="local-vector-index", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def search(self, pattern, embedding, university, top_k):
+        """Azure AI Search のベクトル検索と同じ形式（select したフィールド + @search.score）のヒットを返す"""
+        index = self.ensure_loaded().get(pattern)
+        if index is None:
+            raise ValueError(f"Pattern {pattern} is not in the local index snapshot")
+        return index.search(embedding, top_k, university)
+
+    def get_document(self, pattern, document_key):
+        index = self.ensure_loaded().get(pattern)
+        document = index.by_key.get(document_key) if index is not None else None
+        if document is None:
+            raise KeyError(f"Document {document_key} is not in the local index snapshot")
+        return dict(document)
+
+    def stats(self):
+        patterns = self.patterns or {}
+        return {
+            "backend": SEARCH_BACKEND,
+            "pid": os.getpid(),
+            "snapshot_path": self.path,
+            "loaded": self.patterns is not None,
+            "load_seconds": self.load_seconds,
+            "patterns": {
+                pattern: {
+                    "documents": len(index),
+                    "dimensions": int(index.vectors.shape[1]) if len(index) else None,
+                    "method": "hnsw" if index.graph is not None else "brute_force",
+                    "graph_build_seconds": self.graph_build_seconds.get(pattern),
+                    "university_masks": index.university_masks.stats()
+                }
+                for pattern, index in sorted(patterns.items())
+            },
+            "last_error": self.last_error
+        }
+
+
+local_vector_index = LocalVectorIndex(LOCAL_INDEX_SNAPSHOT_PATH)
+
+
+def export_snapshot(path, university=None):
+    """
+    Azure AI Search の各パターンのインデックスからベクトルと select 対象のフィールドを書き出す
+
+    Returns:
+    dict: パターン -> 書き出した件数
+    """
+    from azure.core.credentials import AzureKeyCredential
+    from azure.search.documents import SearchClient
+    from components.search_researchers import PATTERN_CONFIG
+
+    arrays = {}
+    counts = {}
+    for pattern, config in PATTERN_CONFIG.items():
+        search_kwargs = {"search_text": "*", "select": config["select"] + [config["vector_field"]]}
+        if university:
+            search_kwargs["filter"] = f"search.ismatch('{university}', '{AFFILIATION_FIELD}')"
+
+        vectors = []
+        documents = []
+        search_client = SearchClient(
+            endpoint=os.getenv("AZURE_SEARCH_ENDPOINT"),
+            index_name=config["index_name"],
+            credential=AzureKeyCredential(os.getenv("AZURE_SEARCH_API_KEY"))
+        )
+        for result in search_client.search(**search_kwargs):
+            vector = result.get(config["vector_field"])
+            if not vector:
+                continue
+            vectors.append(vector)
+            documents.append({field: result.get(field) for field in config["select"]})
+
+        arrays[f"vectors_{pattern}"] = np.asarray(vectors, dtype=np.float32)
+        arrays[f"documents_{pattern}"] = np.frombuffer(
+            json.dumps(documents, ensure_ascii=False).encode("utf-8"), dtype=np.uint8
+        )
+        counts[pattern] = len(documents)
+
+    np.savez(path, **arrays)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ローカルベクトルインデックスのスナップショット")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Azure AI Search からスナップショットを書き出す")
+    export_parser.add_argument("--output", default=LOCAL_INDEX_SNAPSHOT_PATH)
+    export_parser.add_argument("--university")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        print("Exported:", export_snapshot(args.output, args.university), "->", args.output)
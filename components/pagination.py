@@ -0,0 +1,68 @@
+import os
+import json
+import base64
+
+from components.cache import LRUCache
+from components.timing import stage
+
+# 1ページあたりの件数の上限
+MAX_PER_PAGE = int(os.getenv("MAX_PER_PAGE", "100"))
+# 総件数のキャッシュ有効期間（秒）。この間隔で count() を取り直す
+TOTAL_COUNT_TTL = float(os.getenv("TOTAL_COUNT_TTL", "300"))
+
+_total_counts = LRUCache(maxsize=64, ttl=TOTAL_COUNT_TTL)
+
+
+def clamp_per_page(per_page):
+    """per_page を 1〜MAX_PER_PAGE の範囲に収める"""
+    return max(1, min(per_page, MAX_PER_PAGE))
+
+
+def encode_cursor(last_id):
+    """次ページの開始位置（直前ページの最後のID）を不透明なトークンにする"""
+    payload = json.dumps({"after": last_id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """encode_cursor で作ったトークンから直前ページの最後のIDを取り出す。不正な場合は ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded))["after"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+async def keyset_page_async(db, statement, id_column, per_page, cursor=None):
+    """
+    主キーの範囲条件でページを取得する（OFFSET を使わないため、深いページでもコストが変わらない）
+    db は AsyncSession、statement は id_column を含む列を select した Core のクエリで、行は dict で返す
+
+    Returns:
+    tuple: (行のリスト, 次ページのカーソル。最終ページの場合は None)
+    """
+    if cursor:
+        statement = statement.where(id_column > decode_cursor(cursor))
+    with stage("db"):
+        result = await db.execute(statement.order_by(id_column).limit(per_page + 1))
+    rows = [dict(row) for row in result.mappings().all()]
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1][id_column.key])
+    return rows, next_cursor
+
+
+async def cached_total_async(key, count_fn):
+    """
+    総件数を TOTAL_COUNT_TTL 秒間キャッシュする（count_fn はコルーチン関数）
+
+    Returns:
+    int: キャッシュ済みまたは count_fn() で取り直した件数
+    """
+    total = _total_counts.get(key)
+    if total is None:
+        total = await count_fn()
+        _total_counts.set(key, total)
+    return total
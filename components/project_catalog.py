@@ -0,0 +1,304 @@
+import os
+import time
+import bisect
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from database import ReadSessionLocal
+from components.project_normalization import parse_budget, parse_deadline
+import models
+
+# /matting-projects 用の案件カタログ（企業名を結合済みの案件一覧をワーカーごとにメモリへ保持）
+PROJECT_CATALOG_ENABLED = os.getenv("PROJECT_CATALOG_ENABLED", "true").lower() == "true"
+# 全件再読み込みの間隔（秒）。案件・企業名の更新はこの間隔で反映される
+PROJECT_CATALOG_REFRESH_INTERVAL = float(os.getenv("PROJECT_CATALOG_REFRESH_INTERVAL", "60"))
+# 研究分野ファセットで返す件数の上限
+PROJECT_CATALOG_FIELD_FACET_LIMIT = int(os.getenv("PROJECT_CATALOG_FIELD_FACET_LIMIT", "50"))
+
+CATALOG_COLUMNS = (
+    "project_id",
+    "project_title",
+    "project_content",
+    "research_field",
+    "project_status",
+    "budget",
+    "preferred_researcher_level",
+    "application_deadline"
+)
+
+
+class ProjectEntry:
+    """案件1件分（__slots__ でメモリを節約する）"""
+
+    __slots__ = CATALOG_COLUMNS + ("company_name", "budget_yen", "deadline_at", "search_text")
+
+    def __init__(self, row):
+        for column in CATALOG_COLUMNS:
+            setattr(self, column, getattr(row, column))
+        self.company_name = row.company_name
+        self.budget_yen = parse_budget(self.budget)
+        self.deadline_at = parse_deadline(self.application_deadline)
+        # 全文インデックスが使えない場合の部分一致検索用
+        self.search_text = "\n".join(
+            (value or "").lower() for value in (self.project_title, self.project_content, self.research_field)
+        )
+
+    def to_dict(self):
+        """/matting-projects のレスポンス形式"""
+        return {
+            "project_id": self.project_id,
+            "project_title": self.project_title,
+            "project_content": self.project_content,
+            "research_field": self.research_field,
+            "project_status": self.project_status,
+            "budget": self.budget,
+            "preferred_researcher_level": self.preferred_researcher_level,
+            "application_deadline": self.application_deadline,
+            "company_name": self.company_name
+        }
+
+
+def _catalog_query():
+    columns = [getattr(models.Project, column) for column in CATALOG_COLUMNS]
+    return (
+        select(*columns, models.Company.company_name)
+        .join(models.CompanyUser, models.Project.company_user_id == models.CompanyUser.company_user_id)
+        .join(models.Company, models.CompanyUser.company_id == models.Company.company_id)
+    )
+
+
+class CatalogSnapshot:
+    """
+    ある時点の案件一覧と、ファセット用の事前計算済みインデックス
+
+    - budget_buckets: 予算の下限（円）-> その下限以上の案件IDの集合
+    - deadline_keys / deadline_ids: 締切日時の昇順に並べた配列（締切が基準日以前の案件を bisect で切り出す）
+    - field_ids: 研究分野 -> 案件IDの集合
+    読み込み後は変更しないため、ロックなしで検索できる
+    """
+
+    def __init__(self, entries, budget_minimums):
+        self.entries = {entry.project_id: entry for entry in entries}
+        self.all_ids = frozenset(self.entries)
+
+        self.budget_buckets = {
+            min_yen: frozenset(
+                entry.project_id for entry in entries
+                if entry.budget_yen is not None and entry.budget_yen >= min_yen
+            )
+            for min_yen in budget_minimums
+        }
+
+        dated = sorted(
+            ((entry.deadline_at, entry.project_id) for entry in entries if entry.deadline_at is not None)
+        )
+        self.deadline_keys = [deadline_at for deadline_at, _ in dated]
+        self.deadline_ids = [project_id for _, project_id in dated]
+
+        field_ids = {}
+        for entry in entries:
+            field = (entry.research_field or "").strip()
+            if field:
+                field_ids.setdefault(field, set()).add(entry.project_id)
+        self.field_ids = {field: frozenset(ids) for field, ids in field_ids.items()}
+
+    def budget_set(self, min_yen):
+        if min_yen is None:
+            return self.all_ids
+        bucket = self.budget_buckets.get(min_yen)
+        if bucket is None:
+            bucket = frozenset(
+                project_id for project_id, entry in self.entries.items()
+                if entry.budget_yen is not None and entry.budget_yen >= min_yen
+            )
+        return bucket
+
+    def deadline_set(self, deadline_date):
+        if deadline_date is None:
+            return self.all_ids
+        return frozenset(self.deadline_ids[:bisect.bisect_right(self.deadline_keys, deadline_date)])
+
+    def deadline_counts(self, ids, deadline_dates):
+        """
+        ids のうち締切が各基準日以前の案件数（基準日が None の場合は ids の件数）
+        ids の締切を1回だけ並べ替え、基準日ごとの件数は bisect で求める
+        """
+        keys = sorted(
+            self.entries[project_id].deadline_at for project_id in ids
+            if self.entries[project_id].deadline_at is not None
+        )
+        return [
+            len(ids) if deadline_date is None else bisect.bisect_right(keys, deadline_date)
+            for deadline_date in deadline_dates
+        ]
+
+    def field_set(self, research_field):
+        if not research_field:
+            return self.all_ids
+        return self.field_ids.get(research_field.strip(), frozenset())
+
+    def keyword_set(self, keyword):
+        """部分一致（大文字小文字を区別しない）で案件IDを絞り込む"""
+        needle = keyword.lower()
+        return frozenset(
+            project_id for project_id, entry in self.entries.items() if needle in entry.search_text
+        )
+
+
+class ProjectCatalog:
+    """
+    案件カタログ
+
+    - 起動時と PROJECT_CATALOG_REFRESH_INTERVAL 秒ごとに、企業名を結合した全件を1回のクエリで読み込む
+    - 絞り込みは事前計算済みの集合の積で行い、ファセットごとの件数も同時に返す
+    - 読み込み前・無効時は None を返し、呼び出し側がDB検索にフォールバックする
+    """
+
+    def __init__(self, budget_ranges, deadline_ranges):
+        self.budget_ranges = budget_ranges
+        self.deadline_ranges = deadline_ranges
+        self.snapshot = None
+        self.last_load_at = None
+        self.loads = 0
+        self.refresh_failures = 0
+        self.last_error = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def loaded(self):
+        return self.snapshot is not None
+
+    def load(self):
+        """全件を読み込み、スナップショットを丸ごと置き換える"""
+        with ReadSessionLocal() as db:
+            rows = db.execute(_catalog_query()).all()
+        entries = [ProjectEntry(row) for row in rows]
+        budget_minimums = [min_yen for min_yen in self.budget_ranges.values() if min_yen is not None]
+        self.snapshot = CatalogSnapshot(entries, budget_minimums)
+        self.loads += 1
+        self.last_load_at = time.time()
+
+    def _facet_counts(self, snapshot, keyword_ids, budget_ids, deadline_ids, field_ids, now):
+        """
+        各ファセットの件数（そのファセット以外の条件で絞り込んだ集合との積の大きさ）
+        """
+        without_budget = keyword_ids & deadline_ids & field_ids
+        without_deadline = keyword_ids & budget_ids & field_ids
+        without_field = keyword_ids & budget_ids & deadline_ids
+
+        budget_counts = {
+            label: len(without_budget & snapshot.budget_set(min_yen))
+            for label, min_yen in self.budget_ranges.items()
+        }
+        deadline_counts = dict(zip(
+            self.deadline_ranges,
+            snapshot.deadline_counts(without_deadline, [
+                now + timedelta(days=days) if days is not None else None
+                for days in self.deadline_ranges.values()
+            ])
+        ))
+        field_counts = sorted(
+            (
+                {"research_field": field, "count": len(without_field & ids)}
+                for field, ids in snapshot.field_ids.items()
+            ),
+            key=lambda item: (-item["count"], item["research_field"])
+        )
+        return {
+            "budget_range": budget_counts,
+            "deadline_range": deadline_counts,
+            "research_field": [item for item in field_counts if item["count"]][:PROJECT_CATALOG_FIELD_FACET_LIMIT]
+        }
+
+    def search(self, keyword_scores=None, keyword=None, budget_range=None, deadline_range=None,
+               research_field=None, limit=10):
+        """
+        カタログから案件を絞り込む
+
+        Parameters:
+        keyword_scores: 全文インデックスの (案件ID -> 関連度)。None の場合は keyword の部分一致で絞り込む
+        keyword: キーワード（keyword_scores が None のときのみ使用）
+
+        Returns:
+        dict: {"projects", "total_matched", "facets"}。カタログ未読み込みの場合は None
+        """
+        snapshot = self.snapshot
+        if not PROJECT_CATALOG_ENABLED or snapshot is None:
+            return None
+
+        now = datetime.now()
+        if keyword_scores is not None:
+            keyword_ids = snapshot.all_ids & frozenset(keyword_scores)
+        elif keyword:
+            keyword_ids = snapshot.keyword_set(keyword)
+        else:
+            keyword_ids = snapshot.all_ids
+
+        budget_ids = snapshot.budget_set(self.budget_ranges.get(budget_range))
+        days = self.deadline_ranges.get(deadline_range)
+        deadline_ids = snapshot.deadline_set(now + timedelta(days=days) if days is not None else None)
+        field_ids = snapshot.field_set(research_field)
+
+        matched = keyword_ids & budget_ids & deadline_ids & field_ids
+        if keyword_scores is not None:
+            ordered = sorted(matched, key=lambda project_id: (-keyword_scores[project_id], project_id))
+        else:
+            ordered = sorted(matched)
+
+        projects = []
+        for project_id in ordered[:limit]:
+            item = snapshot.entries[project_id].to_dict()
+            item["relevance"] = keyword_scores.get(project_id) if keyword_scores is not None else None
+            projects.append(item)
+
+        return {
+            "projects": projects,
+            "total_matched": len(matched),
+            "facets": self._facet_counts(snapshot, keyword_ids, budget_ids, deadline_ids, field_ids, now)
+        }
+
+    def _refresh_loop(self):
+        while not self._stop.wait(PROJECT_CATALOG_REFRESH_INTERVAL):
+            try:
+                self.load()
+            except Exception as e:
+                print("案件カタログの更新に失敗:", e)
+                self.refresh_failures += 1
+                self.last_error = str(e)
+
+    def start(self):
+        """初回の読み込みとバックグラウンド更新スレッドを開始する"""
+        if not PROJECT_CATALOG_ENABLED:
+            return
+        try:
+            self.load()
+        except Exception as e:
+            # 読み込みに失敗した間は、/matting-projects がDB検索にフォールバックする
+            print("案件カタログの初回読み込みに失敗:", e)
+            self.refresh_failures += 1
+            self.last_error = str(e)
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._refresh_loop, name="project-catalog", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        snapshot = self.snapshot
+        return {
+            "enabled": PROJECT_CATALOG_ENABLED,
+            "pid": os.getpid(),
+            "loaded": snapshot is not None,
+            "size": len(snapshot.entries) if snapshot else 0,
+            "research_fields": len(snapshot.field_ids) if snapshot else 0,
+            "load_age_seconds": time.time() - self.last_load_at if self.last_load_at else None,
+            "refresh_interval": PROJECT_CATALOG_REFRESH_INTERVAL,
+            "loads": self.loads,
+            "refresh_failures": self.refresh_failures,
+            "last_error": self.last_error
+        }
@@ -0,0 +1,220 @@
+import os
+import re
+import argparse
+from datetime import datetime
+
+from sqlalchemy import inspect, select, update, text, or_
+
+from database import SessionLocal, engine
+from migrate import ensure_indexes
+import models
+
+# project_information の budget / application_deadline（文字列）を
+# 検索用の budget_yen（整数）/ application_deadline_at（日時）に正規化して同期する
+#
+# 初回は次のコマンドで列・インデックスの追加と既存行のバックフィルを行う
+# （他のテーブルのインデックスは python migrate.py で作成する）:
+#     python -m components.project_normalization
+# 以降の差分同期は cron などから1か所で定期的に実行する（アプリのワーカーは列の有無を確認するだけで、書き込まない）:
+#     python -m components.project_normalization --sync-only
+
+PROJECT_NORMALIZE_BATCH_SIZE = int(os.getenv("PROJECT_NORMALIZE_BATCH_SIZE", "500"))
+
+NORMALIZED_COLUMNS = {
+    "budget_yen": "BIGINT NULL",
+    "application_deadline_at": "DATETIME NULL"
+}
+
+DEADLINE_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d",
+    "%Y/%m/%d %H:%M:%S",
+    "%Y/%m/%d %H:%M",
+    "%Y/%m/%d",
+    "%Y年%m月%d日"
+)
+
+_BUDGET_UNITS = {"億": 100000000, "万": 10000, "千": 1000}
+_BUDGET_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*(億|万|千)?")
+# 範囲の表記（"100万〜300万円"、"100〜300万円" など）。後ろの数値の単位は、単位の無い前の数値にも掛かる
+_BUDGET_RANGE_PATTERN = re.compile(
+    r"(\d+(?:\.\d+)?)\s*(億|万|千)?\s*円?\s*[〜~～\-－–]\s*(\d+(?:\.\d+)?)\s*(億|万|千)?"
+)
+
+
+def parse_budget(value):
+    """
+    予算の文字列を円単位の整数に変換する（"1000000"、"1,000,000円"、"100万円"、"1.5億円" など）
+    範囲の場合は下限を返す（"100万〜300万円"、"100〜300万円" はどちらも 1000000）。
+    予算フィルターは「下限がその金額以上の案件」の意味になる。
+    解釈できない場合は None を返す
+    """
+    if value is None:
+        return None
+    normalized = str(value).replace(",", "").replace("，", "").strip()
+    match = _BUDGET_RANGE_PATTERN.search(normalized)
+    if match:
+        amount = float(match.group(1))
+        unit = _BUDGET_UNITS.get(match.group(2) or match.group(4), 1)
+        return int(round(amount * unit))
+    match = _BUDGET_PATTERN.search(normalized)
+    if not match:
+        return None
+    amount = float(match.group(1))
+    unit = _BUDGET_UNITS.get(match.group(2), 1)
+    return int(round(amount * unit))
+
+
+def parse_deadline(value):
+    """締切の文字列を datetime に変換する。解釈できない場合は None を返す"""
+    if value is None:
+        return None
+    normalized = str(value).strip()
+    for fmt in DEADLINE_FORMATS:
+        try:
+            return datetime.strptime(normalized, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _existing_columns(bind):
+    return {column["name"] for column in inspect(bind).get_columns(models.Project.__tablename__)}
+
+
+def ensure_project_columns(bind=engine):
+    """正規化用の列と複合インデックスが無ければ追加する"""
+    table_name = models.Project.__tablename__
+    existing = _existing_columns(bind)
+    with bind.begin() as connection:
+        for column, ddl in NORMALIZED_COLUMNS.items():
+            if column not in existing:
+                connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column} {ddl}"))
+
+    ensure_indexes(models.Project, bind)
+
+
+def project_columns_ready(bind=engine):
+    """正規化用の列が存在するかどうか（マイグレーション前は False）"""
+    return set(NORMALIZED_COLUMNS) <= _existing_columns(bind)
+
+
+def unsynced_projects_query():
+    """正規化列が未同期（NULL）の行の、文字列の予算・締切を取得するクエリ"""
+    return select(
+        models.Project.project_id,
+        models.Project.budget,
+        models.Project.application_deadline,
+        models.Project.budget_yen,
+        models.Project.application_deadline_at
+    ).where(or_(models.Project.budget_yen == None, models.Project.application_deadline_at == None))
+
+
+def match_unsynced_projects(rows, min_yen=None, deadline_date=None):
+    """
+    unsynced_projects_query の行を parse_budget / parse_deadline で判定する
+    （同期前の新規・更新行が正規化列での絞り込みから漏れないようにする）
+
+    Returns:
+    tuple: (予算が min_yen 以上の案件IDのリスト, 締切が deadline_date 以前の案件IDのリスト)
+    """
+    budget_ids = []
+    deadline_ids = []
+    for row in rows:
+        if min_yen is not None and row.budget_yen is None:
+            budget_yen = parse_budget(row.budget)
+            if budget_yen is not None and budget_yen >= min_yen:
+                budget_ids.append(row.project_id)
+        if deadline_date is not None and row.application_deadline_at is None:
+            deadline_at = parse_deadline(row.application_deadline)
+            if deadline_at is not None and deadline_at <= deadline_date:
+                deadline_ids.append(row.project_id)
+    return budget_ids, deadline_ids
+
+
+def sync_project_columns(db=None):
+    """
+    文字列の budget / application_deadline と正規化済みの列を比較し、異なる行だけを更新する
+    主キー順にバッチで処理するため、大きなテーブルでも一度に全行を読み込まない
+
+    Returns:
+    int: 更新した行数
+    """
+    own_session = db is None
+    db = db or SessionLocal()
+    updated = 0
+    last_id = None
+    try:
+        while True:
+            query = select(
+                models.Project.project_id,
+                models.Project.budget,
+                models.Project.application_deadline,
+                models.Project.budget_yen,
+                models.Project.application_deadline_at
+            ).order_by(models.Project.project_id).limit(PROJECT_NORMALIZE_BATCH_SIZE)
+            if last_id is not None:
+                query = query.where(models.Project.project_id > last_id)
+            rows = db.execute(query).all()
+            if not rows:
+                break
+
+            for row in rows:
+                budget_yen = parse_budget(row.budget)
+                deadline_at = parse_deadline(row.application_deadline)
+                if budget_yen != row.budget_yen or deadline_at != row.application_deadline_at:
+                    db.execute(
+                        update(models.Project)
+                        .where(models.Project.project_id == row.project_id)
+                        .values(budget_yen=budget_yen, application_deadline_at=deadline_at)
+                    )
+                    updated += 1
+            db.commit()
+            last_id = rows[-1].project_id
+        return updated
+    finally:
+        if own_session:
+            db.close()
+
+
+class ProjectColumnSync:
+    """
+    正規化列の有無をワーカーの起動時に確認する（ready のときだけ正規化列で絞り込む）
+    列の値の同期は sync_project_columns を cron などから1か所で実行する
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.last_error = None
+
+    def start(self):
+        try:
+            self.ready = project_columns_ready()
+        except Exception as e:
+            print("予算・締切の正規化列の確認に失敗:", e)
+            self.ready = False
+            self.last_error = str(e)
+
+        if not self.ready:
+            print("予算・締切の正規化列が未作成のため、文字列でフィルターします（python -m components.project_normalization で作成）")
+
+    def stats(self):
+        return {
+            "ready": self.ready,
+            "last_error": self.last_error
+        }
+
+
+project_column_sync = ProjectColumnSync()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="予算・締切の正規化列の作成と同期")
+    parser.add_argument("--sync-only", action="store_true", help="列・インデックスの作成を行わず、差分の同期だけを行う（cron 用）")
+    args = parser.parse_args()
+
+    if not args.sync_only:
+        ensure_project_columns()
+    print("Synced rows:", sync_project_columns())
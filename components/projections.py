@@ -0,0 +1,78 @@
+from sqlalchemy import select
+
+from components.timing import stage
+import models
+
+# 一覧系エンドポイントで取得する列（レスポンスのキー名でラベルを付ける）
+# ORMエンティティを読み込まずに必要な列だけを Core の行として取得し、そのまま dict にする
+
+RESEARCHER_LIST_COLUMNS = (
+    models.Researcher.researcher_id.label("id"),
+    models.Researcher.researcher_name.label("name"),
+    models.Researcher.researcher_name_kana.label("name_kana"),
+    models.Researcher.researcher_name_alphabet.label("name_alphabet"),
+    models.Researcher.researcher_affiliation_current.label("affiliation"),
+    models.Researcher.researcher_department_current.label("department"),
+    models.Researcher.researcher_position_current.label("position"),
+    models.Researcher.researcher_email.label("email"),
+    models.Researcher.research_field_pi.label("research_field"),
+    models.Researcher.keywords_pi.label("keywords")
+)
+
+# 研究課題の概要（本文・成果の Text 列は含めない）
+RESEARCH_PROJECT_SUMMARY_COLUMNS = (
+    models.ResearchProject.id,
+    models.ResearchProject.research_project_id,
+    models.ResearchProject.researcher_id,
+    models.ResearchProject.research_project_title,
+    models.ResearchProject.research_field
+)
+
+RESEARCH_PROJECT_DETAIL_COLUMNS = RESEARCH_PROJECT_SUMMARY_COLUMNS + (
+    models.ResearchProject.research_project_details,
+    models.ResearchProject.research_achievement
+)
+
+# /filtered-research-projects は概要に成果を加えた形
+RESEARCH_PROJECT_FILTERED_COLUMNS = RESEARCH_PROJECT_SUMMARY_COLUMNS + (
+    models.ResearchProject.research_achievement,
+)
+
+# /researchers/{researcher_id}/research-projects は researcher_id を含まない
+RESEARCHER_PROJECT_COLUMNS = (
+    models.ResearchProject.id,
+    models.ResearchProject.research_project_id,
+    models.ResearchProject.research_project_title,
+    models.ResearchProject.research_project_details,
+    models.ResearchProject.research_field,
+    models.ResearchProject.research_achievement
+)
+
+# /matting-projects（DBフォールバック時）
+PROJECT_MATCHING_COLUMNS = (
+    models.Project.project_id,
+    models.Project.project_title,
+    models.Project.project_content,
+    models.Project.research_field,
+    models.Project.project_status,
+    models.Project.budget,
+    models.Project.preferred_researcher_level,
+    models.Project.application_deadline,
+    models.Company.company_name
+)
+
+
+def project_matching_query():
+    """案件と企業名を結合した /matting-projects 用のクエリ"""
+    return (
+        select(*PROJECT_MATCHING_COLUMNS)
+        .join(models.CompanyUser, models.Project.company_user_id == models.CompanyUser.company_user_id)
+        .join(models.Company, models.CompanyUser.company_id == models.Company.company_id)
+    )
+
+
+async def fetch_dicts(db, statement):
+    """statement の結果を dict のリストで返す（キーは select した列のラベル）"""
+    with stage("db"):
+        result = await db.execute(statement)
+    return [dict(row) for row in result.mappings().all()]
@@ -0,0 +1,248 @@
+import os
+import time
+import threading
+
+from sqlalchemy import select
+
+from database import ReadSessionLocal
+from components.timing import stage
+import models
+
+# 研究者ディレクトリ（researcher_information のプロフィール項目をワーカーごとにメモリへ保持）
+RESEARCHER_DIRECTORY_ENABLED = os.getenv("RESEARCHER_DIRECTORY_ENABLED", "true").lower() == "true"
+# 新規追加分の差分取得の間隔（秒）
+RESEARCHER_DIRECTORY_REFRESH_INTERVAL = float(os.getenv("RESEARCHER_DIRECTORY_REFRESH_INTERVAL", "60"))
+# 既存行の更新を反映するための全件再読み込みの間隔（秒）
+RESEARCHER_DIRECTORY_FULL_RELOAD_INTERVAL = float(os.getenv("RESEARCHER_DIRECTORY_FULL_RELOAD_INTERVAL", "1800"))
+
+# メモリに載せる列（researcher_password は絶対に含めない）
+DIRECTORY_COLUMNS = (
+    "researcher_id",
+    "researcher_name",
+    "researcher_name_kana",
+    "researcher_name_alphabet",
+    "researcher_affiliation_current",
+    "researcher_department_current",
+    "researcher_position_current",
+    "researcher_affiliations_past",
+    "research_field_pi",
+    "keywords_pi",
+    "kaken_url",
+    "researcher_email",
+    "researchmap_url",
+    "jglobal_url",
+    "orcid_url",
+    "other_urls"
+)
+
+
+class ResearcherRecord:
+    """研究者1人分のプロフィール（__slots__ でメモリを節約する）"""
+
+    __slots__ = DIRECTORY_COLUMNS
+
+    def __init__(self, row):
+        for column in DIRECTORY_COLUMNS:
+            setattr(self, column, getattr(row, column))
+
+    def to_profile(self):
+        """/researchers/{researcher_id} のレスポンス形式"""
+        return {
+            "id": self.researcher_id,
+            "name": self.researcher_name,
+            "name_kana": self.researcher_name_kana,
+            "name_alphabet": self.researcher_name_alphabet,
+            "affiliation_current": self.researcher_affiliation_current,
+            "department_current": self.researcher_department_current,
+            "position_current": self.researcher_position_current,
+            "affiliations_past": self.researcher_affiliations_past,
+            "kaken_url": self.kaken_url,
+            "email": self.researcher_email,
+            "research_field": self.research_field_pi,
+            "keywords": self.keywords_pi,
+            "researchmap_url": self.researchmap_url,
+            "jglobal_url": self.jglobal_url,
+            "orcid_url": self.orcid_url,
+            "other_urls": self.other_urls
+        }
+
+    def to_name_entry(self):
+        """/researchers/batch-names のレスポンス形式"""
+        return {
+            "researcher_id": self.researcher_id,
+            "name": self.researcher_name or f"研究者ID: {self.researcher_id}",
+            "name_alphabet": self.researcher_name_alphabet or "",
+            "affiliation": self.researcher_affiliation_current or "",
+            "position": self.researcher_position_current or ""
+        }
+
+
+def _directory_query():
+    return select(*(getattr(models.Researcher, column) for column in DIRECTORY_COLUMNS))
+
+
+class ResearcherDirectory:
+    """
+    研究者プロフィールのメモリ上のディレクトリ
+
+    - 起動時に全件を読み込む
+    - バックグラウンドで researcher_id の最大値より大きい行（新規追加分）を定期的に取得する
+    - 既存行の更新は定期的な全件再読み込みで反映する
+    - メモリに無いIDはDBから取得して追加する
+    """
+
+    def __init__(self):
+        self._records = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.loaded = False
+        self.max_researcher_id = None
+        self.last_full_load_at = None
+        self.last_refresh_at = None
+        self.full_loads = 0
+        self.incremental_refreshes = 0
+        self.incremental_rows = 0
+        self.db_fallbacks = 0
+        self.refresh_failures = 0
+        self.last_error = None
+
+    def _add(self, records):
+        for record in records:
+            self._records[record.researcher_id] = record
+            if self.max_researcher_id is None or record.researcher_id > self.max_researcher_id:
+                self.max_researcher_id = record.researcher_id
+
+    def load(self):
+        """全件を読み込み、ディレクトリを丸ごと置き換える"""
+        with ReadSessionLocal() as db:
+            rows = db.execute(_directory_query()).all()
+        records = {row.researcher_id: ResearcherRecord(row) for row in rows}
+        with self._lock:
+            self._records = records
+            self.max_researcher_id = max(records) if records else None
+            self.loaded = True
+            self.full_loads += 1
+            self.last_full_load_at = time.time()
+            self.last_refresh_at = self.last_full_load_at
+
+    def refresh_incremental(self):
+        """前回読み込んだ最大IDより後に追加された行だけを取得する"""
+        query = _directory_query()
+        if self.max_researcher_id is not None:
+            query = query.where(models.Researcher.researcher_id > self.max_researcher_id)
+        with ReadSessionLocal() as db:
+            rows = db.execute(query).all()
+        with self._lock:
+            self._add(ResearcherRecord(row) for row in rows)
+            self.incremental_refreshes += 1
+            self.incremental_rows += len(rows)
+            self.last_refresh_at = time.time()
+
+    def lookup(self, researcher_ids, db=None):
+        """
+        複数IDのレコードを返す。メモリに無いIDだけをDBから1回のクエリで取得して追加する。
+
+        Returns:
+        dict: researcher_id -> ResearcherRecord（見つからなかったIDは含まない）
+        """
+        found = {}
+        missing = []
+        for researcher_id in dict.fromkeys(str(researcher_id) for researcher_id in researcher_ids):
+            record = self._records.get(researcher_id) if RESEARCHER_DIRECTORY_ENABLED else None
+            if record is not None:
+                found[researcher_id] = record
+            else:
+                missing.append(researcher_id)
+
+        if missing:
+            query = _directory_query().where(models.Researcher.researcher_id.in_(missing))
+            if db is not None:
+                rows = db.execute(query).all()
+            else:
+                with ReadSessionLocal() as session:
+                    rows = session.execute(query).all()
+            records = [ResearcherRecord(row) for row in rows]
+            with self._lock:
+                if RESEARCHER_DIRECTORY_ENABLED:
+                    self._add(records)
+                self.db_fallbacks += 1
+            found.update((record.researcher_id, record) for record in records)
+
+        return found
+
+    async def alookup(self, researcher_ids, db):
+        """lookup の非同期版（メモリに無いIDは非同期セッション db で取得する）"""
+        found = {}
+        missing = []
+        for researcher_id in dict.fromkeys(str(researcher_id) for researcher_id in researcher_ids):
+            record = self._records.get(researcher_id) if RESEARCHER_DIRECTORY_ENABLED else None
+            if record is not None:
+                found[researcher_id] = record
+            else:
+                missing.append(researcher_id)
+
+        if missing:
+            query = _directory_query().where(models.Researcher.researcher_id.in_(missing))
+            with stage("db"):
+                rows = (await db.execute(query)).all()
+            records = [ResearcherRecord(row) for row in rows]
+            with self._lock:
+                if RESEARCHER_DIRECTORY_ENABLED:
+                    self._add(records)
+                self.db_fallbacks += 1
+            found.update((record.researcher_id, record) for record in records)
+
+        return found
+
+    def _refresh_loop(self):
+        while not self._stop.wait(RESEARCHER_DIRECTORY_REFRESH_INTERVAL):
+            try:
+                if not self.loaded or time.time() - self.last_full_load_at >= RESEARCHER_DIRECTORY_FULL_RELOAD_INTERVAL:
+                    self.load()
+                else:
+                    self.refresh_incremental()
+            except Exception as e:
+                print("研究者ディレクトリの更新に失敗:", e)
+                self.refresh_failures += 1
+                self.last_error = str(e)
+
+    def start(self):
+        """初回の全件読み込みとバックグラウンド更新スレッドを開始する"""
+        try:
+            self.load()
+        except Exception as e:
+            # 読み込みに失敗しても、lookup がDBから取得するため起動は続ける
+            print("研究者ディレクトリの初回読み込みに失敗:", e)
+            self.refresh_failures += 1
+            self.last_error = str(e)
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._refresh_loop, name="researcher-directory", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        now = time.time()
+        return {
+            "enabled": RESEARCHER_DIRECTORY_ENABLED,
+            "pid": os.getpid(),
+            "loaded": self.loaded,
+            "size": len(self._records),
+            "max_researcher_id": self.max_researcher_id,
+            "full_load_age_seconds": now - self.last_full_load_at if self.last_full_load_at else None,
+            "refresh_age_seconds": now - self.last_refresh_at if self.last_refresh_at else None,
+            "refresh_interval": RESEARCHER_DIRECTORY_REFRESH_INTERVAL,
+            "full_reload_interval": RESEARCHER_DIRECTORY_FULL_RELOAD_INTERVAL,
+            "full_loads": self.full_loads,
+            "incremental_refreshes": self.incremental_refreshes,
+            "incremental_rows": self.incremental_rows,
+            "db_fallbacks": self.db_fallbacks,
+            "refresh_failures": self.refresh_failures,
+            "last_error": self.last_error
+        }
+
+
+researcher_directory = ResearcherDirectory()
@@ -0,0 +1,49 @@
+import os
+
+from components.researcher_directory import researcher_directory
+from components.timing import stage
+
+# 検索結果に研究者名などを補完するかどうか
+SEARCH_ENRICH_PROFILES = os.getenv("SEARCH_ENRICH_PROFILES", "true").lower() == "true"
+
+
+def fetch_researcher_profiles(researcher_ids):
+    """
+    研究者IDのリストから、検索結果の補完に使うプロフィールを取得する関数。
+    研究者ディレクトリ（メモリ）から引き、無いIDだけを1回のIN句クエリでDBから取得する。
+    DBの障害で検索自体が失敗しないよう、例外時は空の辞書を返す。
+
+    Returns:
+    dict: researcher_id -> {"name", "name_alphabet", "research_field"}
+    """
+    ids = [researcher_id for researcher_id in researcher_ids if researcher_id]
+    if not SEARCH_ENRICH_PROFILES or not ids:
+        return {}
+
+    try:
+        with stage("profiles"):
+            records = researcher_directory.lookup(ids)
+    except Exception as e:
+        print("fetch_researcher_profiles内で例外発生:", e)
+        return {}
+
+    return {
+        researcher_id: {
+            "name": record.researcher_name,
+            "name_alphabet": record.researcher_name_alphabet,
+            "research_field": record.research_field_pi
+        }
+        for researcher_id, record in records.items()
+    }
+
+
+def apply_researcher_profiles(search_results, profiles):
+    """検索結果の name / name_alphabet / research_field をプロフィールで上書きする（値がある項目のみ）"""
+    for item in search_results:
+        profile = profiles.get(str(item["researcher_id"]))
+        if not profile:
+            continue
+        for field in ("name", "name_alphabet", "research_field"):
+            if profile.get(field):
+                item[field] = profile[field]
+    return search_results
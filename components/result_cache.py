@@ -0,0 +1,42 @@
+import os
+import hashlib
+
+import numpy as np
+
+from components.cache import LRUCache
+
+# ベクトル検索の結果キャッシュ（ワーカーごと）
+# 同じクエリ（埋め込みが完全に一致するもの）の検索結果を保持し、Azure Search を呼ばずに返す
+# （パターン・大学・top_k が同じ検索どうしでのみ共有する）
+# 埋め込みが近いだけのクエリは上位k件やスコアが変わりうるため、近傍一致での再利用は行わない
+SEARCH_RESULT_CACHE_ENABLED = os.getenv("SEARCH_RESULT_CACHE_ENABLED", "true").lower() == "true"
+SEARCH_RESULT_CACHE_SIZE = int(os.getenv("SEARCH_RESULT_CACHE_SIZE", "2000"))
+SEARCH_RESULT_CACHE_TTL = float(os.getenv("SEARCH_RESULT_CACHE_TTL", "600"))
+
+search_result_cache = LRUCache(maxsize=SEARCH_RESULT_CACHE_SIZE, ttl=SEARCH_RESULT_CACHE_TTL)
+
+
+def make_search_result_key(pattern, embedding, university, top_k):
+    """パターン・大学・top_k と埋め込み（float32 のバイト列）のハッシュからキャッシュキーを作る"""
+    vector = np.asarray(embedding, dtype=np.float32)
+    return hashlib.sha256(repr((pattern, university, top_k)).encode("utf-8") + vector.tobytes()).hexdigest()
+
+
+def get_cached_hits(pattern, embedding, university, top_k):
+    """キャッシュ済みの検索結果（ヒットのリストのコピー）。見つからなければ None"""
+    if not SEARCH_RESULT_CACHE_ENABLED:
+        return None
+    hits = search_result_cache.get(make_search_result_key(pattern, embedding, university, top_k))
+    return [dict(hit) for hit in hits] if hits is not None else None
+
+
+def set_cached_hits(pattern, embedding, university, top_k, hits):
+    if SEARCH_RESULT_CACHE_ENABLED:
+        search_result_cache.set(
+            make_search_result_key(pattern, embedding, university, top_k),
+            [dict(hit) for hit in hits]
+        )
+
+
+def get_search_result_cache_stats():
+    return {"enabled": SEARCH_RESULT_CACHE_ENABLED, "pid": os.getpid(), **search_result_cache.stats()}
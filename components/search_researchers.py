@@ -1,76 +1,90 @@
 import os
-import pandas as pd
-import openai
-from openai import AzureOpenAI
-from azure.search.documents import SearchClient
-from azure.search.documents.indexes import SearchIndexClient
+import json
+import zlib
+import hmac
+import base64
+import hashlib
+import secrets
+
 from azure.search.documents.models import VectorizedQuery
-from azure.core.credentials import AzureKeyCredential
-from azure.search.documents.indexes.models import (
-    SearchIndex, SimpleField, SearchableField, SearchFieldDataType,
-    VectorSearch, HnswAlgorithmConfiguration, HnswParameters, VectorSearchProfile
+
+from components.cache import LRUCache
+from components.explanation_cache import (
+    make_explanation_key,
+    get_cached_explanation,
+    set_cached_explanation
 )
-import requests
-import json
-import time
-from typing import List, Dict, Any
 
 # ローカルで動かす時用
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# 環境変数からAzureのAPIキーを取得
-AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
-AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
-AZURE_OPENAI_GPT_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
-AZURE_OPENAI_GPT_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
-AZURE_SEARCH_API_KEY = os.getenv("AZURE_SEARCH_API_KEY")
-AZURE_SEARCH_ENDPOINT = os.getenv("AZURE_SEARCH_ENDPOINT")
-AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME")
-
-# OpenAI API クライアント設定
-openai.api_key = AZURE_OPENAI_API_KEY
-openai.api_base = AZURE_OPENAI_ENDPOINT
-openai.api_version = "2023-07-01-preview"
-
-# パターン別のSearchClientを取得する関数
-def get_search_client_for_pattern(pattern):
-    """パターンに応じたSearchClientを返す"""
-    # 確認済みの実際のインデックス名を使用
-    index_names = {
-        "A": "science_tokyo_pattern_a",
-        "B": "science_tokyo_pattern_b", 
-        "C": "science_tokyo_pattern_c"
-    }
-    
-    index_name = index_names.get(pattern.upper())
-    if not index_name:
-        raise ValueError(f"Invalid pattern: {pattern}")
-    
-    return SearchClient(
-        endpoint=AZURE_SEARCH_ENDPOINT,
-        index_name=index_name,
-        credential=AzureKeyCredential(AZURE_SEARCH_API_KEY)
-    )
+# 研究者検索の設定・プロンプト・レスポンス形式
+# 外部APIの呼び出しは async_search_researchers.py / stream_search.py で行う
 
-# 埋め込みを取得する関数
-def get_embedding(text):
-    response = openai.embeddings.create(
-        input=text,
-        model=os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME")
-    )
-    return response.data[0].embedding
+# 説明生成（チャット補完）の同時実行数の上限
+EXPLANATION_MAX_WORKERS = int(os.getenv("EXPLANATION_MAX_WORKERS", "5"))
 
-def get_openai_response(messages):
-    """
-    Azure OpenAI Serviceにチャットメッセージを送信し、応答を取得する関数。
+# 説明生成の方式
+# "concurrent": 研究者ごとに1リクエスト（並行実行）
+# "batch": 全研究者を1リクエストにまとめ、失敗時は研究者ごとの生成に切り替える
+EXPLANATION_STRATEGY = os.getenv("EXPLANATION_STRATEGY", "concurrent").lower()
+# バッチ生成時の1人あたりの最大トークン数と全体の上限
+BATCH_EXPLANATION_TOKENS_PER_RESEARCHER = int(os.getenv("BATCH_EXPLANATION_TOKENS_PER_RESEARCHER", "300"))
+BATCH_EXPLANATION_MAX_TOKENS = int(os.getenv("BATCH_EXPLANATION_MAX_TOKENS", "4000"))
+
+# 説明文の生成タイミング
+# "none": 生成しない / "eager": 検索時に生成 / "lazy": ハンドルだけ返し、後から /explanations で生成
+EXPLAIN_MODES = ("none", "eager", "lazy")
+
+# クライアントから受け取るハンドルの長さの上限（文字数）と、展開後のペイロードの上限（バイト）
+# 小さなハンドルが巨大なデータに展開される（圧縮爆弾）のを防ぐ
+EXPLANATION_HANDLE_MAX_LENGTH = 4096
+EXPLANATION_HANDLE_MAX_PAYLOAD = 65536
+# ハンドルの署名（HMAC-SHA256）の鍵。クライアントが任意の依頼内容でLLMを呼び出せないよう、
+# サーバーが発行したハンドルだけを受け付ける（全ワーカーで同じ値にする）。
+# 未設定の場合は Azure OpenAI のAPIキーから導出し、それも無ければプロセスごとの乱数にする
+EXPLANATION_HANDLE_SECRET = (
+    os.getenv("EXPLANATION_HANDLE_SECRET")
+    or (os.getenv("AZURE_OPENAI_API_KEY") and "explanation-handle:" + os.getenv("AZURE_OPENAI_API_KEY"))
+    or secrets.token_hex(32)
+).encode("utf-8")
+EXPLANATION_HANDLE_SIGNATURE_BYTES = 16
 
-    Parameters:
-    messages (list): チャットメッセージのリスト。各メッセージは辞書で、'role'と'content'を含む。
+# lazyモードで返したヒットをハンドルから引くためのワーカー内キャッシュ
+# （別ワーカーに来た場合はインデックスからドキュメントを取り直す）
+lazy_hit_cache = LRUCache(maxsize=int(os.getenv("LAZY_HIT_CACHE_SIZE", "2000")), ttl=3600)
+
+# パターン別の検索設定（確認済みの実際のインデックス名・ベクトルフィールドを使用）
+# FIXED: select にはAzure Searchのインデックスに存在するフィールドのみを含める
+PATTERN_CONFIG = {
+    "A": {
+        "index_name": "science_tokyo_pattern_a",
+        "vector_field": "science_tokyo_pattern_a",
+        "select": ["id", "researcher_id", "researcher_affiliation_current", "researcher_position_current", "keywords_pi"],
+        "description": "研究者キーワードのみ（KAKEN）"
+    },
+    "B": {
+        "index_name": "science_tokyo_pattern_b",
+        "vector_field": "science_tokyo_pattern_b",
+        "select": ["id", "researcher_id", "researcher_affiliation_current", "researcher_position_current", "keywords_pi", "research_project_title", "research_project_details", "research_achievement"],
+        "description": "研究者キーワード + 研究課題（KAKEN拡張）"
+    },
+    "C": {
+        "index_name": "science_tokyo_pattern_c",
+        "vector_field": "science_tokyo_pattern_c",
+        "select": ["id", "researcher_id", "researcher_affiliation_current", "researcher_position_current", "keywords_pi", "publication_title", "description_publication"],
+        "description": "研究者キーワード + 論文（KAKEN + researchmap）"
+    }
+}
+
+def build_chat_completion_request(messages, max_tokens=300):
+    """
+    チャット補完リクエストのエンドポイントURL・ヘッダー・ボディを作成する関数。
 
     Returns:
-    str: アシスタントからの応答メッセージ。
+    tuple: (endpoint, headers, data)
     """
     # 環境変数からAPIキーとエンドポイントを取得
     api_key = os.getenv("AZURE_OPENAI_GPT_API_KEY")
@@ -91,231 +105,96 @@ def get_openai_response(messages):
     data = {
         "messages": messages,
         "temperature": 0.0,
-        "max_tokens": 300
+        "max_tokens": max_tokens
     }
+    return endpoint, headers, data
 
-    # POSTリクエストの送信
-    response = requests.post(endpoint, headers=headers, data=json.dumps(data))
+def build_vector_search_kwargs(pattern, embedding, university, top_k):
+    """ベクトル検索の引数を作成する"""
+    config = PATTERN_CONFIG[pattern]
+    # FIXED: Remove non-existent fields (researcher_name, researcher_name_alphabet)
+    return {
+        "search_text": None,
+        "vector_queries": [
+            VectorizedQuery(
+                vector=embedding,
+                k_nearest_neighbors=top_k,
+                fields=config["vector_field"]
+            )
+        ],
+        "select": config["select"],
+        "filter": f"search.ismatch('{university}', 'researcher_affiliation_current')"
+    }
 
-    # レスポンスの処理
-    if response.status_code == 200:
-        response_data = response.json()
-        return response_data['choices'][0]['message']['content']
-    else:
-        raise Exception(f"Request failed with status code {response.status_code}: {response.text}")
+def format_pattern_result(pattern, result, university, explanation=None, explanation_cached=None, explanation_handle=None):
+    """ベクトル検索のヒットをAPIレスポンス用の辞書に変換する"""
+    item = {
+        "researcher_id": result["researcher_id"],
+        # FIXED: Use placeholder since names are not in Azure Search index
+        "name": f"研究者ID: {result['researcher_id']}",
+        "name_alphabet": "",  # Not available in index
+        "university": university,  # Use the filtered university
+        "affiliation": result["researcher_affiliation_current"],
+        "position": result["researcher_position_current"],
+        "research_field": "",  # Not available in Pattern A/B/C
+        "keywords": result["keywords_pi"],
+        "explanation": explanation,
+        "explanation_cached": explanation_cached,
+        "explanation_handle": explanation_handle,
+        "score": result.get('@search.score', 0),
+        "pattern": pattern
+    }
+    if pattern == "B":
+        item["research_projects"] = f"{result.get('research_project_title', '')} | {result.get('research_project_details', '')} | {result.get('research_achievement', '')}"
+    elif pattern == "C":
+        item["publications"] = f"{result.get('publication_title', '')} | {result.get('description_publication', '')}"
+    return item
 
-# パターンA: 研究者キーワードのみ検索
-def search_researchers_pattern_a(category, title, description, university="東京科学大学", top_k=10):
-    """
-    Pattern A: 研究者キーワードのみを使用した検索（KAKENデータのみ）
-    """
-    try:
-        start_time = time.time()
-        query_text = f"{category} {title} {description}"
-        embedding = get_embedding(query_text)
-        
-        # Pattern A専用のSearchClientを取得
-        search_client = get_search_client_for_pattern("A")
-        
-        # FIXED: Remove non-existent fields (researcher_name, researcher_name_alphabet)
-        results = search_client.search(
-            search_text=None,
-            vector_queries=[
-                VectorizedQuery(
-                    vector=embedding,
-                    k_nearest_neighbors=top_k,
-                    fields="science_tokyo_pattern_a"  # Pattern A vector field
-                )
-            ],
-            # FIXED: Only include fields that exist in the Azure Search index
-            select=["id", "researcher_id", "researcher_affiliation_current", "researcher_position_current", "keywords_pi"],
-            filter=f"search.ismatch('{university}', 'researcher_affiliation_current')"
-        )
-
-        search_results = []
-        for result in results:
-            explanation = generate_explanation_pattern_a(query_text, result)
-            search_results.append({
-                "researcher_id": result["researcher_id"],
-                # FIXED: Use placeholder since names are not in Azure Search index
-                "name": f"研究者ID: {result['researcher_id']}",
-                "name_alphabet": "",  # Not available in index
-                "university": university,  # Use the filtered university
-                "affiliation": result["researcher_affiliation_current"],
-                "position": result["researcher_position_current"],
-                "research_field": "",  # Not available in Pattern A
-                "keywords": result["keywords_pi"],
-                "explanation": explanation,
-                "score": result.get('@search.score', 0),
-                "pattern": "A"
-            })
-        
-        search_time = time.time() - start_time
-        return {
-            "results": search_results,
-            "search_time": search_time,
-            "pattern": "A",
-            "pattern_description": "研究者キーワードのみ（KAKEN）"
-        }
-    
-    except Exception as e:
-        print("search_researchers_pattern_a内で例外発生:", e)
-        raise
-
-# パターンB: 研究者キーワード + 研究課題
-def search_researchers_pattern_b(category, title, description, university="東京科学大学", top_k=10):
+def make_explanation_handle(pattern, query_text, result):
     """
-    Pattern B: 研究者キーワード + 研究課題を使用した検索（KAKENデータ拡張）
+    後から説明文を生成するためのハンドルを作る
+    パターン・ドキュメントキー・依頼内容を圧縮し、署名を先頭に付けてURLセーフな文字列にする
     """
-    try:
-        start_time = time.time()
-        query_text = f"{category} {title} {description}"
-        embedding = get_embedding(query_text)
-        
-        # Pattern B専用のSearchClientを取得
-        search_client = get_search_client_for_pattern("B")
-        
-        # FIXED: Remove non-existent fields (researcher_name, researcher_name_alphabet)
-        results = search_client.search(
-            search_text=None,
-            vector_queries=[
-                VectorizedQuery(
-                    vector=embedding,
-                    k_nearest_neighbors=top_k,
-                    fields="science_tokyo_pattern_b"  # Pattern B vector field
-                )
-            ],
-            # FIXED: Only include fields that exist in the Azure Search index
-            select=["id", "researcher_id", "researcher_affiliation_current", "researcher_position_current", "keywords_pi", "research_project_title", "research_project_details", "research_achievement"],
-            filter=f"search.ismatch('{university}', 'researcher_affiliation_current')"
-        )
-
-        search_results = []
-        for result in results:
-            explanation = generate_explanation_pattern_b(query_text, result)
-            search_results.append({
-                "researcher_id": result["researcher_id"],
-                # FIXED: Use placeholder since names are not in Azure Search index
-                "name": f"研究者ID: {result['researcher_id']}",
-                "name_alphabet": "",  # Not available in index
-                "university": university,  # Use the filtered university
-                "affiliation": result["researcher_affiliation_current"],
-                "position": result["researcher_position_current"],
-                "research_field": "",  # Not available in Pattern B
-                "keywords": result["keywords_pi"],
-                "research_projects": f"{result.get('research_project_title', '')} | {result.get('research_project_details', '')} | {result.get('research_achievement', '')}",
-                "explanation": explanation,
-                "score": result.get('@search.score', 0),
-                "pattern": "B"
-            })
-        
-        search_time = time.time() - start_time
-        return {
-            "results": search_results,
-            "search_time": search_time,
-            "pattern": "B", 
-            "pattern_description": "研究者キーワード + 研究課題（KAKEN拡張）"
-        }
-    
-    except Exception as e:
-        print("search_researchers_pattern_b内で例外発生:", e)
-        raise
-
-# パターンC: 研究者キーワード + 論文（タイトル・概要）
-def search_researchers_pattern_c(category, title, description, university="東京科学大学", top_k=10):
-    """
-    Pattern C: 研究者キーワード + 論文（タイトル・概要）を使用した検索（KAKEN + researchmap）
-    """
-    try:
-        start_time = time.time()
-        query_text = f"{category} {title} {description}"
-        embedding = get_embedding(query_text)
-        
-        # Pattern C専用のSearchClientを取得
-        search_client = get_search_client_for_pattern("C")
-        
-        # FIXED: Remove non-existent fields (researcher_name, researcher_name_alphabet)
-        results = search_client.search(
-            search_text=None,
-            vector_queries=[
-                VectorizedQuery(
-                    vector=embedding,
-                    k_nearest_neighbors=top_k,
-                    fields="science_tokyo_pattern_c"  # Pattern C vector field
-                )
-            ],
-            # FIXED: Only include fields that exist in the Azure Search index
-            select=["id", "researcher_id", "researcher_affiliation_current", "researcher_position_current", "keywords_pi", "publication_title", "description_publication"],
-            filter=f"search.ismatch('{university}', 'researcher_affiliation_current')"
-        )
-
-        search_results = []
-        for result in results:
-            explanation = generate_explanation_pattern_c(query_text, result)
-            search_results.append({
-                "researcher_id": result["researcher_id"],
-                # FIXED: Use placeholder since names are not in Azure Search index
-                "name": f"研究者ID: {result['researcher_id']}",
-                "name_alphabet": "",  # Not available in index
-                "university": university,  # Use the filtered university
-                "affiliation": result["researcher_affiliation_current"],
-                "position": result["researcher_position_current"],
-                "research_field": "",  # Not available in Pattern C
-                "keywords": result["keywords_pi"],
-                "publications": f"{result.get('publication_title', '')} | {result.get('description_publication', '')}",
-                "explanation": explanation,
-                "score": result.get('@search.score', 0),
-                "pattern": "C"
-            })
-        
-        search_time = time.time() - start_time
-        return {
-            "results": search_results,
-            "search_time": search_time,
-            "pattern": "C",
-            "pattern_description": "研究者キーワード + 論文（KAKEN + researchmap）"
-        }
-    
-    except Exception as e:
-        print("search_researchers_pattern_c内で例外発生:", e)
-        raise
-
-# 全パターン比較検索
-def compare_all_patterns(category, title, description, university="東京科学大学", top_k=10):
+    payload = json.dumps(
+        {"p": pattern, "d": result["id"], "r": result["researcher_id"], "q": query_text},
+        ensure_ascii=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+    compressed = zlib.compress(payload)
+    return base64.urlsafe_b64encode(_sign_handle(compressed) + compressed).decode("ascii").rstrip("=")
+
+def _sign_handle(data):
+    return hmac.new(EXPLANATION_HANDLE_SECRET, data, hashlib.sha256).digest()[:EXPLANATION_HANDLE_SIGNATURE_BYTES]
+
+def parse_explanation_handle(handle):
     """
-    3つのパターンすべてを実行して結果を比較
+    ハンドルを (pattern, document_key, researcher_id, query_text) に戻す
+    署名が一致しない（サーバーが発行していない・改ざんされた）場合や不正な場合は ValueError
     """
+    if len(handle) > EXPLANATION_HANDLE_MAX_LENGTH:
+        raise ValueError(f"Invalid explanation handle: longer than {EXPLANATION_HANDLE_MAX_LENGTH} characters")
     try:
-        start_time = time.time()
-        
-        # 全パターンを並行実行
-        pattern_a_results = search_researchers_pattern_a(category, title, description, university, top_k)
-        pattern_b_results = search_researchers_pattern_b(category, title, description, university, top_k)
-        pattern_c_results = search_researchers_pattern_c(category, title, description, university, top_k)
-        
-        total_time = time.time() - start_time
-        
-        return {
-            "pattern_a": pattern_a_results,
-            "pattern_b": pattern_b_results,
-            "pattern_c": pattern_c_results,
-            "total_comparison_time": total_time,
-            "query_info": {
-                "category": category,
-                "title": title,
-                "description": description,
-                "university": university,
-                "top_k": top_k
-            }
-        }
-    
-    except Exception as e:
-        print("compare_all_patterns内で例外発生:", e)
-        raise
+        padded = handle + "=" * (-len(handle) % 4)
+        raw = base64.urlsafe_b64decode(padded)
+        signature, compressed = raw[:EXPLANATION_HANDLE_SIGNATURE_BYTES], raw[EXPLANATION_HANDLE_SIGNATURE_BYTES:]
+        # 署名を確かめてから展開する
+        if not hmac.compare_digest(signature, _sign_handle(compressed)):
+            raise ValueError("signature mismatch")
+        decompressor = zlib.decompressobj()
+        data = decompressor.decompress(compressed, EXPLANATION_HANDLE_MAX_PAYLOAD)
+        if decompressor.unconsumed_tail or not decompressor.eof:
+            raise ValueError(f"payload exceeds {EXPLANATION_HANDLE_MAX_PAYLOAD} bytes or is truncated")
+        payload = json.loads(data.decode("utf-8"))
+        pattern = payload["p"]
+        if pattern not in PATTERN_CONFIG:
+            raise ValueError(f"Invalid pattern: {pattern}")
+        return pattern, payload["d"], payload["r"], payload["q"]
+    except (ValueError, KeyError, TypeError, zlib.error) as e:
+        raise ValueError(f"Invalid explanation handle: {e}")
 
 # パターン別の説明生成関数
-def generate_explanation_pattern_a(query_text, researcher):
-    """Pattern A用の説明生成（基本情報のみ）"""
+def build_explanation_messages_pattern_a(query_text, researcher):
+    """Pattern A用の説明生成プロンプト（基本情報のみ）"""
     prompt = f"""
     依頼内容: {query_text}
     研究者ID: {researcher["researcher_id"]}
@@ -329,10 +208,10 @@ def generate_explanation_pattern_a(query_text, researcher):
         {"role": "system", "content": "あなたは研究者マッチングの説明を行うアシスタントです。Pattern A（基本情報のみ）での検索結果を説明します。"},
         {"role": "user", "content": prompt}
     ]
-    return get_openai_response(messages)
+    return messages
 
-def generate_explanation_pattern_b(query_text, researcher):
-    """Pattern B用の説明生成（研究課題情報を含む）"""
+def build_explanation_messages_pattern_b(query_text, researcher):
+    """Pattern B用の説明生成プロンプト（研究課題情報を含む）"""
     prompt = f"""
     依頼内容: {query_text}
     研究者ID: {researcher["researcher_id"]}
@@ -349,10 +228,10 @@ def generate_explanation_pattern_b(query_text, researcher):
         {"role": "system", "content": "あなたは研究者マッチングの説明を行うアシスタントです。Pattern B（研究課題を含む）での検索結果を説明します。"},
         {"role": "user", "content": prompt}
     ]
-    return get_openai_response(messages)
+    return messages
 
-def generate_explanation_pattern_c(query_text, researcher):
-    """Pattern C用の説明生成（論文情報を含む）"""
+def build_explanation_messages_pattern_c(query_text, researcher):
+    """Pattern C用の説明生成プロンプト（論文情報を含む）"""
     prompt = f"""
     依頼内容: {query_text}
     研究者ID: {researcher["researcher_id"]}
@@ -368,18 +247,148 @@ def generate_explanation_pattern_c(query_text, researcher):
         {"role": "system", "content": "あなたは研究者マッチングの説明を行うアシスタントです。Pattern C（論文情報を含む）での検索結果を説明します。"},
         {"role": "user", "content": prompt}
     ]
-    return get_openai_response(messages)
+    return messages
 
-# 既存の関数（後方互換性のため）
-def search_researchers(category, title, description, university="東京科学大学", top_k=10):
+EXPLANATION_MESSAGE_BUILDERS = {
+    "A": build_explanation_messages_pattern_a,
+    "B": build_explanation_messages_pattern_b,
+    "C": build_explanation_messages_pattern_c
+}
+
+# バッチ説明生成で各研究者について渡す項目（単体のプロンプトと同じ内容）
+BATCH_EXPLANATION_FIELDS = {
+    "A": [
+        ("研究者ID", "researcher_id"),
+        ("所属", "researcher_affiliation_current"),
+        ("職位", "researcher_position_current"),
+        ("キーワード", "keywords_pi")
+    ],
+    "B": [
+        ("研究者ID", "researcher_id"),
+        ("所属", "researcher_affiliation_current"),
+        ("職位", "researcher_position_current"),
+        ("キーワード", "keywords_pi"),
+        ("研究課題タイトル", "research_project_title"),
+        ("研究課題詳細", "research_project_details"),
+        ("研究成果", "research_achievement")
+    ],
+    "C": [
+        ("研究者ID", "researcher_id"),
+        ("所属", "researcher_affiliation_current"),
+        ("職位", "researcher_position_current"),
+        ("キーワード", "keywords_pi"),
+        ("論文タイトル", "publication_title"),
+        ("論文概要", "description_publication")
+    ]
+}
+
+BATCH_EXPLANATION_INSTRUCTIONS = {
+    "A": "研究者の基本情報とキーワードのみを基に、なぜその研究者が依頼内容に適しているのかを簡潔に説明してください。",
+    "B": "研究者の基本情報、キーワード、および研究課題を基に、なぜその研究者が依頼内容に適しているのかを説明してください。",
+    "C": "研究者の基本情報、キーワード、および論文情報を基に、なぜその研究者が依頼内容に適しているのかを詳細に説明してください。"
+}
+
+BATCH_EXPLANATION_SYSTEM_PROMPTS = {
+    "A": "あなたは研究者マッチングの説明を行うアシスタントです。Pattern A（基本情報のみ）での検索結果を説明します。",
+    "B": "あなたは研究者マッチングの説明を行うアシスタントです。Pattern B（研究課題を含む）での検索結果を説明します。",
+    "C": "あなたは研究者マッチングの説明を行うアシスタントです。Pattern C（論文情報を含む）での検索結果を説明します。"
+}
+
+def build_batch_explanation_messages(pattern, query_text, researchers):
+    """複数の研究者の説明をまとめて依頼するプロンプトを作成する"""
+    researcher_blocks = []
+    for index, researcher in enumerate(researchers, start=1):
+        lines = [f"[研究者{index}]"]
+        for label, field in BATCH_EXPLANATION_FIELDS[pattern]:
+            lines.append(f"{label}: {researcher.get(field, '')}")
+        researcher_blocks.append("\n".join(lines))
+
+    prompt = (
+        f"依頼内容: {query_text}\n\n"
+        + "\n\n".join(researcher_blocks)
+        + f"\n\n【Pattern {pattern}検索】上記の研究者それぞれについて、"
+        + BATCH_EXPLANATION_INSTRUCTIONS[pattern]
+        + "\n回答は次の形式のJSON配列のみで出力してください（前後に説明文やコードブロックを付けないこと）。\n"
+        + '[{"researcher_id": "研究者ID", "explanation": "説明"}]'
+    )
+    return [
+        {"role": "system", "content": BATCH_EXPLANATION_SYSTEM_PROMPTS[pattern]},
+        {"role": "user", "content": prompt}
+    ]
+
+def parse_batch_explanations(content):
+    """
+    バッチ説明生成の応答（JSON配列）を researcher_id -> 説明文 の辞書に変換する。
+    形式が不正な場合は ValueError を送出する。
+    """
+    start = content.find("[")
+    end = content.rfind("]")
+    if start == -1 or end < start:
+        raise ValueError("JSON array not found in batch explanation response")
+
+    items = json.loads(content[start:end + 1])
+    if not isinstance(items, list):
+        raise ValueError("Batch explanation response is not a JSON array")
+
+    explanations = {}
+    for item in items:
+        if isinstance(item, dict) and item.get("researcher_id") and item.get("explanation"):
+            explanations[str(item["researcher_id"])] = str(item["explanation"])
+    return explanations
+
+def prepare_batch_explanations(pattern, query_text, results):
     """
-    既存のsearch_researchers関数（Pattern Aと同じ動作）
+    バッチ説明生成の準備
+    キャッシュ済みの説明を埋め、残りの研究者をまとめて依頼するメッセージを作る。
+
+    Returns:
+    tuple: (explanations, keys, pending, messages, max_tokens)
+    explanations は results と同じ順のリストで、未生成の位置は None。pending は未生成の位置のリスト。
+    pending が空の場合、messages と max_tokens は None。
     """
-    result = search_researchers_pattern_a(category, title, description, university, top_k)
-    return result["results"]  # 既存の形式で返す
+    builder = EXPLANATION_MESSAGE_BUILDERS[pattern]
+    keys = [
+        make_explanation_key(pattern, result["researcher_id"], builder(query_text, result))
+        for result in results
+    ]
 
-def generate_explanation(query_text, researcher):
+    explanations = [None] * len(results)
+    pending = []
+    for index, key in enumerate(keys):
+        cached = get_cached_explanation(key)
+        if cached is not None:
+            explanations[index] = (cached, True)
+        else:
+            pending.append(index)
+
+    if not pending:
+        return explanations, keys, pending, None, None
+
+    messages = build_batch_explanation_messages(pattern, query_text, [results[i] for i in pending])
+    max_tokens = min(BATCH_EXPLANATION_TOKENS_PER_RESEARCHER * len(pending), BATCH_EXPLANATION_MAX_TOKENS)
+    return explanations, keys, pending, messages, max_tokens
+
+def collect_batch_explanations(results, keys, explanations, pending, content):
     """
-    既存のgenerate_explanation関数
+    バッチ説明生成の応答を explanations に反映してキャッシュに保存する
+    content が None（リクエスト失敗）や解析できない場合は、全員を生成できなかったものとして扱う。
+
+    Returns:
+    list: 応答に含まれなかった研究者の位置（研究者ごとに生成し直す）
     """
-    return generate_explanation_pattern_a(query_text, researcher)
\ No newline at end of file
+    batch_explanations = {}
+    if content is not None:
+        try:
+            batch_explanations = parse_batch_explanations(content)
+        except ValueError as e:
+            print("バッチ説明生成の応答を解析できないため、研究者ごとの生成に切り替えます:", e)
+
+    missing = []
+    for index in pending:
+        explanation = batch_explanations.get(str(results[index]["researcher_id"]))
+        if explanation:
+            set_cached_explanation(keys[index], explanation)
+            explanations[index] = (explanation, False)
+        else:
+            missing.append(index)
+    return missing
@@ -0,0 +1,186 @@
+import time
+import asyncio
+
+from components.search_researchers import (
+    PATTERN_CONFIG,
+    EXPLANATION_MAX_WORKERS,
+    EXPLAIN_MODES,
+    lazy_hit_cache,
+    make_explanation_handle,
+    format_pattern_result
+)
+from components.async_search_researchers import (
+    get_embedding_async,
+    search_pattern_hits_async,
+    generate_explanation_cached_async
+)
+from components.researcher_profiles import fetch_researcher_profiles
+from components.timing import pattern_scope
+
+
+async def _explain_in_pattern_scope(semaphore, pattern, query_text, rank, result):
+    # ジェネレータ内ではコンテキスト変数を切り替えられないため、説明生成のタスク側でパターンを設定する
+    async with semaphore:
+        with pattern_scope(pattern):
+            return rank, await generate_explanation_cached_async(pattern, query_text, result)
+
+
+async def _cancel(tasks):
+    """クライアントの切断などでジェネレータが途中で閉じられた場合に、残りのタスクを止める"""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def stream_pattern_search(pattern, category, title, description, university="東京科学大学", top_k=10, embedding=None, explain="eager"):
+    """
+    1パターン分の検索結果をイベントとして順次返す非同期ジェネレータ
+
+    1. "hits": ベクトル検索の結果（説明文なし、順位・スコア付き）
+    2. "profiles": DBから取得した研究者名など（researcher_id ごと。hits の後、explanation と完了順に混ざる）
+    3. "explanation": 説明文が1件生成されるごとに1イベント（完了順）
+    4. "summary": 各ステージの所要時間
+
+    最初の結果までの時間を埋め込みとベクトル検索だけにするため、研究者名の取得は hits を返してから並行して行う。
+
+    説明文は完了した順に返すため、EXPLANATION_STRATEGY に関わらず研究者ごとに生成する。
+    explain が "none" / "lazy" の場合は explanation イベントを返さない。
+    """
+    start_time = time.time()
+    query_text = f"{category} {title} {description}"
+
+    try:
+        if explain not in EXPLAIN_MODES:
+            raise ValueError(f"Invalid explain mode: {explain}")
+
+        if embedding is None:
+            embedding = await get_embedding_async(query_text)
+        embedding_time = time.time() - start_time
+
+        results = await search_pattern_hits_async(pattern, embedding, university, top_k)
+        hits_time = time.time() - start_time
+
+        handles = [None] * len(results)
+        if explain == "lazy":
+            handles = [make_explanation_handle(pattern, query_text, result) for result in results]
+            for handle, result in zip(handles, results):
+                lazy_hit_cache.set(handle, result)
+
+        yield {
+            "event": "hits",
+            "pattern": pattern,
+            "pattern_description": PATTERN_CONFIG[pattern]["description"],
+            "results": [
+                dict(format_pattern_result(pattern, result, university, explanation_handle=handle), rank=rank)
+                for rank, (result, handle) in enumerate(zip(results, handles))
+            ],
+            "elapsed": hits_time
+        }
+
+        profiles_task = asyncio.create_task(
+            asyncio.to_thread(fetch_researcher_profiles, [result["researcher_id"] for result in results])
+        )
+        tasks = [profiles_task]
+        if explain == "eager" and results:
+            semaphore = asyncio.Semaphore(EXPLANATION_MAX_WORKERS)
+            tasks += [
+                asyncio.create_task(_explain_in_pattern_scope(semaphore, pattern, query_text, rank, result))
+                for rank, result in enumerate(results)
+            ]
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task is profiles_task:
+                        yield {
+                            "event": "profiles",
+                            "pattern": pattern,
+                            "profiles": task.result(),
+                            "elapsed": time.time() - start_time
+                        }
+                        continue
+                    rank, (explanation, explanation_cached) = task.result()
+                    yield {
+                        "event": "explanation",
+                        "pattern": pattern,
+                        "rank": rank,
+                        "researcher_id": results[rank]["researcher_id"],
+                        "explanation": explanation,
+                        "explanation_cached": explanation_cached,
+                        "elapsed": time.time() - start_time
+                    }
+        finally:
+            await _cancel(tasks)
+
+        search_time = time.time() - start_time
+        yield {
+            "event": "summary",
+            "pattern": pattern,
+            "result_count": len(results),
+            "embedding_time": embedding_time,
+            "vector_search_time": hits_time - embedding_time,
+            "explanation_time": search_time - hits_time,
+            "search_time": search_time
+        }
+
+    except Exception as e:
+        print("stream_pattern_search内で例外発生:", e)
+        yield {"event": "error", "pattern": pattern, "message": str(e)}
+
+
+async def stream_compare_patterns(category, title, description, university="東京科学大学", top_k=10, explain="eager"):
+    """
+    3パターンの検索を並行実行し、各パターンのイベントを発生順に返す非同期ジェネレータ
+    埋め込みは1回だけ計算し、最後に "comparison_summary" イベントを返す。
+    """
+    start_time = time.time()
+    query_text = f"{category} {title} {description}"
+
+    try:
+        embedding = await get_embedding_async(query_text)
+    except Exception as e:
+        print("stream_compare_patterns内で例外発生:", e)
+        yield {"event": "error", "pattern": None, "message": str(e)}
+        return
+    embedding_time = time.time() - start_time
+
+    events = asyncio.Queue()
+    finished = object()
+
+    async def run(pattern):
+        try:
+            async for event in stream_pattern_search(pattern, category, title, description, university, top_k, embedding, explain):
+                await events.put(event)
+        finally:
+            await events.put(finished)
+
+    tasks = [asyncio.create_task(run(pattern)) for pattern in PATTERN_CONFIG]
+    try:
+        pattern_timings = {}
+        remaining = len(tasks)
+        while remaining:
+            event = await events.get()
+            if event is finished:
+                remaining -= 1
+                continue
+            if event["event"] == "summary":
+                pattern_timings[event["pattern"]] = event["search_time"]
+            yield event
+    finally:
+        await _cancel(tasks)
+
+    yield {
+        "event": "comparison_summary",
+        "embedding_time": embedding_time,
+        "pattern_timings": pattern_timings,
+        "total_comparison_time": time.time() - start_time,
+        "query_info": {
+            "category": category,
+            "title": title,
+            "description": description,
+            "university": university,
+            "top_k": top_k,
+            "explain": explain
+        }
+    }
@@ -0,0 +1,220 @@
+import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from fastapi.responses import ORJSONResponse
+from starlette.datastructures import MutableHeaders
+
+# リクエスト内の処理段階（埋め込み・ベクトル検索・LLM呼び出し・DBクエリ・シリアライズ）ごとの所要時間を計測する
+# 計測結果は Server-Timing ヘッダー・レスポンス本文・/metrics のヒストグラムで参照できる
+
+# ヒストグラムのバケット（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+# 比較検索のように1リクエストで複数パターンを処理する場合に、各段階をパターン別に集計するため
+_current_pattern = contextvars.ContextVar("current_pattern", default=None)
+
+
+class RequestTimings:
+    """1リクエスト分の計測結果（説明生成のスレッドなどから同時に記録されるためロックで保護する）"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.labels = {}
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def record(self, stage_name, pattern, seconds):
+        with self._lock:
+            self.samples.append((stage_name, pattern, seconds))
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.samples)
+
+    def summary(self):
+        """
+        段階ごとの合計時間・回数・最大時間
+
+        Returns:
+        dict: "段階名" または "段階名.パターン" -> {"ms", "count", "max_ms"}
+        """
+        result = {}
+        for stage_name, pattern, seconds in self.snapshot():
+            key = f"{stage_name}.{pattern}" if pattern else stage_name
+            entry = result.setdefault(key, {"ms": 0.0, "count": 0, "max_ms": 0.0})
+            entry["ms"] += seconds * 1000
+            entry["count"] += 1
+            entry["max_ms"] = max(entry["max_ms"], seconds * 1000)
+        for entry in result.values():
+            entry["ms"] = round(entry["ms"], 3)
+            entry["max_ms"] = round(entry["max_ms"], 3)
+        result["total"] = {"ms": round((time.perf_counter() - self.started) * 1000, 3), "count": 1}
+        return result
+
+    def server_timing_header(self):
+        entries = []
+        for key, entry in self.summary().items():
+            value = f"{key};dur={entry['ms']}"
+            if entry["count"] > 1:
+                value += f';desc="{entry["count"]} calls"'
+            entries.append(value)
+        return ", ".join(entries)
+
+
+@contextmanager
+def stage(stage_name, pattern=None):
+    """
+    with stage("embedding"): ... のように囲んだ処理の時間を現在のリクエストに記録する
+    リクエスト外（バックグラウンド処理など）では何もしない
+    """
+    timings = _request_timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.record(stage_name, pattern or _current_pattern.get(), time.perf_counter() - started)
+
+
+@contextmanager
+def pattern_scope(pattern):
+    """この中で記録した段階をパターン別に集計する"""
+    token = _current_pattern.set(pattern)
+    try:
+        yield
+    finally:
+        _current_pattern.reset(token)
+
+
+def set_request_label(name, value):
+    """/metrics のリクエストのラベル（pattern など）を設定する"""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.labels[name] = value
+
+
+def get_request_timings():
+    """レスポンス本文に含める計測結果（リクエスト外では None）"""
+    timings = _request_timings.get()
+    return timings.summary() if timings is not None else None
+
+
+class Histogram:
+    """Prometheus 形式のヒストグラム（ワーカーごと）"""
+
+    def __init__(self, name, description, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, seconds):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series["buckets"][index] += 1
+            series["sum"] += seconds
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series_items = [(labels, dict(series, buckets=list(series["buckets"]))) for labels, series in self._series.items()]
+        for labels, series in sorted(series_items, key=lambda item: item[0]):
+            label_text = ",".join(
+                f'{name}="{_escape_label(value)}"' for name, value in zip(self.label_names, labels)
+            )
+            for bound, count in zip(self.buckets, series["buckets"]):
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {series["count"]}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {series['sum']}")
+            lines.append(f"{self.name}_count{{{label_text}}} {series['count']}")
+        return lines
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by endpoint and pattern",
+    ("endpoint", "method", "pattern")
+)
+STAGE_LATENCY = Histogram(
+    "request_stage_duration_seconds",
+    "Latency of each stage (embedding, vector_search, llm, db, serialize) by endpoint and pattern",
+    ("endpoint", "pattern", "stage")
+)
+
+
+def _observe_request(scope, timings):
+    route = scope.get("route")
+    # 未定義のパスはラベルの種類が増えないようにまとめる
+    endpoint = getattr(route, "path", None) or "unmatched"
+    request_pattern = timings.labels.get("pattern", "")
+    REQUEST_LATENCY.observe((endpoint, scope.get("method", ""), request_pattern), time.perf_counter() - timings.started)
+    for stage_name, pattern, seconds in timings.snapshot():
+        STAGE_LATENCY.observe((endpoint, pattern or request_pattern, stage_name), seconds)
+
+
+def render_metrics():
+    """/metrics のレスポンス本文（Prometheus のテキスト形式）"""
+    lines = [f"# worker pid {os.getpid()}"]
+    lines.extend(REQUEST_LATENCY.render())
+    lines.extend(STAGE_LATENCY.render())
+    return "\n".join(lines) + "\n"
+
+
+class TimingMiddleware:
+    """
+    リクエストごとに計測を開始し、Server-Timing ヘッダーを付けてヒストグラムに集計する ASGI ミドルウェア
+    ストリーミングのレスポンスでは、ヘッダー送信後の段階はヒストグラムにのみ反映される
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", timings.server_timing_header())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            _observe_request(scope, timings)
+
+
+class TimedORJSONResponse(ORJSONResponse):
+    """シリアライズの時間を "serialize" として記録する ORJSONResponse"""
+
+    def render(self, content):
+        with stage("serialize"):
+            return super().render(content)
+
+
+def timed_json_response(content):
+    """本文に計測結果（timings）を加えて TimedORJSONResponse で返す"""
+    content["timings"] = get_request_timings()
+    return TimedORJSONResponse(content)
@@ -1,17 +1,18 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from collections import deque
 import os
+import time
+import threading
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Print environment variables (for debugging)
-print("DB_HOST:", os.getenv("DB_HOST"))
-print("DB_USER:", os.getenv("DB_USER"))
-print("DB_NAME:", os.getenv("DB_NAME"))
-
 # Database connection configuration
 config = {
     'host': os.getenv("DB_HOST"),
@@ -21,13 +22,212 @@ config = {
 }
 
 # Create SQLAlchemy connection string
-DATABASE_URL = f"mysql+mysqlconnector://{config['user']}:{config['password']}@{config['host']}/{config['database']}"
+# DATABASE_URL can be set directly, e.g. sqlite:///primary.db for a local stand-in
+DATABASE_URL = os.getenv("DATABASE_URL") or f"mysql+mysqlconnector://{config['user']}:{config['password']}@{config['host']}/{config['database']}"
+
+# Async drivers used for the same databases by the async engines
+ASYNC_DRIVERS = {
+    "mysql+mysqlconnector": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite"
+}
+
+
+def to_async_url(url):
+    """Swap the sync driver in a database URL for its async counterpart"""
+    scheme, separator, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + separator + rest
+
+
+# ASYNC_DATABASE_URL can be set directly; otherwise it is derived from DATABASE_URL
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+# Read replicas (optional). DB_REPLICA_URLS takes full URLs; DB_REPLICA_HOSTS reuses the primary credentials
+DB_REPLICA_URLS = [url.strip() for url in os.getenv("DB_REPLICA_URLS", "").split(",") if url.strip()] or [
+    f"mysql+mysqlconnector://{config['user']}:{config['password']}@{host.strip()}/{config['database']}"
+    for host in os.getenv("DB_REPLICA_HOSTS", "").split(",") if host.strip()
+]
+# Replicas lagging further behind than this (seconds) are skipped until they catch up
+DB_REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))
+# Seconds between replica health / lag checks
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "10"))
+# Optional query returning the replica lag in seconds (overrides SHOW REPLICA STATUS, handy for stand-ins)
+DB_REPLICA_LAG_QUERY = os.getenv("DB_REPLICA_LAG_QUERY")
+
+# Connection pool configuration (per worker process)
+# DB_MAX_CONNECTIONS is the connection budget for the whole app against each database server
+# (the primary and every replica); it is split across the gunicorn workers, and each worker's
+# share is split between its sync pool and its async pool
+GUNICORN_WORKERS = max(1, int(os.getenv("GUNICORN_WORKERS", "4")))
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "60"))
+_per_worker_connections = max(3, DB_MAX_CONNECTIONS // GUNICORN_WORKERS)
+# The sync engine only serves the background loaders (researcher directory, the two full-text
+# indexes and the project catalog, whose refresh timers can fire together) and profile enrichment,
+# so it gets one connection per loader plus one for request-path lookups
+SYNC_LOADER_THREADS = 4
+DB_SYNC_POOL_SIZE = int(os.getenv("DB_SYNC_POOL_SIZE", str(SYNC_LOADER_THREADS + 1)))
+DB_SYNC_MAX_OVERFLOW = int(os.getenv("DB_SYNC_MAX_OVERFLOW", "1"))
+# The async engine (request handling) gets the rest of the worker's share
+# unless DB_POOL_SIZE / DB_MAX_OVERFLOW are set explicitly
+_async_connections = max(1, _per_worker_connections - DB_SYNC_POOL_SIZE - DB_SYNC_MAX_OVERFLOW)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", str(max(1, _async_connections // 2))))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", str(max(0, _async_connections - DB_POOL_SIZE))))
+# Seconds to wait for a free connection before raising
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Azure Database for MySQL drops idle connections, so recycle them before that happens
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "280"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# Number of recent checkout wait times kept for percentile calculation
+POOL_WAIT_SAMPLES = 1000
+
+
+class PoolMetrics:
+    """Checkout wait time, pool exhaustion and connection age for this worker's pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.waits = deque(maxlen=POOL_WAIT_SAMPLES)
+        # Checkouts that found every connection (including overflow) in use
+        self.exhausted = 0
+        # Checkouts that gave up after DB_POOL_TIMEOUT
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.age_max = 0.0
+
+    def record_wait(self, seconds, exhausted):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self.waits.append(seconds)
+            if exhausted:
+                self.exhausted += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+            self.exhausted += 1
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def record_invalidation(self):
+        with self._lock:
+            self.invalidations += 1
+
+    def record_age(self, seconds):
+        with self._lock:
+            self.age_max = max(self.age_max, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            waits = sorted(self.waits)
+            checkouts = self.checkouts
+            return {
+                "checkouts": checkouts,
+                "wait_avg_ms": self.wait_total / checkouts * 1000 if checkouts else 0.0,
+                "wait_p95_ms": waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000 if waits else 0.0,
+                "wait_max_ms": self.wait_max * 1000,
+                "exhausted": self.exhausted,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "connection_age_max_seconds": self.age_max
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    # Set per engine by create_pooled_engine (a class attribute, so it survives pool.recreate())
+    metrics = None
+
+    def _do_get(self):
+        exhausted = self.checkedout() >= self.size() + max(self._max_overflow, 0)
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_wait(time.perf_counter() - started, exhausted)
+        return connection
+
+
+def _attach_pool_listeners(sync_engine, metrics):
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        connection_record.info["created_at"] = time.time()
+        metrics.record_connect()
+
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        created_at = connection_record.info.get("created_at")
+        if created_at is not None:
+            metrics.record_age(time.time() - created_at)
+
+    @event.listens_for(sync_engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.record_invalidation()
+
+
+def _pool_options(url, pool_class, pool_size, max_overflow):
+    # SQLite stand-ins are shared across the threadpool like MySQL connections
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    return {
+        "poolclass": pool_class,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "connect_args": connect_args
+    }
+
+
+def create_pooled_engine(url, metrics):
+    """Create an engine with the sync pool configuration above and attach the pool metrics listeners"""
+    pool_class = type("InstrumentedQueuePool", (InstrumentedQueuePool,), {"metrics": metrics})
+    pooled_engine = create_engine(url, **_pool_options(url, pool_class, DB_SYNC_POOL_SIZE, DB_SYNC_MAX_OVERFLOW))
+    _attach_pool_listeners(pooled_engine, metrics)
+    return pooled_engine
+
+
+def create_pooled_async_engine(url, metrics):
+    """Async counterpart of create_pooled_engine (separate pool sized by DB_POOL_SIZE / DB_MAX_OVERFLOW)"""
+    pool_class = type("InstrumentedAsyncQueuePool", (InstrumentedQueuePool, AsyncAdaptedQueuePool), {"metrics": metrics})
+    pooled_engine = create_async_engine(url, **_pool_options(url, pool_class, DB_POOL_SIZE, DB_MAX_OVERFLOW))
+    _attach_pool_listeners(pooled_engine.sync_engine, metrics)
+    return pooled_engine
+
+
+def _pool_state(pool, metrics):
+    return {
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "metrics": metrics.snapshot()
+    }
+
 
 # Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
+pool_metrics = PoolMetrics()
+engine = create_pooled_engine(DATABASE_URL, pool_metrics)
+
+# Async engine for the async endpoints, so DB-bound requests do not occupy threadpool threads
+async_pool_metrics = PoolMetrics()
+async_engine = create_pooled_async_engine(ASYNC_DATABASE_URL, async_pool_metrics)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
 
 # Create Base class
 Base = declarative_base()
@@ -40,6 +240,198 @@ def get_db():
     finally:
         db.close()
 
+
+def _fetch_replica_lag(connection):
+    """
+    Replica lag in seconds, or None when it cannot be determined
+    (replication stopped, not a replica, or no permission to read the status)
+    """
+    if DB_REPLICA_LAG_QUERY:
+        value = connection.execute(text(DB_REPLICA_LAG_QUERY)).scalar()
+        return float(value) if value is not None else None
+    if connection.dialect.name == "sqlite":
+        # Local stand-ins have no replication
+        return 0.0
+
+    for statement, column in (
+        ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+        ("SHOW SLAVE STATUS", "Seconds_Behind_Master")
+    ):
+        try:
+            row = connection.execute(text(statement)).mappings().first()
+        except Exception:
+            continue
+        if row is None:
+            return None
+        value = row.get(column)
+        return float(value) if value is not None else None
+    return None
+
+
+class Replica:
+    """One read replica: its engine, pool metrics and the latest health check result"""
+
+    def __init__(self, name, url):
+        self.name = name
+        self.metrics = PoolMetrics()
+        self.engine = create_pooled_engine(url, self.metrics)
+        self.async_metrics = PoolMetrics()
+        self.async_engine = create_pooled_async_engine(to_async_url(url), self.async_metrics)
+        self.healthy = False
+        self.lag = None
+        self.last_check_at = None
+        self.failures = 0
+        self.last_error = None
+
+        # Take the replica out of rotation as soon as a request sees it disconnect
+        def _on_error(context):
+            if context.is_disconnect:
+                self.mark_unhealthy(str(context.original_exception))
+
+        event.listen(self.engine, "handle_error", _on_error)
+        event.listen(self.async_engine.sync_engine, "handle_error", _on_error)
+
+    @property
+    def usable(self):
+        return self.healthy and self.lag is not None and self.lag <= DB_REPLICA_MAX_LAG
+
+    def mark_unhealthy(self, error):
+        self.healthy = False
+        self.failures += 1
+        self.last_error = error
+
+    def check(self):
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+                self.lag = _fetch_replica_lag(connection)
+            self.healthy = True
+        except Exception as e:
+            print(f"Replica health check failed ({self.name}):", e)
+            self.mark_unhealthy(str(e))
+        self.last_check_at = time.time()
+
+    def stats(self):
+        return {
+            "healthy": self.healthy,
+            "usable": self.usable,
+            "lag_seconds": self.lag,
+            "last_check_age_seconds": time.time() - self.last_check_at if self.last_check_at else None,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            **_pool_state(self.engine.pool, self.metrics),
+            "async": _pool_state(self.async_engine.pool, self.async_metrics)
+        }
+
+
+class ReplicaRouter:
+    """
+    Routes read-only sessions to healthy replicas within DB_REPLICA_MAX_LAG (round robin),
+    and back to the primary when none qualify or no replicas are configured
+    """
+
+    def __init__(self, urls):
+        self.replicas = [Replica(f"replica{i}", url) for i, url in enumerate(urls, start=1)]
+        self.primary_fallbacks = 0
+        self._next = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def choose_replica(self):
+        """Next usable replica, or None when reads should go to the primary"""
+        usable = [replica for replica in self.replicas if replica.usable]
+        if not usable:
+            if self.replicas:
+                self.primary_fallbacks += 1
+            return None
+        with self._lock:
+            replica = usable[self._next % len(usable)]
+            self._next += 1
+        return replica
+
+    def choose_engine(self):
+        replica = self.choose_replica()
+        return replica.engine if replica else engine
+
+    def choose_async_engine(self):
+        replica = self.choose_replica()
+        return replica.async_engine if replica else async_engine
+
+    def check_all(self):
+        for replica in self.replicas:
+            replica.check()
+
+    def _check_loop(self):
+        while not self._stop.wait(DB_REPLICA_CHECK_INTERVAL):
+            self.check_all()
+
+    def start(self):
+        """Run the first health check (replicas stay out of rotation until then) and start the checker thread"""
+        if not self.replicas:
+            return
+        self.check_all()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._check_loop, name="replica-health", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    async def dispose_async(self):
+        for replica in self.replicas:
+            await replica.async_engine.dispose()
+
+    def stats(self):
+        return {
+            "max_lag": DB_REPLICA_MAX_LAG,
+            "check_interval": DB_REPLICA_CHECK_INTERVAL,
+            "primary_fallbacks": self.primary_fallbacks,
+            "replicas": {replica.name: replica.stats() for replica in self.replicas}
+        }
+
+
+replica_router = ReplicaRouter(DB_REPLICA_URLS)
+
+
+def ReadSessionLocal():
+    """Session for read-only work, bound to a replica when one is available"""
+    return SessionLocal(bind=replica_router.choose_engine())
+
+
+# Read-only async database session for async def endpoints, bound to a replica when one is available
+async def get_async_read_db():
+    async with AsyncSessionLocal(bind=replica_router.choose_async_engine()) as db:
+        yield db
+
+
+async def dispose_async_engines():
+    """Close the async engines' connections (their pools are bound to the running event loop)"""
+    await replica_router.dispose_async()
+    await async_engine.dispose()
+
+
+def get_pool_stats():
+    """Current pool state and checkout metrics for this worker"""
+    pool = engine.pool
+    return {
+        "pid": os.getpid(),
+        "config": {
+            "workers": GUNICORN_WORKERS,
+            "max_connections": DB_MAX_CONNECTIONS,
+            "sync_pool_size": DB_SYNC_POOL_SIZE,
+            "sync_max_overflow": DB_SYNC_MAX_OVERFLOW,
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pre_ping": DB_POOL_PRE_PING
+        },
+        **_pool_state(pool, pool_metrics),
+        "async": _pool_state(async_engine.pool, async_pool_metrics),
+        "read_replicas": replica_router.stats()
+    }
+
 # Test the connection
 if __name__ == "__main__":
     try:
@@ -47,5 +439,8 @@ if __name__ == "__main__":
         connection = engine.connect()
         print("Connection successful!")
         connection.close()
+        for replica in replica_router.replicas:
+            replica.check()
+            print(f"{replica.name}: healthy={replica.healthy} lag={replica.lag}")
     except Exception as e:
-        print(f"Error connecting to the database: {e}")
\ No newline at end of file
+        print(f"Error connecting to the database: {e}")
@@ -1,3 +1,6 @@
-bind = "0.0.0.0:8000"
-workers = 4
-worker_class = "uvicorn.workers.UvicornWorker"
\ No newline at end of file
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+# database.py もこの値でワーカーあたりのDB接続数を決める
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
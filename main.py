@@ -1,25 +1,63 @@
-from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi import FastAPI, Depends, HTTPException, Query, Header
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from sqlalchemy import text, or_, and_, Integer
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text, or_, and_, Integer, select, func
 import os
+import hmac
+import json
+import time
 from dotenv import load_dotenv
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal
 from datetime import datetime, timedelta
 
 # Import database components
-from database import get_db, engine, Base
+from database import get_async_read_db, engine, Base, get_pool_stats, replica_router, dispose_async_engines
 import models
 
 # Import ベクトルサーチ（更新版）
-from components.search_researchers import (
-    search_researchers, 
-    search_researchers_pattern_a,
-    search_researchers_pattern_b, 
-    search_researchers_pattern_c,
-    compare_all_patterns
+from components.async_search_researchers import (
+    search_researchers_pattern_async,
+    search_researchers_batch_async,
+    compare_all_patterns_async,
+    resolve_explanation_handles_async
 )
+from components.clients import close_async_clients, get_connection_stats
+from components.researcher_directory import researcher_directory, RESEARCHER_DIRECTORY_ENABLED
+from components.pagination import clamp_per_page, keyset_page_async, encode_cursor, cached_total_async
+from components.fulltext_index import (
+    research_project_index,
+    project_index,
+    start_fulltext_indexes,
+    stop_fulltext_indexes,
+    get_fulltext_index_stats
+)
+from components.project_normalization import project_column_sync, unsynced_projects_query, match_unsynced_projects
+from components.project_catalog import ProjectCatalog
+from components.projections import (
+    RESEARCHER_LIST_COLUMNS,
+    RESEARCH_PROJECT_SUMMARY_COLUMNS,
+    RESEARCH_PROJECT_DETAIL_COLUMNS,
+    RESEARCH_PROJECT_FILTERED_COLUMNS,
+    RESEARCHER_PROJECT_COLUMNS,
+    project_matching_query,
+    fetch_dicts
+)
+from components.timing import (
+    TimingMiddleware,
+    TimedORJSONResponse,
+    timed_json_response,
+    get_request_timings,
+    set_request_label,
+    stage,
+    render_metrics
+)
+from components.stream_search import stream_pattern_search, stream_compare_patterns
+from components.embedding_cache import get_embedding_cache_stats
+from components.explanation_cache import get_explanation_cache_stats
+from components.result_cache import get_search_result_cache_stats
+from components.local_vector_index import local_vector_index, use_local_backend
 
 # Load environment variables
 load_dotenv()
@@ -28,9 +66,48 @@ load_dotenv()
 app = FastAPI(
     title="KenQ Industry-Academia Collaboration API",
     description="API for managing researchers and projects with corrected pattern comparison",
-    version="0.2.1"
+    version="0.2.1",
+    # dict を返すエンドポイントも orjson でシリアライズする
+    default_response_class=TimedORJSONResponse
 )
 
+# 起動時にリードレプリカのヘルスチェックを行う（他の起動処理の読み込みもレプリカに振り分けるため最初に実行する）
+@app.on_event("startup")
+def start_replica_router():
+    replica_router.start()
+
+# 起動時に研究者ディレクトリを読み込み、バックグラウンド更新を開始する
+@app.on_event("startup")
+def start_researcher_directory():
+    if RESEARCHER_DIRECTORY_ENABLED:
+        researcher_directory.start()
+
+# 起動時にキーワード検索用の全文インデックスを構築する
+@app.on_event("startup")
+def start_fulltext_index():
+    start_fulltext_indexes()
+
+# 起動時に予算・締切の正規化列の有無を確認する（列の同期は python -m components.project_normalization --sync-only で行う）
+@app.on_event("startup")
+def start_project_column_sync():
+    project_column_sync.start()
+
+# SEARCH_BACKEND=local の場合、起動時にローカルベクトルインデックスのスナップショットを読み込む
+@app.on_event("startup")
+def start_local_vector_index():
+    if use_local_backend():
+        local_vector_index.start()
+
+# 終了時に非同期クライアントの接続プールを閉じる
+@app.on_event("shutdown")
+async def shutdown_clients():
+    local_vector_index.stop()
+    researcher_directory.stop()
+    stop_fulltext_indexes()
+    replica_router.stop()
+    await close_async_clients()
+    await dispose_async_engines()
+
 # ミドルウェアの設定
 app.add_middleware(
     CORSMiddleware,
@@ -38,13 +115,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # ブラウザから Server-Timing を参照できるようにする
+    expose_headers=["Server-Timing"],
 )
+# 最後に追加したミドルウェアが最も外側になるため、CORS を含めたリクエスト全体を計測する
+app.add_middleware(TimingMiddleware)
 
 # Research Project response model
 class ResearchProjectResponse(BaseModel):
     id: int
     research_project_id: str
-    researcher_id: int
+    researcher_id: str
     research_project_title: str
     research_project_details: str
     research_field: str
@@ -54,12 +135,15 @@ class ResearchProjectResponse(BaseModel):
 class ResearchProjectSearchRequest(BaseModel):
     keyword: Optional[str] = None
     research_field: Optional[str] = None
-    researcher_id: Optional[int] = None
+    researcher_id: Optional[str] = None
 
 # NEW: Batch researcher names request model
 class ResearcherNamesRequest(BaseModel):
     researcher_ids: List[str]
 
+# 説明文の生成タイミング（none: 生成しない / eager: 検索時に生成 / lazy: ハンドルのみ返す）
+ExplainMode = Literal["none", "eager", "lazy"]
+
 # リクエストモデル
 class SearchRequest(BaseModel):
     category: str
@@ -67,6 +151,7 @@ class SearchRequest(BaseModel):
     description: str
     university: str = "東京科学大学"
     top_k: int = 10
+    explain: ExplainMode = "eager"
 
 # パターン指定検索リクエストモデル
 class PatternSearchRequest(BaseModel):
@@ -76,17 +161,36 @@ class PatternSearchRequest(BaseModel):
     university: str = "東京科学大学"
     top_k: int = 10
     pattern: str  # "A", "B", "C"
+    explain: ExplainMode = "eager"
+
+# バッチ検索の1件分（pattern・explain を省略した場合はバッチ全体の指定を使う）
+class BatchSearchItem(SearchRequest):
+    pattern: Optional[str] = None
+    explain: Optional[ExplainMode] = None
+
+# バッチ検索リクエストモデル（説明文は既定で生成しない）
+class BatchSearchRequest(BaseModel):
+    items: List[BatchSearchItem]
+    pattern: str = "A"
+    explain: ExplainMode = "none"
+
+# lazyモードで返したハンドルの説明文生成リクエストモデル
+class ExplanationRequest(BaseModel):
+    handles: List[str]
 
 # 単一研究者レスポンスモデル
 class ResearcherResponse(BaseModel):
     researcher_id: str
     name: Optional[str] = ""
+    name_alphabet: Optional[str] = ""
     university: str
     affiliation: str
     position: str
     research_field: Optional[str] = ""
     keywords: str
-    explanation: str
+    explanation: Optional[str] = None
+    explanation_cached: Optional[bool] = None
+    explanation_handle: Optional[str] = None
     score: float
     pattern: Optional[str] = None
 
@@ -96,6 +200,8 @@ class PatternResultResponse(BaseModel):
     search_time: float
     pattern: str
     pattern_description: str
+    # 段階ごとの所要時間（Server-Timing ヘッダーと同じ内容）
+    timings: Optional[Dict[str, Any]] = None
 
 # 比較結果レスポンスモデル
 class ComparisonResultResponse(BaseModel):
@@ -103,7 +209,10 @@ class ComparisonResultResponse(BaseModel):
     pattern_b: PatternResultResponse
     pattern_c: PatternResultResponse
     total_comparison_time: float
+    embedding_time: Optional[float] = None
+    pattern_timings: Dict[str, float] = {}
     query_info: Dict[str, Any]
+    timings: Optional[Dict[str, Any]] = None
 
 @app.get("/", tags=["General"])
 def read_root():
@@ -114,94 +223,87 @@ def read_root():
         "new_features": ["Pattern Comparison", "Corrected Field Mapping", "Batch Researcher Names"]
     }
 
+# 統計情報・メトリクスのエンドポイントの認証トークン（Authorization: Bearer <ADMIN_TOKEN> で呼び出す。
+# Prometheus からは scrape_configs の authorization で同じトークンを送る）
+# 未設定の場合、これらのエンドポイントは 404 を返す
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+def require_admin_token(authorization: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Invalid admin token", headers={"WWW-Authenticate": "Bearer"})
+
+# キャッシュの統計情報（ワーカーごと）
+@app.get("/cache-stats", tags=["General"], dependencies=[Depends(require_admin_token)])
+def get_cache_stats():
+    return {
+        "embedding": get_embedding_cache_stats(),
+        "explanation": get_explanation_cache_stats(),
+        "search_results": get_search_result_cache_stats(),
+        "local_vector_index": local_vector_index.stats(),
+        "researcher_directory": researcher_directory.stats(),
+        "fulltext": get_fulltext_index_stats(),
+        "project_columns": project_column_sync.stats(),
+        "project_catalog": project_catalog.stats()
+    }
+
+# エンドポイント・パターン別のレイテンシのヒストグラム（Prometheus 形式、ワーカーごと）
+@app.get("/metrics", tags=["General"], response_class=PlainTextResponse, dependencies=[Depends(require_admin_token)])
+def get_metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+# 外部API（Azure OpenAI / Azure Search）への接続再利用状況（ワーカーごと）
+@app.get("/connection-stats", tags=["General"], dependencies=[Depends(require_admin_token)])
+def get_connection_stats_api():
+    return get_connection_stats()
+
+# DBコネクションプールの状態（チェックアウト待ち時間・枯渇回数・接続の経過時間）（ワーカーごと）
+@app.get("/db-pool-stats", tags=["General"], dependencies=[Depends(require_admin_token)])
+def get_db_pool_stats():
+    return get_pool_stats()
+
 # --- Researcher endpoints ---
 @app.get("/researchers", tags=["Researchers"])
-def get_researchers(db: Session = Depends(get_db)):
+async def get_researchers(db: AsyncSession = Depends(get_async_read_db)):
     try:
-        # Get the first 10 researchers
-        researchers = db.query(models.Researcher).limit(10).all()
-        
-        # Convert to a list of dictionaries
-        result = []
-        for r in researchers:
-            result.append({
-                "id": r.researcher_id,
-                "name": r.researcher_name,
-                "name_kana": r.researcher_name_kana,
-                "name_alphabet": r.researcher_name_alphabet,
-                "affiliation": r.researcher_affiliation_current,
-                "department": r.researcher_department_current,
-                "position": r.researcher_position_current,
-                "email": r.researcher_email,
-                "research_field": r.research_field_pi,
-                "keywords": r.keywords_pi
-            })
+        # Get the first 10 researchers（レスポンスに必要な列だけを取得し、researcher_password は読まない）
+        result = await fetch_dicts(db, select(*RESEARCHER_LIST_COLUMNS).limit(10))
         
-        return {"status": "success", "researchers": result}
+        return timed_json_response({"status": "success", "researchers": result})
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 # UPDATED: Fixed to handle string IDs
 @app.get("/researchers/{researcher_id}", tags=["Researchers"])
-def get_researcher_by_id(researcher_id: str, db: Session = Depends(get_db)):  # Changed from int to str
+async def get_researcher_by_id(researcher_id: str, db: AsyncSession = Depends(get_async_read_db)):  # Changed from int to str
     try:
-        # Find researcher by ID - handle both string and int searches to be safe
-        researcher = db.query(models.Researcher).filter(
-            or_(
-                models.Researcher.researcher_id == researcher_id,
-                models.Researcher.researcher_id == str(researcher_id)
-            )
-        ).first()
+        # 研究者ディレクトリ（メモリ）から取得し、無ければDBから取得する
+        researcher = (await researcher_directory.alookup([researcher_id], db)).get(researcher_id)
         
         if not researcher:
             return {"status": "error", "message": "Researcher not found"}
-            
-        # Convert to dictionary
-        result = {
-            "id": researcher.researcher_id,
-            "name": researcher.researcher_name,
-            "name_kana": researcher.researcher_name_kana,
-            "name_alphabet": researcher.researcher_name_alphabet,
-            "affiliation_current": researcher.researcher_affiliation_current,
-            "department_current": researcher.researcher_department_current,
-            "position_current": researcher.researcher_position_current,
-            "affiliations_past": researcher.researcher_affiliations_past,
-            "kaken_url": researcher.kaken_url,
-            "email": researcher.researcher_email,
-            "research_field": researcher.research_field_pi,
-            "keywords": researcher.keywords_pi,
-            "researchmap_url": researcher.researchmap_url,
-            "jglobal_url": researcher.jglobal_url,
-            "orcid_url": researcher.orcid_url,
-            "other_urls": researcher.other_urls
-        }
         
-        return {"status": "success", "researcher": result}
+        return {"status": "success", "researcher": researcher.to_profile()}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 # NEW: Batch researcher names endpoint - Get multiple researchers at once
 @app.post("/researchers/batch-names", tags=["Researchers"])
-def get_researchers_batch_names(request: ResearcherNamesRequest, db: Session = Depends(get_db)):
+async def get_researchers_batch_names(request: ResearcherNamesRequest, db: AsyncSession = Depends(get_async_read_db)):
     """
     Get names for multiple researchers at once - more efficient than individual calls
     """
     try:
-        # Get all researchers whose IDs are in the list
-        researchers = db.query(models.Researcher).filter(
-            models.Researcher.researcher_id.in_(request.researcher_ids)
-        ).all()
+        # 研究者ディレクトリ（メモリ）から取得し、無いIDだけをDBから取得する
+        researchers = await researcher_directory.alookup(request.researcher_ids, db)
         
         # Create a dictionary mapping researcher_id -> names
-        result = {}
-        for researcher in researchers:
-            result[researcher.researcher_id] = {
-                "researcher_id": researcher.researcher_id,
-                "name": researcher.researcher_name or f"研究者ID: {researcher.researcher_id}",
-                "name_alphabet": researcher.researcher_name_alphabet or "",
-                "affiliation": researcher.researcher_affiliation_current or "",
-                "position": researcher.researcher_position_current or ""
-            }
+        result = {
+            researcher_id: researcher.to_name_entry()
+            for researcher_id, researcher in researchers.items()
+        }
         
         # For any IDs not found, add placeholder entries
         for researcher_id in request.researcher_ids:
@@ -219,55 +321,48 @@ def get_researchers_batch_names(request: ResearcherNamesRequest, db: Session = D
         return {"status": "error", "message": str(e)}
 
 # 既存の検索エンドポイント（後方互換性）
+# 検索系エンドポイントは非同期パイプラインで処理し、LLMの応答待ちでスレッドプールを占有しない
 @app.post("/search-researchers", response_model=List[ResearcherResponse], tags=["Researchers"])
-def search_researchers_api(request: SearchRequest):
+async def search_researchers_api(request: SearchRequest):
+    set_request_label("pattern", "A")
     try:
-        search_results = search_researchers(
+        result = await search_researchers_pattern_async(
+            "A",
             category=request.category,
             title=request.title,
             description=request.description,
             university=request.university,
-            top_k=request.top_k
+            top_k=request.top_k,
+            explain=request.explain
         )
         
-        return search_results
+        return result["results"]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # パターン指定検索エンドポイント
 @app.post("/search-researchers-pattern", response_model=PatternResultResponse, tags=["Researchers"])
-def search_researchers_pattern_api(request: PatternSearchRequest):
+async def search_researchers_pattern_api(request: PatternSearchRequest):
     """
     指定されたパターンで研究者を検索
     pattern: "A", "B", "C"
     """
+    pattern = request.pattern.upper()
+    if pattern not in ("A", "B", "C"):
+        raise HTTPException(status_code=400, detail="Invalid pattern. Must be A, B, or C")
+
+    set_request_label("pattern", pattern)
     try:
-        if request.pattern.upper() == "A":
-            result = search_researchers_pattern_a(
-                category=request.category,
-                title=request.title,
-                description=request.description,
-                university=request.university,
-                top_k=request.top_k
-            )
-        elif request.pattern.upper() == "B":
-            result = search_researchers_pattern_b(
-                category=request.category,
-                title=request.title,
-                description=request.description,
-                university=request.university,
-                top_k=request.top_k
-            )
-        elif request.pattern.upper() == "C":
-            result = search_researchers_pattern_c(
-                category=request.category,
-                title=request.title,
-                description=request.description,
-                university=request.university,
-                top_k=request.top_k
-            )
-        else:
-            raise HTTPException(status_code=400, detail="Invalid pattern. Must be A, B, or C")
+        result = await search_researchers_pattern_async(
+            pattern,
+            category=request.category,
+            title=request.title,
+            description=request.description,
+            university=request.university,
+            top_k=request.top_k,
+            explain=request.explain
+        )
+        result["timings"] = get_request_timings()
         
         return result
     except Exception as e:
@@ -275,26 +370,128 @@ def search_researchers_pattern_api(request: PatternSearchRequest):
 
 # パターン比較エンドポイント（新機能）
 @app.post("/compare-patterns", response_model=ComparisonResultResponse, tags=["Researchers"])
-def compare_patterns_api(request: SearchRequest):
+async def compare_patterns_api(request: SearchRequest):
     """
     3つのパターンすべてで研究者を検索し、結果を比較
     Pattern A: 研究者キーワードのみ（KAKEN）
     Pattern B: 研究者キーワード + 研究課題（KAKEN拡張）
     Pattern C: 研究者キーワード + 論文（KAKEN + researchmap）
     """
+    set_request_label("pattern", "all")
     try:
-        comparison_results = compare_all_patterns(
+        comparison_results = await compare_all_patterns_async(
             category=request.category,
             title=request.title,
             description=request.description,
             university=request.university,
-            top_k=request.top_k
+            top_k=request.top_k,
+            explain=request.explain
         )
+        comparison_results["timings"] = get_request_timings()
         
         return comparison_results
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# バッチ検索で受け付ける最大件数
+BATCH_SEARCH_MAX_ITEMS = int(os.getenv("BATCH_SEARCH_MAX_ITEMS", "500"))
+
+# バッチ検索エンドポイント（夜間のマッチング処理で案件ごとに呼んでいた検索をまとめる）
+@app.post("/search-researchers-batch", tags=["Researchers"])
+async def search_researchers_batch_api(request: BatchSearchRequest):
+    """
+    複数の検索をまとめて実行し、items と同じ順に項目ごとの結果またはエラーを返す
+    埋め込みは複数入力のリクエストにまとめて取得し、検索は同時実行数の上限付きで並行実行する
+    """
+    if len(request.items) > BATCH_SEARCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Too many items. Maximum is {BATCH_SEARCH_MAX_ITEMS}")
+
+    set_request_label("pattern", "batch")
+    try:
+        start_time = time.time()
+        items = [
+            {
+                "pattern": item.pattern or request.pattern,
+                "category": item.category,
+                "title": item.title,
+                "description": item.description,
+                "university": item.university,
+                "top_k": item.top_k,
+                "explain": item.explain or request.explain
+            }
+            for item in request.items
+        ]
+        results = await search_researchers_batch_async(items)
+        failed = sum(1 for result in results if result["status"] == "error")
+
+        return timed_json_response({
+            "results": results,
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "total_time": time.time() - start_time
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# lazyモードの説明文生成エンドポイント
+@app.post("/explanations", tags=["Researchers"])
+async def get_explanations_api(request: ExplanationRequest):
+    """
+    explain="lazy" の検索で返した explanation_handle の説明文をまとめて生成する
+    生成済み（キャッシュ済み）の説明文はキャッシュから返す
+    """
+    if len(request.handles) > 50:
+        raise HTTPException(status_code=400, detail="Too many handles. Maximum is 50")
+
+    try:
+        return {"explanations": await resolve_explanation_handles_async(request.handles)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# イベントの非同期ジェネレータをNDJSON（1行1イベント）に変換する
+async def to_ndjson(events):
+    async for event in events:
+        yield json.dumps(event, ensure_ascii=False, default=str) + "\n"
+
+# パターン指定検索のストリーミング版
+@app.post("/search-researchers-pattern/stream", tags=["Researchers"])
+async def search_researchers_pattern_stream_api(request: PatternSearchRequest):
+    """
+    指定されたパターンで研究者を検索し、結果をNDJSONで順次返す
+    hits（ベクトル検索結果）→ profiles（研究者名）・explanation（説明文1件ごと）→ summary（所要時間）
+    """
+    pattern = request.pattern.upper()
+    if pattern not in ("A", "B", "C"):
+        raise HTTPException(status_code=400, detail="Invalid pattern. Must be A, B, or C")
+
+    events = stream_pattern_search(
+        pattern,
+        category=request.category,
+        title=request.title,
+        description=request.description,
+        university=request.university,
+        top_k=request.top_k,
+        explain=request.explain
+    )
+    return StreamingResponse(to_ndjson(events), media_type="application/x-ndjson")
+
+# パターン比較のストリーミング版
+@app.post("/compare-patterns/stream", tags=["Researchers"])
+async def compare_patterns_stream_api(request: SearchRequest):
+    """
+    3つのパターンを並行して検索し、各パターンのイベントをNDJSONで順次返す
+    最後に comparison_summary イベントで全体の所要時間を返す
+    """
+    events = stream_compare_patterns(
+        category=request.category,
+        title=request.title,
+        description=request.description,
+        university=request.university,
+        top_k=request.top_k,
+        explain=request.explain
+    )
+    return StreamingResponse(to_ndjson(events), media_type="application/x-ndjson")
+
 # パターン情報取得エンドポイント
 @app.get("/patterns-info", tags=["Researchers"])
 def get_patterns_info():
@@ -347,160 +544,191 @@ def get_patterns_info():
 
 # --- Research Project endpoints ---
 @app.get("/research-projects", tags=["Research Projects"])
-def get_research_projects(page: int = 1, per_page: int = 10, db: Session = Depends(get_db)):
+async def get_research_projects(
+    page: int = 1,
+    per_page: int = 10,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    研究課題の一覧（IDの昇順）
+    2ページ目以降はレスポンスの next_cursor を cursor に渡して取得する（OFFSETを使わないキーセット方式）
+    page による指定は後方互換のために残している
+    """
     try:
-        # Calculate offset for pagination
-        offset = (page - 1) * per_page
-        
-        # Get research projects
-        projects = db.query(models.ResearchProject).offset(offset).limit(per_page).all()
-        
-        # Get total count
-        total = db.query(models.ResearchProject).count()
+        per_page = clamp_per_page(per_page)
+        statement = select(*RESEARCH_PROJECT_SUMMARY_COLUMNS)
+
+        if cursor or page <= 1:
+            projects, next_cursor = await keyset_page_async(db, statement, models.ResearchProject.id, per_page, cursor)
+        else:
+            # 後方互換: cursor なしで page が指定された場合のみ OFFSET を使う
+            offset = (page - 1) * per_page
+            projects = await fetch_dicts(
+                db, statement.order_by(models.ResearchProject.id).offset(offset).limit(per_page + 1)
+            )
+            next_cursor = None
+            if len(projects) > per_page:
+                projects = projects[:per_page]
+                next_cursor = encode_cursor(projects[-1]["id"])
         
-        # Convert to list of dictionaries
-        result = []
-        for p in projects:
-            result.append({
-                "id": p.id,
-                "research_project_id": p.research_project_id,
-                "researcher_id": p.researcher_id,
-                "research_project_title": p.research_project_title,
-                "research_field": p.research_field
-            })
+        # Get total count（一定時間キャッシュし、ページごとに count() を実行しない）
+        async def count_research_projects():
+            with stage("db"):
+                return (await db.execute(select(func.count()).select_from(models.ResearchProject))).scalar_one()
+
+        total = await cached_total_async("research_projects", count_research_projects)
         
-        return {
+        return timed_json_response({
             "status": "success",
-            "research_projects": result,
+            "research_projects": projects,
             "total": total,
             "page": page,
-            "per_page": per_page
-        }
+            "per_page": per_page,
+            "next_cursor": next_cursor
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 @app.get("/research-projects/{project_id}", tags=["Research Projects"])
-def get_research_project_by_id(project_id: int, db: Session = Depends(get_db)):
+async def get_research_project_by_id(project_id: int, db: AsyncSession = Depends(get_async_read_db)):
     try:
         # Find research project by ID
-        project = db.query(models.ResearchProject).filter(models.ResearchProject.id == project_id).first()
+        rows = await fetch_dicts(
+            db, select(*RESEARCH_PROJECT_DETAIL_COLUMNS).where(models.ResearchProject.id == project_id)
+        )
         
-        if not project:
+        if not rows:
             return {"status": "error", "message": "Research project not found"}
         
-        # Convert to dictionary
-        result = {
-            "id": project.id,
-            "research_project_id": project.research_project_id,
-            "researcher_id": project.researcher_id,
-            "research_project_title": project.research_project_title,
-            "research_project_details": project.research_project_details,
-            "research_field": project.research_field,
-            "research_achievement": project.research_achievement
-        }
-        
-        return {"status": "success", "research_project": result}
+        return {"status": "success", "research_project": rows[0]}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 @app.get("/search-research-projects", tags=["Research Projects"])
-def search_research_projects(keyword: str = "", db: Session = Depends(get_db)):
+async def search_research_projects(keyword: str = "", db: AsyncSession = Depends(get_async_read_db)):
     try:
-        # Search in title, details, and research field
-        projects = db.query(models.ResearchProject).filter(
-            or_(
-                models.ResearchProject.research_project_title.contains(keyword),
-                models.ResearchProject.research_project_details.contains(keyword),
-                models.ResearchProject.research_field.contains(keyword)
+        # 全文インデックスで関連度順に上位10件のIDを求め、そのIDだけをDBから取得する
+        ranked = research_project_index.search(keyword, limit=10) if keyword else None
+        scores = dict(ranked) if ranked is not None else {}
+
+        if ranked is not None:
+            projects = await fetch_dicts(
+                db, select(*RESEARCH_PROJECT_SUMMARY_COLUMNS).where(models.ResearchProject.id.in_(list(scores)))
+            ) if scores else []
+            projects.sort(key=lambda p: -scores[p["id"]])
+        else:
+            # インデックス未構築時などはLIKE検索にフォールバック
+            # Search in title, details, and research field
+            projects = await fetch_dicts(
+                db,
+                select(*RESEARCH_PROJECT_SUMMARY_COLUMNS).where(
+                    or_(
+                        models.ResearchProject.research_project_title.contains(keyword),
+                        models.ResearchProject.research_project_details.contains(keyword),
+                        models.ResearchProject.research_field.contains(keyword)
+                    )
+                ).limit(10)
             )
-        ).limit(10).all()
         
-        # Convert to list of dictionaries
-        result = []
         for p in projects:
-            result.append({
-                "id": p.id,
-                "research_project_id": p.research_project_id,
-                "researcher_id": p.researcher_id,
-                "research_project_title": p.research_project_title,
-                "research_field": p.research_field
-            })
+            p["relevance"] = scores.get(p["id"])
         
-        return {
+        return timed_json_response({
             "status": "success",
-            "research_projects": result,
-            "total": len(result)
-        }
+            "research_projects": projects,
+            "total": len(projects)
+        })
     except Exception as e:
         return {"status": "error", "message": str(e)}
     
 @app.get("/filtered-research-projects", tags=["Research Projects"])
-def get_filtered_research_projects(
+async def get_filtered_research_projects(
     research_field: str = Query(None), 
-    researcher_id: int = Query(None),
+    researcher_id: str = Query(None),  # research_projects.researcher_id は VARCHAR（数値で比較するとインデックスが使えない）
     limit: int = 6,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     try:
         # Build the query with filters
-        query = db.query(models.ResearchProject)
+        query = select(*RESEARCH_PROJECT_FILTERED_COLUMNS)
         
         # Add filter conditions if provided
         if research_field:
-            query = query.filter(models.ResearchProject.research_field.contains(research_field))
+            query = query.where(models.ResearchProject.research_field.contains(research_field))
         
         if researcher_id:
-            query = query.filter(models.ResearchProject.researcher_id == researcher_id)
+            query = query.where(models.ResearchProject.researcher_id == researcher_id)
         
         # Get research projects with limit
-        projects = query.limit(limit).all()
-        
-        # Convert to list of dictionaries
-        result = []
-        for p in projects:
-            result.append({
-                "id": p.id,
-                "research_project_id": p.research_project_id,
-                "researcher_id": p.researcher_id,
-                "research_project_title": p.research_project_title,
-                "research_field": p.research_field,
-                "research_achievement": p.research_achievement
-            })
+        projects = await fetch_dicts(db, query.limit(limit))
         
-        return {
+        return timed_json_response({
             "status": "success",
-            "research_projects": result,
-            "total": len(result)
-        }
+            "research_projects": projects,
+            "total": len(projects)
+        })
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 # --- Get research projects by researcher ID ---
 @app.get("/researchers/{researcher_id}/research-projects", tags=["Researchers"])
-def get_research_projects_by_researcher(researcher_id: int, db: Session = Depends(get_db)):
+async def get_research_projects_by_researcher(researcher_id: str, db: AsyncSession = Depends(get_async_read_db)):
     try:
         # Get all research projects for a specific researcher
-        projects = db.query(models.ResearchProject).filter(
-            models.ResearchProject.researcher_id == researcher_id
-        ).all()
-        
-        # Convert to list of dictionaries
-        result = []
-        for p in projects:
-            result.append({
-                "id": p.id,
-                "research_project_id": p.research_project_id,
-                "research_project_title": p.research_project_title,
-                "research_project_details": p.research_project_details,
-                "research_field": p.research_field,
-                "research_achievement": p.research_achievement
-            })
+        projects = await fetch_dicts(
+            db, select(*RESEARCHER_PROJECT_COLUMNS).where(models.ResearchProject.researcher_id == researcher_id)
+        )
         
-        return {
+        return timed_json_response({
             "status": "success",
-            "research_projects": result,
-            "total": len(result)
-        }
+            "research_projects": projects,
+            "total": len(projects)
+        })
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+# --- Researcher profile with research projects ---
+@app.get("/researchers/{researcher_id}/profile", tags=["Researchers"])
+async def get_researcher_profile(
+    researcher_id: str,
+    per_page: int = 10,
+    cursor: Optional[str] = None,
+    include_details: bool = False,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    研究者のプロフィールと研究課題（id 順のページング）を1回のリクエストで返す
+    研究課題は概要のみ。本文・成果は include_details=true の場合だけ取得する
+    """
+    try:
+        researcher = (await researcher_directory.alookup([researcher_id], db)).get(researcher_id)
+        if not researcher:
+            return {"status": "error", "message": "Researcher not found"}
+
+        per_page = clamp_per_page(per_page)
+        columns = RESEARCH_PROJECT_DETAIL_COLUMNS if include_details else RESEARCH_PROJECT_SUMMARY_COLUMNS
+        by_researcher = models.ResearchProject.researcher_id == researcher_id
+        projects, next_cursor = await keyset_page_async(
+            db, select(*columns).where(by_researcher), models.ResearchProject.id, per_page, cursor
+        )
+        with stage("db"):
+            total = (await db.execute(
+                select(func.count()).select_from(models.ResearchProject).where(by_researcher)
+            )).scalar_one()
+
+        return timed_json_response({
+            "status": "success",
+            "researcher": researcher.to_profile(),
+            "research_projects": projects,
+            "total": total,
+            "per_page": per_page,
+            "next_cursor": next_cursor
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
@@ -516,6 +744,9 @@ budget_ranges = {
     "設定なし": None
 }
 
+# キーワード検索で全文インデックスから取り出す候補の最大件数
+FULLTEXT_MAX_CANDIDATES = int(os.getenv("FULLTEXT_MAX_CANDIDATES", "500"))
+
 # 締切フィルター範囲マップ（日数）
 deadline_ranges = {
     "7日以内": 7,
@@ -526,26 +757,88 @@ deadline_ranges = {
     "期限なし": None
 }
 
+# 企業名を結合済みの案件カタログ（予算・締切・研究分野の絞り込みとファセット件数をメモリ上で計算する）
+project_catalog = ProjectCatalog(budget_ranges, deadline_ranges)
+
+@app.on_event("startup")
+def start_project_catalog():
+    project_catalog.start()
+
+@app.on_event("shutdown")
+def stop_project_catalog():
+    project_catalog.stop()
+
 @app.get("/matting-projects", tags=["Projects"])
-def search_projects(
+async def search_projects(
     keyword: str = "",
     budget_range: str = Query(None),
     deadline_range: str = Query(None),
-    db: Session = Depends(get_db)
+    research_field: str = Query(None),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     try:
-        keyword_pattern = f"%{keyword}%"
-        filters = [
-            or_(
-                models.Project.project_title.ilike(keyword_pattern),
-                models.Project.project_content.ilike(keyword_pattern),
-                models.Project.research_field.ilike(keyword_pattern)
+        filters = []
+
+        # キーワードは全文インデックスで候補IDを関連度順に求める（未構築時などはLIKE検索）
+        # カタログはヒット全件から total_matched とファセット件数を数えるので、ここでは件数を絞らない
+        ranked = project_index.search(keyword, limit=None) if keyword else None
+
+        # カタログが読み込み済みなら、DBに問い合わせずに絞り込みとファセット件数を返す
+        catalog_result = project_catalog.search(
+            keyword_scores=dict(ranked) if ranked is not None else None,
+            keyword=keyword,
+            budget_range=budget_range,
+            deadline_range=deadline_range,
+            research_field=research_field
+        )
+        if catalog_result is not None:
+            return timed_json_response({
+                "status": "success",
+                "projects": catalog_result["projects"],
+                "total": len(catalog_result["projects"]),
+                "total_matched": catalog_result["total_matched"],
+                "facets": catalog_result["facets"]
+            })
+
+        # DBに問い合わせる場合は IN 句が大きくなりすぎないよう上位 FULLTEXT_MAX_CANDIDATES 件に絞る
+        if ranked is not None:
+            ranked = ranked[:FULLTEXT_MAX_CANDIDATES]
+        scores = dict(ranked) if ranked is not None else {}
+
+        if ranked is not None:
+            if not scores:
+                return {"status": "success", "projects": [], "total": 0, "total_matched": 0, "facets": None}
+            filters.append(models.Project.project_id.in_(list(scores)))
+        else:
+            keyword_pattern = f"%{keyword}%"
+            filters.append(
+                or_(
+                    models.Project.project_title.ilike(keyword_pattern),
+                    models.Project.project_content.ilike(keyword_pattern),
+                    models.Project.research_field.ilike(keyword_pattern)
+                )
             )
-        ]
 
-        # 予算フィルター（文字列 → 数値比較用に前処理）
-        if budget_range and budget_range in budget_ranges:
-            min_yen = budget_ranges[budget_range]
+        min_yen = budget_ranges.get(budget_range) if budget_range else None
+        deadline_days = deadline_ranges.get(deadline_range) if deadline_range else None
+        deadline_date = datetime.now() + timedelta(days=deadline_days) if deadline_days is not None else None
+
+        if project_column_sync.ready:
+            # 正規化列（インデックスの効く整数・日時の比較）で絞り込む
+            # 正規化列は定期同期で埋めるため、同期前の新規・更新行（NULL）は文字列を解析して判定する
+            budget_ids, deadline_ids = [], []
+            if min_yen is not None or deadline_date is not None:
+                unsynced = (await db.execute(unsynced_projects_query())).all()
+                budget_ids, deadline_ids = match_unsynced_projects(unsynced, min_yen, deadline_date)
+            if min_yen is not None:
+                filters.append(or_(models.Project.budget_yen >= min_yen, models.Project.project_id.in_(budget_ids)))
+            if deadline_date is not None:
+                filters.append(or_(
+                    models.Project.application_deadline_at <= deadline_date,
+                    models.Project.project_id.in_(deadline_ids)
+                ))
+        else:
+            # 予算フィルター（文字列をキャスト）
             if min_yen is not None:
                 filters.append(
                     and_(
@@ -555,39 +848,30 @@ def search_projects(
                     )
                 )
 
-        # 締切フィルター（今日との差で計算）
-        if deadline_range in deadline_ranges and deadline_ranges[deadline_range] is not None:
-            deadline_date = datetime.now() + timedelta(days=deadline_ranges[deadline_range])
-            filters.append(models.Project.application_deadline <= deadline_date.strftime("%Y-%m-%d %H:%M:%S"))
-
-        results = (
-            db.query(models.Project, models.Company)
-            .join(models.CompanyUser, models.Project.company_user_id == models.CompanyUser.company_user_id)
-            .join(models.Company, models.CompanyUser.company_id == models.Company.company_id)
-            .filter(*filters)
-            .limit(10)
-            .all()
-        )
+            # 締切フィルター（今日との差で計算）
+            if deadline_date is not None:
+                filters.append(models.Project.application_deadline <= deadline_date.strftime("%Y-%m-%d %H:%M:%S"))
 
-        project_list = []
-        for project, company in results:
-            project_list.append({
-                "project_id": project.project_id,
-                "project_title": project.project_title,
-                "project_content": project.project_content,
-                "research_field": project.research_field,
-                "project_status": project.project_status,
-                "budget": project.budget,
-                "preferred_researcher_level": project.preferred_researcher_level,
-                "application_deadline": project.application_deadline,
-                "company_name": company.company_name
-            })
+        if research_field:
+            filters.append(models.Project.research_field == research_field.strip())
 
-        return {
+        query = project_matching_query().where(*filters)
+        if ranked is not None:
+            # 候補は FULLTEXT_MAX_CANDIDATES 件以内なので、関連度順の並べ替えはアプリ側で行う
+            project_list = sorted(await fetch_dicts(db, query), key=lambda row: -scores[row["project_id"]])[:10]
+        else:
+            project_list = await fetch_dicts(db, query.limit(10))
+        for project in project_list:
+            project["relevance"] = scores.get(project["project_id"])
+
+        # DB検索では全件数・ファセット件数を数えないため、カタログと同じキーを null で返す
+        return timed_json_response({
             "status": "success",
             "projects": project_list,
-            "total": len(project_list)
-        }
+            "total": len(project_list),
+            "total_matched": None,
+            "facets": None
+        })
 
     except Exception as e:
         return {"status": "error", "message": str(e)}
\ No newline at end of file
@@ -0,0 +1,37 @@
+from sqlalchemy import inspect
+
+from database import Base, engine
+import models  # noqa: F401  モデルを Base.metadata に登録する
+
+# 既存のDBに、models.py で定義したインデックスのうち未作成のものを追加する
+#     python migrate.py
+# 予算・締切の正規化列（とその複合インデックス）は python -m components.project_normalization で追加する
+
+
+def ensure_indexes(model, bind=engine):
+    """モデルに定義したインデックスのうち、DBに無いものを作成する（対象の列がまだ無いインデックスは飛ばす）"""
+    inspector = inspect(bind)
+    existing_columns = {column["name"] for column in inspector.get_columns(model.__tablename__)}
+    existing_indexes = {index["name"] for index in inspector.get_indexes(model.__tablename__)}
+    for index in model.__table__.indexes:
+        if index.name in existing_indexes:
+            continue
+        missing = [column.name for column in index.columns if column.name not in existing_columns]
+        if missing:
+            print(f"Skipped {index.name}: missing columns {', '.join(missing)}")
+            continue
+        index.create(bind=bind)
+        print(f"Created {index.name}")
+
+
+def ensure_all_indexes(bind=engine):
+    """すべてのモデルのインデックスを ensure_indexes で作成する（DBに無いテーブルは飛ばす）"""
+    inspector = inspect(bind)
+    for mapper in Base.registry.mappers:
+        model = mapper.class_
+        if inspector.has_table(model.__tablename__):
+            ensure_indexes(model, bind)
+
+
+if __name__ == "__main__":
+    ensure_all_indexes()
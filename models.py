@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Index
+from sqlalchemy.orm import deferred
 from database import Base
 
 class Researcher(Base):
@@ -35,6 +36,11 @@ class ResearchProject(Base):
     research_field = Column(String(255))
     research_achievement = Column(Text)
 
+    # 研究者ごとの研究課題を id 順に引く（/researchers/{researcher_id}/profile のキーセットページング）
+    __table_args__ = (
+        Index("ix_research_projects_researcher_id", "researcher_id", "id"),
+    )
+
 class Company(Base):
     __tablename__ = "companies"  # Update this to match your actual table name
     
@@ -61,4 +67,14 @@ class Project(Base):
     budget = Column(String(255))
     application_deadline = Column(String(255))
     project_status = Column(Integer)
-    closed_date = Column(String(255))
\ No newline at end of file
+    closed_date = Column(String(255))
+
+    # 検索用に正規化した予算（円）と締切日時（budget / application_deadline から同期する）
+    # マイグレーション前のDBでも既存のクエリが動くよう、SELECT には含めない（deferred）
+    budget_yen = deferred(Column(BigInteger))
+    application_deadline_at = deferred(Column(DateTime))
+
+    __table_args__ = (
+        Index("ix_project_budget_deadline", "budget_yen", "application_deadline_at"),
+        Index("ix_project_deadline_budget", "application_deadline_at", "budget_yen"),
+    )
\ No newline at end of file
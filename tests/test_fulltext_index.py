@@ -0,0 +1,55 @@
+from components.fulltext_index import BigramIndex, is_indexable_query, tokenize
+
+
+def test_tokenize_splits_into_bigrams():
+    assert tokenize("機械学習") == ["機械", "械学", "学習"]
+
+
+def test_tokenize_normalizes_width_and_case():
+    assert tokenize("ＡＩ Robot") == ["ai", "ro", "ob", "bo", "ot"]
+
+
+def test_tokenize_keeps_single_character_segments():
+    assert tokenize("x 線") == ["x", "線"]
+    assert tokenize(None) == []
+
+
+def test_is_indexable_query():
+    assert is_indexable_query("機械学習")
+    assert is_indexable_query("深層 学習")
+    assert not is_indexable_query("x 線")
+    assert not is_indexable_query("")
+    assert not is_indexable_query("!!")
+
+
+def make_index():
+    index = BigramIndex({"title": 3, "body": 1})
+    index.upsert(1, {"title": "機械学習による画像解析", "body": ""})
+    index.upsert(2, {"title": "画像処理", "body": "機械学習を用いる"})
+    index.upsert(3, {"title": "材料工学", "body": "合金の強度"})
+    return index
+
+
+def test_search_requires_all_tokens_and_ranks_by_weight():
+    index = make_index()
+    # タイトルに出現する方が重みが大きい
+    assert [doc_id for doc_id, _ in index.search("機械学習")] == [1, 2]
+    assert index.search("機械学習 合金") == []
+    assert index.search("存在しない語") == []
+
+
+def test_search_limit():
+    index = make_index()
+    assert len(index.search("機械学習", limit=1)) == 1
+
+
+def test_upsert_replaces_and_remove_deletes():
+    index = make_index()
+    index.upsert(1, {"title": "材料の強度", "body": ""})
+    assert [doc_id for doc_id, _ in index.search("機械学習")] == [2]
+
+    index.remove(2)
+    assert index.search("機械学習") == []
+    assert len(index) == 2
+    # 参照されなくなったトークンは転置リストから消える
+    assert "機械" not in index.postings
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from components.local_vector_index import HnswGraph, PatternIndex, _search_score
+
+
+def make_index(count=400, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(count, dim)).astype(np.float32)
+    affiliations = ["東京科学大学 工学院", "東京科学大学 理学院", "京都大学 工学研究科"]
+    documents = [
+        {"id": f"doc-{i}", "researcher_id": f"r{i}", "researcher_affiliation_current": affiliations[i % 3]}
+        for i in range(count)
+    ]
+    return PatternIndex("A", vectors, documents), rng
+
+
+def test_brute_force_returns_nearest_with_azure_scores():
+    index, _ = make_index()
+    query = index.vectors[5]
+    hits = index.search(query, top_k=3)
+    assert hits[0]["id"] == "doc-5"
+    assert hits[0]["@search.score"] == pytest.approx(_search_score(1.0))
+    assert [hit["@search.score"] for hit in hits] == sorted((hit["@search.score"] for hit in hits), reverse=True)
+
+
+def test_university_filter_matches_affiliation_substring():
+    index, _ = make_index()
+    hits = index.search(index.vectors[0], top_k=20, university="京都大学")
+    assert len(hits) == 20
+    assert all(hit["researcher_affiliation_current"].startswith("京都大学") for hit in hits)
+    assert index.university_mask(" 東京科学大学 ").sum() == 267
+    assert index.university_mask("存在しない大学").sum() == 0
+
+
+def test_hnsw_recall_against_brute_force():
+    index, rng = make_index()
+    graph = HnswGraph(index.vectors)
+    assert graph.build()
+
+    recalls = []
+    for query in rng.normal(size=(20, index.vectors.shape[1])).astype(np.float32):
+        expected = {hit["id"] for hit in index.search(query, top_k=10)}
+        index.graph = graph
+        found = {hit["id"] for hit in index.search(query, top_k=10)}
+        index.graph = None
+        recalls.append(len(expected & found) / len(expected))
+    assert np.mean(recalls) >= 0.9
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from components.pagination import (
+    MAX_PER_PAGE,
+    clamp_per_page,
+    decode_cursor,
+    encode_cursor,
+    keyset_page_async
+)
+
+
+@pytest.mark.parametrize("last_id", [0, 1, 123456789, "abc"])
+def test_cursor_round_trip(last_id):
+    cursor = encode_cursor(last_id)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == last_id
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", encode_cursor(1)[:-2] + "!!"])
+def test_decode_cursor_rejects_invalid(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_clamp_per_page():
+    assert clamp_per_page(0) == 1
+    assert clamp_per_page(10) == 10
+    assert clamp_per_page(MAX_PER_PAGE + 1) == MAX_PER_PAGE
+
+
+def test_keyset_page_async_walks_all_rows():
+    metadata = MetaData()
+    items = Table("items", metadata, Column("id", Integer, primary_key=True), Column("name", String(10)))
+
+    async def walk():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as connection:
+            await connection.run_sync(metadata.create_all)
+            await connection.execute(insert(items), [{"id": i, "name": f"item{i}"} for i in range(1, 8)])
+
+        pages = []
+        async with AsyncSession(engine) as db:
+            cursor = None
+            while True:
+                rows, cursor = await keyset_page_async(db, select(items.c.id, items.c.name), items.c.id, 3, cursor)
+                pages.append([row["id"] for row in rows])
+                if cursor is None:
+                    break
+        await engine.dispose()
+        return pages
+
+    assert asyncio.run(walk()) == [[1, 2, 3], [4, 5, 6], [7]]
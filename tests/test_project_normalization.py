@@ -0,0 +1,71 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from components.project_normalization import parse_budget, parse_deadline, match_unsynced_projects
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1000000", 1000000),
+    ("1,000,000円", 1000000),
+    ("100万円", 1000000),
+    ("1.5億円", 150000000),
+    ("300千円", 300000),
+    ("500万円〜", 5000000),
+    (" 100万円 ", 1000000),
+])
+def test_parse_budget(value, expected):
+    assert parse_budget(value) == expected
+
+
+@pytest.mark.parametrize("value", [
+    "100万〜300万円",
+    "100〜300万円",
+    "100万円~300万円",
+    "100万円-300万円",
+])
+def test_parse_budget_range_uses_lower_bound(value):
+    # 範囲は下限で比較する（単位が後ろの数値にしか無い場合も前の数値に掛ける）
+    assert parse_budget(value) == 1000000
+
+
+@pytest.mark.parametrize("value", [None, "", "応相談"])
+def test_parse_budget_unparsable(value):
+    assert parse_budget(value) is None
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2025-03-31 17:00:00", datetime(2025, 3, 31, 17, 0, 0)),
+    ("2025-03-31T17:00:00", datetime(2025, 3, 31, 17, 0, 0)),
+    ("2025/03/31", datetime(2025, 3, 31)),
+    ("2025年3月31日", datetime(2025, 3, 31)),
+])
+def test_parse_deadline(value, expected):
+    assert parse_deadline(value) == expected
+
+
+@pytest.mark.parametrize("value", [None, "", "随時", "2025-02-30"])
+def test_parse_deadline_unparsable(value):
+    assert parse_deadline(value) is None
+
+
+def test_match_unsynced_projects_parses_only_null_columns():
+    rows = [
+        SimpleNamespace(project_id=1, budget="500万円", application_deadline="2025-01-10",
+                        budget_yen=None, application_deadline_at=None),
+        SimpleNamespace(project_id=2, budget="100万円", application_deadline="2025-03-01",
+                        budget_yen=None, application_deadline_at=None),
+        # 同期済みの列は正規化列での絞り込みに任せる
+        SimpleNamespace(project_id=3, budget="900万円", application_deadline="2025-01-01",
+                        budget_yen=9000000, application_deadline_at=datetime(2025, 1, 1)),
+    ]
+    budget_ids, deadline_ids = match_unsynced_projects(rows, min_yen=3000000, deadline_date=datetime(2025, 2, 1))
+    assert budget_ids == [1]
+    assert deadline_ids == [1]
+
+
+def test_match_unsynced_projects_without_filters():
+    rows = [SimpleNamespace(project_id=1, budget="500万円", application_deadline="2025-01-10",
+                            budget_yen=None, application_deadline_at=None)]
+    assert match_unsynced_projects(rows) == ([], [])
@@ -0,0 +1,84 @@
+import pytest
+
+from components import cache as cache_module
+from components import result_cache
+from components.cache import LRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module, "time", clock)
+    return clock
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_cache_expires_entries(clock):
+    cache = LRUCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+
+    clock.now += 59
+    assert cache.get("a") == 1
+    clock.now += 2
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+@pytest.fixture
+def search_result_cache(monkeypatch):
+    cache = LRUCache(maxsize=2, ttl=60)
+    monkeypatch.setattr(result_cache, "search_result_cache", cache)
+    monkeypatch.setattr(result_cache, "SEARCH_RESULT_CACHE_ENABLED", True)
+    return cache
+
+
+def test_cached_hits_are_scoped_and_copied(search_result_cache):
+    embedding = [0.1, 0.2, 0.3]
+    hits = [{"researcher_id": 1, "@search.score": 0.9}]
+    result_cache.set_cached_hits("pattern1", embedding, "東京科学大学", 10, hits)
+    hits[0]["researcher_id"] = 99
+
+    cached = result_cache.get_cached_hits("pattern1", embedding, "東京科学大学", 10)
+    assert cached == [{"researcher_id": 1, "@search.score": 0.9}]
+    cached[0]["researcher_id"] = 99
+    assert result_cache.get_cached_hits("pattern1", embedding, "東京科学大学", 10)[0]["researcher_id"] == 1
+
+    assert result_cache.get_cached_hits("pattern2", embedding, "東京科学大学", 10) is None
+    assert result_cache.get_cached_hits("pattern1", embedding, "京都大学", 10) is None
+    assert result_cache.get_cached_hits("pattern1", embedding, "東京科学大学", 5) is None
+
+
+def test_cached_hits_require_exact_embedding(search_result_cache):
+    result_cache.set_cached_hits("pattern1", [0.1, 0.2, 0.3], "東京科学大学", 10, [{"researcher_id": 1}])
+    assert result_cache.get_cached_hits("pattern1", [0.1, 0.2, 0.30001], "東京科学大学", 10) is None
+
+
+def test_cached_hits_disabled(search_result_cache, monkeypatch):
+    monkeypatch.setattr(result_cache, "SEARCH_RESULT_CACHE_ENABLED", False)
+    result_cache.set_cached_hits("pattern1", [0.1], "東京科学大学", 10, [{"researcher_id": 1}])
+    assert len(search_result_cache) == 0
+    assert result_cache.get_cached_hits("pattern1", [0.1], "東京科学大学", 10) is None
@@ -0,0 +1,86 @@
+import pytest
+
+from components import search_researchers
+from components.search_researchers import collect_batch_explanations, parse_batch_explanations
+
+
+def test_parse_batch_explanations():
+    content = '[{"researcher_id": "r1", "explanation": "説明1"}, {"researcher_id": 2, "explanation": "説明2"}]'
+    assert parse_batch_explanations(content) == {"r1": "説明1", "2": "説明2"}
+
+
+def test_parse_batch_explanations_ignores_surrounding_text_and_incomplete_items():
+    content = (
+        "以下が回答です。\n```json\n"
+        '[{"researcher_id": "r1", "explanation": "説明1"}, {"researcher_id": "r2"}, "text", '
+        '{"researcher_id": "", "explanation": "x"}]\n```'
+    )
+    assert parse_batch_explanations(content) == {"r1": "説明1"}
+
+
+@pytest.mark.parametrize("content", ["説明できません", "] [", '[{"researcher_id": "r1",]'])
+def test_parse_batch_explanations_rejects_invalid(content):
+    with pytest.raises(ValueError):
+        parse_batch_explanations(content)
+
+
+def test_collect_batch_explanations_returns_missing(monkeypatch):
+    saved = {}
+    monkeypatch.setattr(search_researchers, "set_cached_explanation", saved.__setitem__)
+    results = [{"researcher_id": "r1"}, {"researcher_id": "r2"}, {"researcher_id": "r3"}]
+    explanations = [("キャッシュ済み", True), None, None]
+
+    missing = collect_batch_explanations(
+        results, ["k1", "k2", "k3"], explanations, [1, 2],
+        '[{"researcher_id": "r2", "explanation": "説明2"}]'
+    )
+
+    assert missing == [2]
+    assert explanations == [("キャッシュ済み", True), ("説明2", False), None]
+    assert saved == {"k2": "説明2"}
+
+
+def test_collect_batch_explanations_failed_request(monkeypatch):
+    monkeypatch.setattr(search_researchers, "set_cached_explanation", lambda key, value: None)
+    results = [{"researcher_id": "r1"}]
+    assert collect_batch_explanations(results, ["k1"], [None], [0], None) == [0]
+    assert collect_batch_explanations(results, ["k1"], [None], [0], "not json") == [0]
+
+
+def make_handle(query_text="AIを用いた画像解析"):
+    return search_researchers.make_explanation_handle(
+        "A", query_text, {"id": "doc-1", "researcher_id": "r1"}
+    )
+
+
+def test_explanation_handle_round_trip():
+    handle = make_handle()
+    assert search_researchers.parse_explanation_handle(handle) == ("A", "doc-1", "r1", "AIを用いた画像解析")
+
+
+def test_explanation_handle_rejects_tampering():
+    handle = make_handle()
+    middle = len(handle) // 2
+    tampered = handle[:middle] + ("A" if handle[middle] != "A" else "B") + handle[middle + 1:]
+    with pytest.raises(ValueError):
+        search_researchers.parse_explanation_handle(tampered)
+
+
+def test_explanation_handle_rejects_other_secret(monkeypatch):
+    handle = make_handle()
+    monkeypatch.setattr(search_researchers, "EXPLANATION_HANDLE_SECRET", b"another-secret")
+    with pytest.raises(ValueError):
+        search_researchers.parse_explanation_handle(handle)
+
+
+def test_explanation_handle_rejects_oversized():
+    with pytest.raises(ValueError):
+        search_researchers.parse_explanation_handle("A" * (search_researchers.EXPLANATION_HANDLE_MAX_LENGTH + 1))
+
+
+def test_explanation_handle_limits_decompressed_size():
+    # 署名が正しくても、展開後が上限を超えるハンドルは受け付けない
+    handle = make_handle("a" * (search_researchers.EXPLANATION_HANDLE_MAX_PAYLOAD + 1))
+    assert len(handle) <= search_researchers.EXPLANATION_HANDLE_MAX_LENGTH
+    with pytest.raises(ValueError):
+        search_researchers.parse_explanation_handle(handle)